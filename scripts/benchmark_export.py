@@ -0,0 +1,50 @@
+"""Time conversation exports (all formats) for synthetic 10, 100 and 1000 message sessions.
+
+Usage:
+    python scripts/benchmark_export.py [--sizes 10 100 1000]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.interface.export import EXPORT_FORMATS, iter_export
+
+SAMPLE_ANSWER = """<h2>🏭 Servicios para el sector industrial</h2>
+<p>RAESA ofrece <strong>desazolve de cárcamos</strong>, bombeo y <em>disposición de lodos</em>.</p>
+<ul><li>🚛 Transporte de aguas tratadas</li><li>📹 Video inspección de drenajes</li></ul><hr>"""
+
+
+def synthetic_conversation(size):
+    now = time.time()
+    return [{
+        "role": "user" if i % 2 == 0 else "assistant",
+        "content": "¿Qué servicios ofrecen para el sector industrial?" if i % 2 == 0 else SAMPLE_ANSWER,
+        "timestamp": now + i,
+    } for i in range(size)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    print(f"{'format':<12}{'messages':>10}{'seconds':>10}{'KiB':>10}{'chunks':>8}")
+    for export_format in EXPORT_FORMATS:
+        for size in args.sizes:
+            messages = synthetic_conversation(size)
+            start = time.perf_counter()
+            total = chunks = 0
+            for chunk in iter_export(export_format, messages):
+                total += len(chunk)
+                chunks += 1
+            elapsed = time.perf_counter() - start
+            print(f"{export_format:<12}{size:>10}{elapsed:>10.3f}{total / 1024:>10.1f}{chunks:>8}")
+
+
+if __name__ == "__main__":
+    main()
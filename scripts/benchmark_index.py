@@ -0,0 +1,102 @@
+"""Compare FAISS index types on memory, build time, search latency and recall@k.
+
+Uses the vectors of the live shared-index bundle, or synthetic vectors with
+--size. Recall is measured against the exact Flat results, both for the
+compressed index alone and after re-scoring its shortlist with the exact
+vectors (what SharedIndex does when the bundle was built with that type).
+
+Usage:
+    python scripts/benchmark_index.py [--size 50000] [--queries 200] [--k 100]
+        [--factories Flat SQfp16 SQ8 "PCA256,SQ8"]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.config import Config
+from src.data.shared_index import STAMP_FILE, SharedIndex, create_index
+
+
+def load_vectors(size):
+    """Vectors of the live bundle, or `size` clustered unit vectors when there is none or size is given"""
+    stamp = Config.SHARED_INDEX_DIR / STAMP_FILE
+    if not size and stamp.exists():
+        current = SharedIndex(Config.SHARED_INDEX_DIR / stamp.read_text(encoding="utf-8").strip())
+        if current.vectors is not None:
+            print(f"Using {len(current.vectors)} vectors from {current.path.name}")
+            return np.asarray(current.vectors.matrix, dtype=np.float32)
+    size = size or 50000
+    print(f"Using {size} synthetic vectors")
+    rng = np.random.default_rng(0)
+    # Embeddings cluster by topic; uniform noise would make every index look equally bad
+    centers = rng.standard_normal((64, Config.EMBEDDING_DIMENSION)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), size)] + 0.5 * rng.standard_normal(
+        (size, Config.EMBEDDING_DIMENSION)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def recall(found, exact):
+    return float(np.mean([len(set(f) & set(e)) / len(e) for f, e in zip(found, exact)]))
+
+
+def rescore(vectors, queries, shortlist, k):
+    results = []
+    for query, positions in zip(queries, shortlist):
+        positions = positions[positions >= 0]
+        distances = ((vectors[positions] - query) ** 2).sum(axis=1)
+        results.append(positions[np.argsort(distances, kind="stable")[:k]])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=0, help="synthetic vectors instead of the live bundle")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=Config.RETRIEVAL_K)
+    parser.add_argument("--rescore-factor", type=int, default=Config.INDEX_RESCORE_FACTOR)
+    parser.add_argument("--factories", nargs="+", default=["Flat", "SQfp16", "SQ8", "PCA256,SQ8"])
+    args = parser.parse_args()
+
+    vectors = load_vectors(args.size)
+    rng = np.random.default_rng(1)
+    # Queries near stored documents, like a question about an indexed property
+    queries = vectors[rng.integers(0, len(vectors), args.queries)]
+    queries = queries + 0.1 * rng.standard_normal(queries.shape).astype(np.float32)
+    k = min(args.k, len(vectors))
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+
+    print(f"{'index':<12} {'MiB':>8} {'B/vec':>7} {'build s':>8} {'ms/query':>9} "
+          f"{'recall':>7} {'rescored':>9} {'ms/query':>9}")
+    for factory in args.factories:
+        start = time.perf_counter()
+        index = create_index(vectors, factory)
+        build = time.perf_counter() - start
+        size = faiss.serialize_index(index).nbytes
+
+        start = time.perf_counter()
+        _, found = index.search(queries, k)
+        search_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+        start = time.perf_counter()
+        _, shortlist = index.search(queries, min(len(vectors), k * args.rescore_factor))
+        rescored = rescore(vectors, queries, shortlist, k)
+        rescore_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+        print(f"{factory:<12} {size / 2**20:>8.1f} {size / len(vectors):>7.0f} {build:>8.2f} {search_ms:>9.2f} "
+              f"{recall(found, truth):>7.3f} {recall(rescored, truth):>9.3f} {rescore_ms:>9.2f}")
+    print(f"Exact vectors for re-scoring stay memory-mapped on disk "
+          f"({vectors.nbytes / 2**20:.1f} MiB, only shortlisted rows are read)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Run the benchmark queries through the chatbot and report per-stage latency.
+
+Usage:
+    python scripts/benchmark_pipeline.py [--repeat N] [--imports-only] [--compare-rerank]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.config import Config
+
+BENCHMARK_QUERIES = [
+    "¿Qué servicios ofrecen para el sector industrial?",
+    "¿Cuál es el proceso de limpieza de trampas de grasa?",
+    "¿Qué sectores demandan más el servicio de disposición de lodos?",
+    "¿Cómo funciona el servicio de video inspección?",
+    "¿Qué ventajas tiene RAESA frente a la competencia?",
+    "Compara la demanda de restaurantes y centros comerciales",
+    "¿Cuáles son las oportunidades para RAESA?",
+]
+
+# Import sets timed by the import-time profile
+IMPORT_PROFILES = {
+    "login page": "import main",
+    "chatbot warm-up": "import src.chatbot.engine, src.data.embeddings",
+}
+
+
+def import_profile(statement, top=5):
+    """Total import time of `statement` and its heaviest direct imports, in a fresh interpreter"""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(Path(project_root) / "src"), project_root]))
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                            capture_output=True, text=True, env=env, cwd=project_root)
+    total = 0.0
+    children = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        cumulative, name = line.split("|")[1:]
+        seconds = int(cumulative) / 1e6
+        # One leading space at the top level, two more per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0:
+            total += seconds
+        elif depth == 1:
+            children.append((seconds, name.strip()))
+    return total, sorted(children, reverse=True)[:top]
+
+
+def print_import_profile():
+    print("Import-time profile (fresh interpreter, -X importtime)")
+    for label, statement in IMPORT_PROFILES.items():
+        total, heaviest = import_profile(statement)
+        print(f"  {label:<16}{total:>7.2f}s  " + ", ".join(f"{name} {seconds:.2f}s" for seconds, name in heaviest))
+
+
+def build_chatbot():
+    from src.data.embeddings import EmbeddingManager
+    from src.chatbot.engine import RAESAChatbot
+
+    # Same memory-mapped bundle the app serves from
+    return RAESAChatbot(EmbeddingManager().load_shared_index())
+
+
+def print_summary(summary):
+    print(f"\n{'stage':<12}{'count':>7}{'mean':>9}{'p50':>9}{'p95':>9}{'max':>9}")
+    for stage, row in summary.items():
+        print(f"{stage:<12}{row['count']:>7}{row['mean']:>9.2f}{row['p50']:>9.2f}{row['p95']:>9.2f}{row['max']:>9.2f}")
+
+
+def term_coverage(query, answer):
+    """Share of the query's content words that the answer mentions (cheap quality proxy)"""
+    from src.chatbot.reranker import normalize_terms
+    terms = set(normalize_terms(query))
+    if not terms:
+        return 1.0
+    return len(terms & set(normalize_terms(re.sub(r"<[^>]+>", " ", answer)))) / len(terms)
+
+
+def print_batching():
+    from src.data.shared_index import get_embedding_batcher, get_search_batcher
+
+    for name, batcher in (("embedding", get_embedding_batcher()), ("search", get_search_batcher())):
+        stats = batcher.stats()
+        print(f"{name:>10} batches {stats['batches']:>5}  items {stats['items']:>5}  mean batch {stats['mean_batch']:.1f}  "
+              f"max {stats['max_batch']}  wait {stats['mean_wait_ms']:.1f} ms  run {stats['mean_run_ms']:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=1, help="runs per query")
+    parser.add_argument("--imports-only", action="store_true", help="only print the import-time profile")
+    parser.add_argument("--compare-rerank", action="store_true",
+                        help="run every query with and without the local re-ranking stage")
+    args = parser.parse_args()
+
+    print_import_profile()
+    if args.imports_only:
+        return
+
+    print(f"Generation model: {Config.GENERATION_MODEL}")
+    print(f"Formatting model: {Config.FORMATTING_MODEL}")
+    chatbot = build_chatbot()
+    from src.chatbot.metrics import LatencyRecorder
+    from src.chatbot.reranker import LocalReranker
+
+    modes = [("rerank", True), ("no rerank", False)] if args.compare_rerank else [("default", Config.RERANK_ENABLED)]
+    results = {}
+    for label, rerank in modes:
+        chatbot.reranker = LocalReranker() if rerank else None
+        chatbot.latency = LatencyRecorder()
+        print(f"\n== {label} ==")
+        rows = []
+        for _ in range(args.repeat):
+            for query in BENCHMARK_QUERIES:
+                start = time.perf_counter()
+                answer = chatbot.get_response(query)
+                elapsed = time.perf_counter() - start
+                coverage = term_coverage(query, answer)
+                rows.append((elapsed, chatbot.last_context_tokens, coverage))
+                print(f"{elapsed:6.2f}s {chatbot.last_context_tokens:>7} ctx tok  coverage {coverage:.2f}  "
+                      f"[{chatbot.policy.classify_query(query)}] {query}")
+        print_summary(chatbot.latency.summary())
+        print_batching()
+        results[label] = rows
+
+    if len(results) > 1:
+        print(f"\n{'mode':<12}{'mean s':>9}{'ctx tok':>10}{'coverage':>10}")
+        for label, rows in results.items():
+            count = len(rows)
+            print(f"{label:<12}{sum(r[0] for r in rows) / count:>9.2f}"
+                  f"{sum(r[1] for r in rows) / count:>10.0f}{sum(r[2] for r in rows) / count:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
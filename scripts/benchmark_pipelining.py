@@ -0,0 +1,122 @@
+"""Compare sequential and pipelined generation + formatting against a latency-injecting fake client.
+
+The fake client answers with a fixed multi-paragraph response; every call
+waits `--ttft` seconds before its first token and `--per-token` seconds per
+output token, for the generation stream and for each formatting call alike.
+No API key or index is needed.
+
+Usage:
+    python scripts/benchmark_pipelining.py [--paragraphs N] [--ttft S] [--per-token S] [--repeat N]
+"""
+import argparse
+import statistics
+import sys
+import time
+import types
+from pathlib import Path
+
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.config import Config
+
+MODES = ("sequential", "pipelined", "local")
+PARAGRAPH = ("El servicio de desazolve de **drenajes industriales** incluye la inspección previa, "
+             "la extracción de sólidos con equipo hidroneumático y la disposición de lodos en sitios "
+             "autorizados. Los clientes del sector industrial lo contratan de forma preventiva, "
+             "normalmente cada tres o seis meses, para evitar paros de planta y multas ambientales.")
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+class FakeStream:
+    def __init__(self, text, ttft, per_token):
+        self.text, self.ttft, self.per_token = text, ttft, per_token
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    @property
+    def text_stream(self):
+        time.sleep(self.ttft)
+        for word in self.text.split(" "):
+            time.sleep(self.per_token * estimate_tokens(word + " "))
+            yield word + " "
+
+
+class FakeAnthropic:
+    """messages.create / messages.stream with time-to-first-token plus per-token delays"""
+
+    def __init__(self, paragraphs, ttft, per_token):
+        self.messages = self
+        self.answer = "\n\n".join(f"## Punto {i + 1}\n{PARAGRAPH}" for i in range(paragraphs))
+        self.ttft, self.per_token = ttft, per_token
+
+    def _output(self, kwargs):
+        if "HTML" in kwargs.get("system", ""):
+            # Formatting echoes its input, a little longer
+            content = kwargs["messages"][-1]["content"]
+            body = content.split("Información a formatear:", 1)[-1].split("Por favor, formatea", 1)[0]
+            return "<p>" + body.strip() + "</p>"
+        return self.answer
+
+    def create(self, **kwargs):
+        text = self._output(kwargs)
+        time.sleep(self.ttft + self.per_token * estimate_tokens(text))
+        return types.SimpleNamespace(content=[types.SimpleNamespace(text=text)])
+
+    def stream(self, **kwargs):
+        return FakeStream(self._output(kwargs), self.ttft, self.per_token)
+
+
+def build_chatbot(fake):
+    from src.chatbot.engine import RAESAChatbot
+    from src.chatbot.scheduler import RequestScheduler
+    from src.data.shared_index import SharedIndexManager
+
+    # No rate limiting: only the injected latency is measured
+    bot = RAESAChatbot(SharedIndexManager(),
+                       scheduler=RequestScheduler(requests_per_minute=10 ** 6, tokens_per_minute=10 ** 9))
+    bot.anthropic = fake
+    return bot
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=6, help="paragraphs in the fake response")
+    parser.add_argument("--ttft", type=float, default=0.5, help="seconds to first token, per call")
+    parser.add_argument("--per-token", type=float, default=0.004, help="seconds per output token")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per mode")
+    args = parser.parse_args()
+
+    fake = FakeAnthropic(args.paragraphs, args.ttft, args.per_token)
+    bot = build_chatbot(fake)
+    tokens = estimate_tokens(fake.answer)
+    stage = args.ttft + args.per_token * tokens
+    print(f"Fake response: {args.paragraphs} paragraphs, ~{tokens} tokens; "
+          f"each stage alone ~{stage:.2f}s, so sequential ~{2 * stage:.2f}s and the "
+          f"overlap bound max(stage 1, stage 2) ~{stage:.2f}s\n")
+
+    print(f"{'mode':<12}{'median s':>10}{'min s':>8}{'tail s':>8}{'html chars':>12}")
+    for mode in MODES:
+        Config.PIPELINE_MODE = mode
+        runs, tails, size = [], [], 0
+        for _ in range(args.repeat):
+            bot.last_timings = {}
+            start = time.perf_counter()
+            answer = bot.generate_response_with_context("¿Qué incluye el desazolve?", "contexto", [], "bench")
+            runs.append(time.perf_counter() - start)
+            tails.append(bot.last_timings.get("formatting_tail", bot.last_timings.get("formatting", 0.0)))
+            size = len(answer)
+        print(f"{mode:<12}{statistics.median(runs):>10.2f}{min(runs):>8.2f}"
+              f"{statistics.median(tails):>8.2f}{size:>12}")
+
+
+if __name__ == "__main__":
+    main()
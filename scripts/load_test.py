@@ -0,0 +1,99 @@
+"""Measure retrieval throughput and memory as worker processes are added.
+
+Each worker maps the shared index read-only and runs the engine's retrieval
+step (k-NN search plus document reads) with query vectors derived from the
+stored vectors, so no embedding API calls are made. With --threads, each
+worker has that many concurrent callers, whose searches are micro-batched
+when BATCH_ENABLED.
+
+Usage:
+    python scripts/load_test.py [--workers 1 2 4] [--threads 1] [--duration 10] [--k 100]
+"""
+import argparse
+import multiprocessing as mp
+import sys
+import time
+from pathlib import Path
+
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+
+def read_memory():
+    """RSS split into private (anonymous) and shared file-backed pages, in MiB"""
+    fields = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "RssAnon", "RssFile"):
+                fields[key] = int(value.split()[0]) / 1024
+    return fields
+
+
+def worker(duration, k, threads, results):
+    import threading
+
+    import faiss
+    import numpy as np
+    from src.data.shared_index import SharedIndexManager, get_search_batcher
+
+    faiss.omp_set_num_threads(1)
+    index = SharedIndexManager().current()
+    rng = np.random.default_rng()
+    sample = rng.integers(0, index.index.ntotal, size=64)
+    queries = np.stack([index.index.reconstruct(int(i)) for i in sample]).astype(np.float32)
+    queries += rng.normal(0, 0.01, queries.shape).astype(np.float32)
+
+    counts = [0] * threads
+    deadline = time.perf_counter() + duration
+
+    def caller(slot):
+        while time.perf_counter() < deadline:
+            docs = index.similarity_search_by_vector(queries[(counts[slot] * threads + slot) % len(queries)], k)
+            sum(len(doc.page_content) for doc in docs)
+            counts[slot] += 1
+
+    callers = [threading.Thread(target=caller, args=(slot,)) for slot in range(threads)]
+    for thread in callers:
+        thread.start()
+    for thread in callers:
+        thread.join()
+    results.put((sum(counts), read_memory(), get_search_batcher().stats()["mean_batch"]))
+
+
+def run(workers, threads, duration, k):
+    ctx = mp.get_context("spawn")
+    results = ctx.Queue()
+    processes = [ctx.Process(target=worker, args=(duration, k, threads, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return (sum(done for done, _, _ in reports) / duration, [memory for _, memory, _ in reports],
+            sum(batch for _, _, batch in reports) / len(reports))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--threads", type=int, default=1, help="concurrent callers per worker")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--k", type=int, default=100)
+    args = parser.parse_args()
+    from src.chatbot.scheduler import describe_limits
+
+    print(f"{'workers':>8}{'queries/s':>12}{'scaling':>9}{'RSS MiB':>10}{'private':>10}{'shared':>10}{'batch':>7}")
+    baseline = None
+    for count in args.workers:
+        throughput, memory, batch = run(count, args.threads, args.duration, args.k)
+        baseline = baseline or throughput / count
+        avg = {key: sum(m.get(key, 0) for m in memory) / len(memory) for key in ("VmRSS", "RssAnon", "RssFile")}
+        print(f"{count:>8}{throughput:>12.1f}{throughput / baseline / count:>9.2f}"
+              f"{avg['VmRSS']:>10.1f}{avg['RssAnon']:>10.1f}{avg['RssFile']:>10.1f}{batch:>7.1f}")
+        print(f"{'':>8}{describe_limits(count)}")
+
+
+if __name__ == "__main__":
+    main()
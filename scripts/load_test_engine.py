@@ -0,0 +1,115 @@
+"""Load-test the engine service directly, without Streamlit in the path.
+
+Each client thread sends the benchmark queries in turn to a running engine
+(scripts/run_engine.py) and records the latency of the full answer; with
+--stream it also records the time to the first event of the SSE endpoint.
+
+Usage:
+    python scripts/load_test_engine.py [--url http://127.0.0.1:8700] [--clients 1 4 8] [--duration 30]
+                                       [--stream] [--vary]
+"""
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.config import Config
+from src.chatbot.client import read_events
+
+BENCHMARK_QUERIES = [
+    "¿Qué servicios ofrecen para el sector industrial?",
+    "¿Cuál es el proceso de limpieza de trampas de grasa?",
+    "¿Qué sectores demandan más el servicio de disposición de lodos?",
+    "¿Cómo funciona el servicio de video inspección?",
+    "¿Qué ventajas tiene RAESA frente a la competencia?",
+    "Compara la demanda de restaurantes y centros comerciales",
+    "¿Cuáles son las oportunidades para RAESA?",
+]
+
+
+def request(url, query, user_id, stream):
+    """(seconds to first event or None, seconds to full answer, ok)"""
+    path = "/v1/chat/stream" if stream else "/v1/chat"
+    body = json.dumps({"message": query, "user_id": user_id, "deadline": None}).encode("utf-8")
+    start = time.perf_counter()
+    req = urllib.request.Request(url + path, data=body, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=Config.RESPONSE_FINAL_WAIT) as response:
+        if not stream:
+            ok = "response" in json.loads(response.read())
+            return None, time.perf_counter() - start, ok
+        first = None
+        for event, _ in read_events(response):
+            if first is None:
+                first = time.perf_counter() - start
+            if event in ("done", "error"):
+                return first, time.perf_counter() - start, event == "done"
+    return first, time.perf_counter() - start, False
+
+
+def run(url, clients, duration, stream, vary):
+    rows, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(slot):
+        i = slot
+        while time.perf_counter() < deadline:
+            try:
+                query = BENCHMARK_QUERIES[i % len(BENCHMARK_QUERIES)]
+                row = request(url, f"{query} ({slot}-{i})" if vary else query, f"load-{slot}", stream)
+            except OSError as e:
+                print(f"client {slot}: {e}")
+                row = (None, 0.0, False)
+            with lock:
+                if row[2]:
+                    rows.append(row)
+                else:
+                    errors[0] += 1
+            i += 1
+
+    threads = [threading.Thread(target=client, args=(slot,)) for slot in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return rows, errors[0], time.perf_counter() - start
+
+
+def percentile(values, q):
+    return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else (values[0] if values else 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=Config.ENGINE_URL or f"http://{Config.ENGINE_HOST}:{Config.ENGINE_PORT}")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--duration", type=float, default=30, help="seconds per client count")
+    parser.add_argument("--stream", action="store_true", help="use the SSE endpoint")
+    parser.add_argument("--vary", action="store_true",
+                        help="make every query unique so the response cache cannot answer it")
+    args = parser.parse_args()
+    url = args.url.rstrip("/")
+
+    with urllib.request.urlopen(url + "/healthz", timeout=10) as response:
+        print(f"Engine {url}: {json.loads(response.read())}")
+
+    print(f"{'clients':>8}{'req/s':>9}{'p50 s':>8}{'p95 s':>8}{'first p50':>11}{'errors':>8}")
+    for clients in args.clients:
+        rows, errors, elapsed = run(url, clients, args.duration, args.stream, args.vary)
+        totals = [row[1] for row in rows]
+        firsts = [row[0] for row in rows if row[0] is not None]
+        print(f"{clients:>8}{len(rows) / elapsed:>9.2f}{percentile(totals, 50):>8.2f}{percentile(totals, 95):>8.2f}"
+              f"{(percentile(firsts, 50) if firsts else float('nan')):>11.2f}{errors:>8}")
+
+
+if __name__ == "__main__":
+    main()
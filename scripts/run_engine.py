@@ -0,0 +1,37 @@
+"""Run the chatbot engine as a standalone HTTP service (JSON and server-sent events).
+
+Point the Streamlit app at it with ENGINE_URL=http://HOST:PORT, so UI workers
+and engine workers scale separately. Endpoints: POST /v1/chat,
+POST /v1/chat/stream, GET /healthz, GET /metrics (see src/chatbot/service.py).
+
+Usage:
+    python scripts/run_engine.py [--host 127.0.0.1] [--port 8700]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.config import Config
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=Config.ENGINE_HOST)
+    parser.add_argument("--port", type=int, default=Config.ENGINE_PORT)
+    args = parser.parse_args()
+
+    from src.chatbot.service import create_server
+    server = create_server(args.host, args.port)
+    print(f"Engine listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
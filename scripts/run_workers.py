@@ -0,0 +1,103 @@
+"""Run several Streamlit worker processes behind a local TCP balancer.
+
+All workers map the same shared index under Config.SHARED_INDEX_DIR, so each
+extra worker only adds its private interpreter memory. Clients are pinned to a
+worker by IP because Streamlit keeps sessions and media files (downloads) in
+the memory of the process that created them.
+
+Usage:
+    python scripts/run_workers.py --workers 4 [--port 8501] [--base-port 8601]
+"""
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import zlib
+from pathlib import Path
+
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.config import Config
+from src.chatbot.scheduler import describe_limits
+
+
+def ensure_shared_index():
+    """Publish the shared index once, before any worker starts"""
+    from src.data.embeddings import EmbeddingManager
+    manager = EmbeddingManager().load_shared_index()
+    print(f"Shared index version: {manager.version}")
+
+
+def start_workers(count, base_port):
+    # The LLM limits are totals for the deployment; each worker enforces its share
+    env = {**os.environ, "LLM_PROCESSES": str(count)}
+    print(describe_limits(count))
+    workers = []
+    for i in range(count):
+        port = base_port + i
+        workers.append(subprocess.Popen([
+            sys.executable, "-m", "streamlit", "run", str(Path(project_root) / "src" / "main.py"),
+            "--server.port", str(port),
+            "--server.address", "127.0.0.1",
+            "--server.headless", "true",
+        ], env=env))
+        print(f"Worker {i} listening on 127.0.0.1:{port} (pid {workers[-1].pid})")
+    return workers
+
+
+async def pipe(reader, writer):
+    try:
+        while data := await reader.read(65536):
+            writer.write(data)
+            await writer.drain()
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(port, backends):
+    async def handle(client_reader, client_writer):
+        peer_ip = (client_writer.get_extra_info("peername") or ("",))[0]
+        backend = backends[zlib.crc32(peer_ip.encode()) % len(backends)]
+        try:
+            upstream_reader, upstream_writer = await asyncio.open_connection("127.0.0.1", backend)
+        except OSError:
+            client_writer.close()
+            return
+        await asyncio.gather(pipe(client_reader, upstream_writer), pipe(upstream_reader, client_writer))
+
+    server = await asyncio.start_server(handle, "0.0.0.0", port)
+    print(f"Balancer listening on 0.0.0.0:{port} -> ports {backends}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=Config.WORKER_COUNT)
+    parser.add_argument("--port", type=int, default=8501, help="public balancer port")
+    parser.add_argument("--base-port", type=int, default=8601, help="first worker port")
+    args = parser.parse_args()
+
+    ensure_shared_index()
+    workers = start_workers(args.workers, args.base_port)
+
+    def shutdown(*_):
+        for worker in workers:
+            worker.terminate()
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    try:
+        asyncio.run(serve(args.port, [args.base_port + i for i in range(args.workers)]))
+    except KeyboardInterrupt:
+        shutdown()
+
+
+if __name__ == "__main__":
+    main()
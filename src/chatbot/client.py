@@ -0,0 +1,129 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import Future
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import sys
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.config import Config
+
+REQUEST_ERROR = "Lo siento, hubo un error al procesar tu solicitud. Por favor, intenta de nuevo."
+
+
+def read_events(stream) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """(event, data) pairs from a server-sent-events response"""
+    event, data = "message", []
+    for raw in stream:
+        line = raw.decode("utf-8").rstrip("\r\n")
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].strip())
+
+
+class EngineClient:
+    """Thin client of the engine service, with the RAESAChatbot methods the Streamlit app calls.
+
+    The Streamlit process then holds no index, LLM client or engine threads;
+    retrieval and generation run in the engine service (scripts/run_engine.py).
+    """
+
+    def __init__(self, base_url: str = Config.ENGINE_URL,
+                 timeout: float = Config.RESPONSE_DEADLINE + Config.RESPONSE_FINAL_WAIT):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _post(self, path: str, body: Dict[str, Any]):
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=json.dumps(body, ensure_ascii=False).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+    def get_response(self, user_input: str, message_history: Optional[List[Dict[str, str]]] = None,
+                     user_id: Optional[str] = None) -> str:
+        """Full answer from the JSON endpoint"""
+        try:
+            with self._post("/v1/chat", {"message": user_input, "history": message_history or [],
+                                         "user_id": user_id}) as response:
+                return json.loads(response.read())["response"]
+        except urllib.error.HTTPError as e:
+            # 429: the engine's scheduler rejected the query; its message tells the user to wait
+            error = self._error_message(e)
+            print(f"Engine request failed: {e.code} {error}")
+            return f"<p>⏳ {error}</p>" if e.code == 429 and error else REQUEST_ERROR
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            print(f"Engine request failed: {e}")
+            return REQUEST_ERROR
+
+    @staticmethod
+    def _error_message(error: urllib.error.HTTPError) -> Optional[str]:
+        """The "error" field of an engine error response, if it has one"""
+        try:
+            return json.loads(error.read()).get("error")
+        except (OSError, ValueError, AttributeError):
+            return None
+
+    def get_response_within(self, user_input: str, message_history: Optional[List[Dict[str, str]]] = None,
+                            user_id: Optional[str] = None,
+                            deadline: float = Config.RESPONSE_DEADLINE) -> Tuple[str, Optional[Future]]:
+        """Like RAESAChatbot.get_response_within, over the streaming endpoint.
+
+        Returns the full answer, or the engine's preliminary answer and a
+        future of the full one, which is read from the rest of the stream.
+        """
+        try:
+            stream = self._post("/v1/chat/stream", {"message": user_input, "history": message_history or [],
+                                                    "user_id": user_id, "deadline": deadline})
+        except (urllib.error.URLError, OSError) as e:
+            print(f"Engine request failed: {e}")
+            return REQUEST_ERROR, None
+
+        events = read_events(stream)
+        try:
+            for event, data in events:
+                if event in ("done", "error"):
+                    stream.close()
+                    return data["html"], None
+                if event == "preliminary":
+                    pending: Future = Future()
+                    threading.Thread(target=self._finish, args=(stream, events, pending),
+                                     name="engine-stream", daemon=True).start()
+                    return data["html"], pending
+        except (OSError, ValueError) as e:
+            print(f"Engine stream failed: {e}")
+        stream.close()
+        return REQUEST_ERROR, None
+
+    @staticmethod
+    def _finish(stream, events, pending: Future):
+        try:
+            for event, data in events:
+                if event in ("done", "error"):
+                    pending.set_result(data["html"] if event == "done" else None)
+                    return
+            pending.set_result(None)
+        except Exception as e:
+            pending.set_exception(e)
+        finally:
+            stream.close()
+
+    def wait_for_final(self, pending: Future, timeout: float = Config.RESPONSE_FINAL_WAIT) -> Optional[str]:
+        """Full answer of a degraded response, or None if it failed or is still late"""
+        try:
+            return pending.result(timeout)
+        except Exception as e:
+            print(f"Full answer did not arrive: {e!r}")
+            return None
@@ -0,0 +1,140 @@
+import hashlib
+import re
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import sys
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.config import Config
+from src.chatbot.policy import StagePolicy
+from src.data.filters import fold
+
+SECTION_LABELS = {
+    "servicios": "Servicios",
+    "areas_cobertura": "Áreas de cobertura",
+    "ventajas_competitivas": "Ventajas competitivas",
+}
+# A passage line "Contenido: texto" and the section entry "texto" are the same text for de-duplication
+LABEL = re.compile(r'^[^\W\d_][\w ]{0,30}:\s*')
+# Shorter lines (field headers, titles) are context for their passage, not content to de-duplicate
+MIN_DEDUP_CHARS = 40
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def load_encoding():
+    """The configured tiktoken encoding, or None when tiktoken or its data is unavailable.
+
+    The encoding file is fetched once into TIKTOKEN_CACHE_DIR; without it
+    count_tokens estimates from length and the context budget is approximate.
+    """
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        with _encoding_lock:
+            if not _encoding_loaded:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding(Config.CONTEXT_ENCODING)
+                except Exception as e:
+                    print(f"Token encoding {Config.CONTEXT_ENCODING} unavailable ({type(e).__name__}); "
+                          f"estimating tokens as characters / 4, so CONTEXT_TOKEN_BUDGET is approximate. "
+                          f"Install tiktoken, or copy the tiktoken cache of a host that fetched the encoding "
+                          f"to {Config.TIKTOKEN_CACHE_DIR}")
+                _encoding_loaded = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Tokens in `text`, counted locally with tiktoken when available"""
+    encoding = load_encoding()
+    if encoding is None:
+        return StagePolicy.estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _key(line: str) -> str:
+    return hashlib.sha1(fold(LABEL.sub("", line)).encode("utf-8")).hexdigest()
+
+
+class ContextBuilder:
+    """Assembles the prompt context from retrieved documents and DataBook sections.
+
+    Every line is hashed so text that reaches the prompt through several
+    sources (a retrieved DataBook item and its section, overlapping chunks)
+    is sent once. Parts are added in CONTEXT_PRIORITY order until the token
+    budget is spent; what was left out is returned as a report.
+    """
+
+    def __init__(self, token_budget: int = Config.CONTEXT_TOKEN_BUDGET,
+                 priority: Sequence[str] = tuple(Config.CONTEXT_PRIORITY)):
+        self.token_budget = token_budget
+        self.priority = list(priority)
+
+    def build(self, user_input: str, docs: Sequence[Any],
+              sections: Optional[Dict[str, List[str]]] = None) -> Tuple[str, Dict[str, Any]]:
+        """Context text and a report: tokens used, duplicates removed and parts dropped"""
+        seen = set()
+        report: Dict[str, Any] = {"tokens": 0, "budget": self.token_budget, "parts": 0,
+                                  "duplicate_lines": 0, "dropped": []}
+        header = f"Consulta del usuario: {user_input}"
+        used = count_tokens(header)
+        blocks: Dict[str, List[str]] = {}
+
+        for source, text in self._candidates(docs, sections or {}):
+            whole = _key(text)
+            if whole in seen:
+                report["dropped"].append({"source": source, "reason": "duplicate", "tokens": 0})
+                continue
+            seen.add(whole)
+            lines, duplicates = [], 0
+            for line in (line.strip() for line in text.splitlines()):
+                if not line:
+                    continue
+                if len(line) >= MIN_DEDUP_CHARS:
+                    key = _key(line)
+                    if key in seen:
+                        duplicates += 1
+                        continue
+                    seen.add(key)
+                lines.append(line)
+            report["duplicate_lines"] += duplicates
+            # A passage whose content was all sent already adds nothing but its headers
+            if duplicates and not any(len(line) >= MIN_DEDUP_CHARS for line in lines):
+                report["dropped"].append({"source": source, "reason": "duplicate", "tokens": 0})
+                continue
+            part = "\n".join(lines) if source == "documentos" else "- " + " ".join(lines)
+            tokens = count_tokens(part) + 1
+            if used + tokens > self.token_budget:
+                report["dropped"].append({"source": source, "reason": "budget", "tokens": tokens})
+                continue
+            used += tokens
+            blocks.setdefault(source, []).append(part)
+            report["parts"] += 1
+
+        text = [header]
+        if blocks.get("documentos"):
+            text.append("Información relevante de servicios:\n" + "\n\n".join(blocks["documentos"]))
+        section_text = [f"{SECTION_LABELS.get(name, name)}:\n" + "\n".join(parts)
+                        for name, parts in blocks.items() if name != "documentos"]
+        if section_text:
+            text.append("Contexto de RAESA:\n" + "\n".join(section_text))
+        context = "\n\n".join(text)
+        report["tokens"] = count_tokens(context)
+        return context, report
+
+    def _candidates(self, docs: Sequence[Any], sections: Dict[str, List[str]]):
+        """(source, text) pairs in priority order; documents keep their ranking"""
+        for source in self.priority:
+            if source == "documentos":
+                for doc in docs:
+                    yield source, doc.page_content
+            else:
+                for content in sections.get(source, []):
+                    yield source, content
@@ -1,9 +1,14 @@
 from anthropic import Anthropic
 from pathlib import Path
 import json
-from typing import List, Optional, Dict, Any
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 import re
 import sys
+import hashlib
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
 from pathlib import Path
 
 # Add the project root to Python path
@@ -12,48 +17,361 @@ if project_root not in sys.path:
     sys.path.append(project_root)
 
 from src.config import Config
-from src.data.loader import DataLoader
+from src.data.shared_index import SharedIndexManager
+from src.data.build import section_index
+from src.data.chunking import expand_window, split_text
+from src.data.filters import query_scope
+from src.chatbot.scheduler import QueueFullError, get_scheduler
+from src.chatbot.singleflight import get_single_flight
+from src.chatbot.policy import StagePolicy
+from src.chatbot.metrics import get_latency_recorder
+from src.chatbot.reranker import LocalReranker
+from src.chatbot.fallback import extractive_answer
+from src.chatbot.cache import get_response_cache
+from src.chatbot.context import ContextBuilder
+from src.chatbot.formatting import ParagraphSegmenter, format_locally
 
 class RAESAChatbot:
-    def __init__(self, vectorstore):
+    GENERATION_ERROR = "Lo siento, hubo un error al generar la respuesta. Por favor, intenta de nuevo."
+
+    def __init__(self, vectorstore, scheduler=None):
         self.vectorstore = vectorstore
-        self.anthropic = Anthropic(api_key=Config.ANTHROPIC_API_KEY)
-        self.data_loader = DataLoader(Config.DATA_PATH)
-        self.df = self.data_loader.load_data()
-        
-        # Load RAESA data
-        raesa_data_path = Path(Config.RAESA_DATA_PATH)
-        with open(raesa_data_path, 'r', encoding='utf-8') as f:
-            self.raesa_data = json.load(f)
+        # Bounded per-call timeout instead of the SDK's 10 minute default
+        self.anthropic = Anthropic(api_key=Config.ANTHROPIC_API_KEY, timeout=Config.LLM_REQUEST_TIMEOUT)
+        self.scheduler = scheduler or get_scheduler()
+        self.single_flight = get_single_flight()
+        self.response_cache = get_response_cache()
+        self.policy = StagePolicy()
+        self.latency = get_latency_recorder()
+        self.last_timings: Dict[str, float] = {}
+        self.reranker = LocalReranker() if Config.RERANK_ENABLED else None
+        self.last_rerank: Dict[str, Any] = {}
+        self.context_builder = ContextBuilder()
+        self.last_context_tokens = 0
+        self.last_context: Dict[str, Any] = {}
+        self.last_scope: Dict[str, List[str]] = {}
+        self.shared = isinstance(vectorstore, SharedIndexManager)
+        if self.shared:
+            # Data caches are memory-mapped from the shared index version
+            self.data_loader = None
+            self._df = None
+            self._raesa_data = None
+            self._sections = None
+            self._data_version = None
+        else:
+            from src.data.loader import DataLoader  # pandas is only needed without the shared index
+            self.data_loader = DataLoader(Config.DATA_PATH)
+            self._df = self.data_loader.load_data()
+            
+            # Load RAESA data
+            raesa_data_path = Path(Config.RAESA_DATA_PATH)
+            with open(raesa_data_path, 'r', encoding='utf-8') as f:
+                self._raesa_data = json.load(f)
+            
+            self._sections = section_index(self._raesa_data)
+            self._data_version = self._compute_data_version()
+
+    @property
+    def df(self):
+        return self.vectorstore.current().table("real_estate") if self.shared else self._df
+
+    @property
+    def raesa_data(self):
+        return self.vectorstore.current().table("databook").rows() if self.shared else self._raesa_data
 
-    def get_response(self, user_input: str, message_history: Optional[List[Dict[str, str]]] = None) -> str:
+    @property
+    def data_version(self) -> str:
+        return self.vectorstore.version if self.shared else self._data_version
+
+    def get_response(self, user_input: str, message_history: Optional[List[Dict[str, str]]] = None,
+                     user_id: Optional[str] = None) -> str:
         """Get response using full context"""
+        response, pending = self._respond(user_input, message_history, user_id, None)
+        # A coalesced caller may have joined a run that degraded; wait for the full answer
+        return pending.result() if pending is not None else response
+
+    def get_response_within(self, user_input: str, message_history: Optional[List[Dict[str, str]]] = None,
+                            user_id: Optional[str] = None,
+                            deadline: float = Config.RESPONSE_DEADLINE) -> Tuple[str, Optional[Future]]:
+        """Answer within `deadline` seconds; returns (response, pending).
+
+        If the LLM misses the deadline, `response` is an extractive answer
+        composed locally and `pending` the future of the full one (see
+        wait_for_final). Otherwise `pending` is None.
+        """
+        return self._respond(user_input, message_history, user_id, time.monotonic() + deadline)
+
+    def wait_for_final(self, pending: Future, timeout: float = Config.RESPONSE_FINAL_WAIT) -> Optional[str]:
+        """Full answer of a degraded response, or None if it failed or is still late"""
+        try:
+            response = pending.result(timeout)
+        except Exception as e:
+            print(f"Full answer did not arrive: {e!r}")
+            return None
+        return None if response == self.GENERATION_ERROR else response
+
+    def _respond(self, user_input: str, message_history: Optional[List[Dict[str, str]]],
+                 user_id: Optional[str], deadline: Optional[float]) -> Tuple[str, Optional[Future]]:
         try:
             # Check for greetings first
             if self._is_greeting(user_input):
-                return self.get_welcome_message()
-            
-            # Get relevant documents with higher k value
-            relevant_docs = self.vectorstore.similarity_search(user_input, k=100)
-            
-            # Create rich context
-            context = self._create_rich_context(relevant_docs, user_input)
-            
-            # Generate response using Claude
-            response = self.generate_response_with_context(user_input, context, message_history)
+                return self.get_welcome_message(), None
             
-            # Clean the response before returning it
-            cleaned_response = self.clean_response(response)
-            
-            # Asegurarse de que no tenga el TextBlock wrapper
-            if "TextBlock(text='" in cleaned_response:
-                cleaned_response = cleaned_response.replace("TextBlock(text='", "").replace("', type='text')", "")
-            
-            return cleaned_response
+            key = (self._normalize_query(user_input), self.data_version, self._history_key(message_history))
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                print(f"Response cache hit for: {key[0]!r}")
+                return cached, None
+
+            # Identical concurrent queries share a single retrieval + generation run. A scheduler
+            # rejection is about the leader's user (e.g. its queue depth), so followers retry on their own
+            result, leader = self.single_flight.do(
+                key, lambda: self._answer(user_input, message_history, user_id, deadline),
+                rerun_on=(QueueFullError,)
+            )
+            if not leader:
+                print(f"Coalesced in-flight request for: {key[0]!r}")
+            response, pending = result
+            if leader and pending is None:
+                self._cache_response(key, response)
+            elif leader:
+                # Not the degraded answer, but the full one once it arrives
+                def cache_final(future: Future):
+                    if future.exception() is None:
+                        self._cache_response(key, future.result())
+                pending.add_done_callback(cache_final)
+            return result
             
+        except QueueFullError as e:
+            print(f"Request rejected by scheduler: {e} (queued={e.queued})")
+            return f"<p>⏳ {e}</p>", None
         except Exception as e:
             print(f"Error generating response: {e}")
-            return "Lo siento, hubo un error al procesar tu solicitud. Por favor, intenta de nuevo."
+            return "Lo siento, hubo un error al procesar tu solicitud. Por favor, intenta de nuevo.", None
+
+    def _cache_response(self, key, response: str):
+        # Failed answers are not worth repeating
+        if response and response != self.GENERATION_ERROR:
+            self.response_cache.put(key, response)
+
+    def _answer(self, user_input: str, message_history: Optional[List[Dict[str, str]]] = None,
+                user_id: Optional[str] = None, deadline: Optional[float] = None) -> Tuple[str, Optional[Future]]:
+        """Run retrieval and generation for a single query; falls back locally past `deadline`"""
+        self.last_timings = {}
+        pending = None
+        with self.latency.time("total", self.last_timings):
+            context, relevant_docs, sections = self._prepare(user_input)
+            
+            # Generate response using Claude
+            if deadline is None:
+                response = self._generate(user_input, context, message_history, user_id)
+            else:
+                pending = get_generation_pool().submit(self._generate, user_input, context, message_history, user_id)
+                try:
+                    response, pending = pending.result(timeout=max(0.0, deadline - time.monotonic())), None
+                except FutureTimeout:
+                    # A full queue rejects at once, so QueueFullError still reaches _respond
+                    with self.latency.time("fallback", self.last_timings):
+                        response = extractive_answer(user_input, relevant_docs, sections)
+                    print("LLM missed the response deadline, returning the extractive answer")
+        print("Stage timings: " + ", ".join(f"{stage}={seconds:.2f}s" for stage, seconds in self.last_timings.items()))
+        return response, pending
+
+    def _prepare(self, user_input: str) -> Tuple[str, List[Any], Dict[str, List[str]]]:
+        """Retrieval, re-ranking and context assembly: (context, documents, DataBook sections)"""
+        # Pin one index version so a hot-swap mid-request cannot mix versions
+        snapshot = self.vectorstore.current() if self.shared else self.vectorstore
+        sections = snapshot.sections() if self.shared else self._sections
+
+        # Get relevant documents with higher k value
+        with self.latency.time("retrieval", self.last_timings):
+            scored_docs = self._retrieve(snapshot, user_input)
+        if self.last_scope:
+            print(f"Search scoped to {self.last_scope}")
+        
+        # Keep the most relevant, non-duplicate documents that fit the context budget
+        if self.reranker is not None:
+            with self.latency.time("rerank", self.last_timings):
+                relevant_docs, self.last_rerank = self.reranker.rerank(
+                    user_input, scored_docs, snapshot.vectors if self.shared else None
+                )
+            print(f"Rerank kept {self.last_rerank['kept']}/{self.last_rerank['candidates']} documents, "
+                  f"{self.last_rerank['tokens']}/{self.last_rerank['candidate_tokens']} tokens")
+        else:
+            relevant_docs = [doc for doc, _ in scored_docs]
+
+        # Chunked bundles index the DataBook too: add neighbouring chunks, then use only what was retrieved
+        if self.shared and snapshot.manifest.get("chunk_max_tokens"):
+            relevant_docs = expand_window(relevant_docs, snapshot)
+            relevant_docs, sections = self._split_databook(relevant_docs)
+        
+        # Create rich context
+        with self.latency.time("context", self.last_timings):
+            context = self._create_rich_context(relevant_docs, user_input, sections)
+        self.last_context_tokens = self.last_context["tokens"]
+        dropped = self.last_context["dropped"]
+        print(f"Context {self.last_context_tokens}/{self.last_context['budget']} tokens, "
+              f"{self.last_context['duplicate_lines']} duplicate lines removed, "
+              f"{sum(d['reason'] == 'duplicate' for d in dropped)} duplicate and "
+              f"{sum(d['reason'] == 'budget' for d in dropped)} over-budget parts dropped")
+        return context, relevant_docs, sections
+
+    def stream_response(self, user_input: str, message_history: Optional[List[Dict[str, str]]] = None,
+                        user_id: Optional[str] = None,
+                        deadline: Optional[float] = Config.RESPONSE_DEADLINE) -> Iterator[Tuple[str, str]]:
+        """("segment" | "preliminary" | "done", html) events for one query, as they become available.
+
+        Formatted segments are sent while generation is still running. If none
+        has arrived within `deadline` seconds a "preliminary" extractive answer
+        is sent, and the segments follow. "done" carries the full response.
+
+        Concurrent identical queries, streamed or not, share one generation
+        through the single-flight group. A follower gets no segments: it sends
+        its preliminary answer at the deadline and "done" once the leader ends.
+        """
+        if self._is_greeting(user_input):
+            yield "done", self.get_welcome_message()
+            return
+        key = (self._normalize_query(user_input), self.data_version, self._history_key(message_history))
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            yield "done", cached
+            return
+
+        self.last_timings = {}
+        start = time.perf_counter()
+        context, relevant_docs, sections = self._prepare(user_input)
+        events: "queue.Queue[Tuple[str, Any]]" = queue.Queue()
+
+        def produce() -> Tuple[str, Optional[Future]]:
+            # Only the leader (or a follower re-running after a rejection) generates
+            parts = []
+            if Config.PIPELINE_MODE == "sequential":
+                segments = [self.generate_response_with_context(user_input, context, message_history, user_id)]
+            else:
+                segments = self.stream_formatted_response(user_input, context, message_history, user_id)
+            for segment in segments:
+                parts.append(segment)
+                events.put(("segment", segment))
+            return self.clean_response("".join(parts)), None
+
+        def run():
+            try:
+                events.put(("result", self.single_flight.do(key, produce, rerun_on=(QueueFullError,))))
+            except BaseException as e:
+                events.put(("error", e))
+
+        # A follower blocks until its leader ends, so it must not hold a pool thread the leader may need
+        threading.Thread(target=run, name="llm-stream", daemon=True).start()
+        limit = time.monotonic() + deadline if deadline else None
+        preliminary = None
+        while True:
+            try:
+                kind, item = events.get(timeout=None if limit is None else max(0.0, limit - time.monotonic()))
+            except queue.Empty:
+                with self.latency.time("fallback", self.last_timings):
+                    preliminary = extractive_answer(user_input, relevant_docs, sections)
+                yield "preliminary", preliminary
+                limit = None
+                continue
+            if kind == "error":
+                raise item
+            if kind == "result":
+                break
+            limit = None
+            yield "segment", item
+
+        (response, pending), leader = item
+        if not leader:
+            print(f"Coalesced in-flight request for: {key[0]!r}")
+            if pending is not None:
+                # The leader answered from the fallback; its full answer is still being generated
+                if preliminary is None:
+                    yield "preliminary", response
+                response = self.wait_for_final(pending) or self.GENERATION_ERROR
+        self.latency.record("total", time.perf_counter() - start)
+        if leader:
+            self._cache_response(key, response)
+        yield "done", response
+
+    def _retrieve(self, snapshot, user_input: str) -> List[Tuple[Any, float]]:
+        """Scored documents for a query from a pinned index snapshot"""
+        if not self.shared:
+            return snapshot.similarity_search_with_score(user_input, k=Config.RETRIEVAL_K)
+        # Narrow the shards to the sector, service or market the query names
+        self.last_scope = query_scope(user_input, snapshot.filters())
+        return snapshot.similarity_search_sharded(user_input, Config.RETRIEVAL_K, self.last_scope)
+
+    def warm_up(self, queries: List[str], generate: bool = False) -> Dict[str, float]:
+        """Pre-compute embeddings and retrieval results for common queries, optionally their answers.
+
+        The embeddings are one batched request. Answers go through the normal
+        path, so they land in the response cache under a fresh conversation's key.
+        """
+        timings = {}
+        if self.shared:
+            start = time.perf_counter()
+            snapshot = self.vectorstore.current()
+            snapshot.embed_queries(queries)
+            timings["embeddings"] = time.perf_counter() - start
+            start = time.perf_counter()
+            for query in queries:
+                self._retrieve(snapshot, query)
+            timings["retrieval"] = time.perf_counter() - start
+        if generate:
+            start = time.perf_counter()
+            for query in queries:
+                self.get_response(query, user_id="warmup")
+            timings["answers"] = time.perf_counter() - start
+        return timings
+
+    def _generate(self, user_input: str, context: str, message_history: Optional[List[Dict[str, str]]] = None,
+                  user_id: Optional[str] = None) -> str:
+        response = self.generate_response_with_context(user_input, context, message_history, user_id)
+        
+        # Clean the response before returning it
+        cleaned_response = self.clean_response(response)
+        
+        # Asegurarse de que no tenga el TextBlock wrapper
+        if "TextBlock(text='" in cleaned_response:
+            cleaned_response = cleaned_response.replace("TextBlock(text='", "").replace("', type='text')", "")
+        
+        return cleaned_response
+
+    @staticmethod
+    def _normalize_query(text: str) -> str:
+        """Normalize a query so trivially different spellings share a key"""
+        text = re.sub(r'\s+', ' ', text.strip().lower())
+        return text.strip('¿?¡!.,;: ')
+
+    @staticmethod
+    def _history_key(message_history: Optional[List[Dict[str, str]]]) -> str:
+        """Digest of the history window that reaches the prompt"""
+        if not message_history:
+            return ""
+        window = message_history[-Config.HISTORY_WINDOW:]
+        # Assistant messages before the first user turn are the per-user welcome
+        # banner; they should not keep fresh conversations from coalescing
+        first_user = next((i for i, msg in enumerate(window) if msg['role'] == 'user'), len(window))
+        window = window[first_user:]
+        if not window:
+            return ""
+        digest = hashlib.sha1()
+        for msg in window:
+            digest.update(f"{msg['role']}\x00{msg['content']}\x00".encode('utf-8'))
+        return digest.hexdigest()
+
+    @staticmethod
+    def _compute_data_version() -> str:
+        """Fingerprint of the data files and index backing the answers"""
+        parts = []
+        for path in (Path(Config.DATA_PATH), Path(Config.RAESA_DATA_PATH), Config.EMBEDDINGS_CACHE / "index.faiss"):
+            try:
+                stat = path.stat()
+                parts.append(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}")
+            except OSError:
+                parts.append(f"{path.name}:missing")
+        return hashlib.sha1("|".join(parts).encode('utf-8')).hexdigest()[:12]
 
     def _is_greeting(self, text: str) -> bool:
         """Check if input is a greeting"""
@@ -88,28 +406,131 @@ class RAESAChatbot:
         
         <p><strong>¡Adelante! Hazme cualquier pregunta sobre nuestros servicios.</strong></p>"""
 
-    def generate_response_with_context(self, user_input: str, context: str, message_history: Optional[List[Dict[str, str]]] = None) -> str:
+    def generate_response_with_context(self, user_input: str, context: str, message_history: Optional[List[Dict[str, str]]] = None,
+                                       user_id: Optional[str] = None) -> str:
         """Generate initial response using Claude with full context"""
         try:
+            if Config.PIPELINE_MODE != "sequential":
+                return "".join(self.stream_formatted_response(user_input, context, message_history, user_id))
+
             # Get initial response
-            initial_response = self._get_initial_response(user_input, context, message_history)
+            initial_response = self._get_initial_response(user_input, context, message_history, user_id)
             
-            # Format the response through the formatting layer
-            formatted_response = self._format_response_with_ai(initial_response, user_input)
-            
-            return formatted_response
+            # Format the response through the formatting layer, in parts if it would not fit one call
+            parts = split_text(initial_response, self.policy.formatting_input_limit())
+            if len(parts) <= 1:
+                return self._format_response_with_ai(initial_response, user_input, user_id)
+            return "".join(self._format_response_with_ai(part, user_input, user_id, i) for i, part in enumerate(parts))
 
+        except QueueFullError:
+            raise
         except Exception as e:
             print(f"Error in generate_response_with_context: {e}")
-            return "Lo siento, hubo un error al generar la respuesta. Por favor, intenta de nuevo."
+            return self.GENERATION_ERROR
+
+    def stream_formatted_response(self, user_input: str, context: str,
+                                  message_history: Optional[List[Dict[str, str]]] = None,
+                                  user_id: Optional[str] = None) -> Iterator[str]:
+        """Formatted HTML segments, in order, produced while the first stage is still streaming.
+
+        The first stage streams on the formatting pool and is cut into
+        paragraph segments; each finished segment is formatted concurrently
+        (locally with PIPELINE_MODE=local), so the total latency approaches
+        max(generation, formatting) instead of their sum.
+
+        Only the first stage is admitted as a new request of `user_id`; the
+        formatting calls are follow-ups of it, at most PIPELINE_MAX_SEGMENTS
+        of them (the last one takes all the remaining text). A segment whose
+        formatting call is rejected or fails is formatted locally instead.
+        """
+        segments: "queue.Queue[Optional[Tuple[str, Future]]]" = queue.Queue()
+        segmenter = ParagraphSegmenter()
+        pool = get_formatting_pool()
+        finished = {}
+        submitted = []
+        held = []
+
+        def submit(segment: str):
+            if Config.PIPELINE_MODE == "local":
+                future = Future()
+                future.set_result(format_locally(segment))
+            else:
+                future = pool.submit(self._format_response_with_ai, segment, user_input, user_id, len(submitted))
+            submitted.append(segment)
+            segments.put((segment, future))
+
+        def on_text(text: str):
+            for segment in segmenter.feed(text):
+                if len(submitted) < Config.PIPELINE_MAX_SEGMENTS - 1:
+                    submit(segment)
+                else:
+                    held.append(segment)
+
+        def first_stage():
+            try:
+                self._get_initial_response(user_input, context, message_history, user_id, on_text=on_text)
+                rest = "\n\n".join(held + [segmenter.flush() or ""]).strip()
+                # The remaining text may be longer than one formatting call can return
+                for part in split_text(rest, self.policy.formatting_input_limit()) if rest else []:
+                    submit(part)
+            finally:
+                finished["at"] = time.perf_counter()
+                segments.put(None)
+
+        stage = pool.submit(first_stage)
+        while True:
+            item = segments.get()
+            if item is None:
+                break
+            segment, future = item
+            try:
+                yield future.result()
+            except Exception as e:
+                # The content is already generated: a rejected or failed formatting call must not lose it
+                print(f"Formatting a segment failed, formatting it locally: {e}")
+                yield format_locally(segment)
+        stage.result()
+        # How long formatting ran past the end of generation (the part not overlapped)
+        tail = time.perf_counter() - finished["at"]
+        self.latency.record("formatting_tail", tail)
+        self.last_timings["formatting_tail"] = tail
 
-    def _get_initial_response(self, user_input: str, context: str, message_history: Optional[List[Dict[str, str]]] = None) -> str:
-        """Get initial detailed response from Claude"""
+    @staticmethod
+    def _estimated_tokens(kwargs: Dict[str, Any]) -> int:
+        # ~4 characters per token is close enough for rate budgeting
+        prompt_chars = len(kwargs.get("system", "")) + sum(len(m["content"]) for m in kwargs["messages"])
+        return prompt_chars // 4
+
+    def _create_message(self, user_id: Optional[str], follow_up: bool = False, **kwargs):
+        """Send a Claude request through the shared scheduler"""
+        return self.scheduler.submit(
+            user_id,
+            self.anthropic.messages.create,
+            estimated_tokens=self._estimated_tokens(kwargs),
+            follow_up=follow_up,
+            **kwargs
+        )
+
+    def _stream_message(self, user_id: Optional[str], on_text: Callable[[str], Any], **kwargs) -> str:
+        """Stream a Claude request through the shared scheduler; text deltas go to `on_text`"""
+        def consume() -> str:
+            parts = []
+            with self.anthropic.messages.stream(**kwargs) as stream:
+                for text in stream.text_stream:
+                    parts.append(text)
+                    on_text(text)
+            return "".join(parts)
+
+        return self.scheduler.submit(user_id, consume, estimated_tokens=self._estimated_tokens(kwargs))
+
+    def _get_initial_response(self, user_input: str, context: str, message_history: Optional[List[Dict[str, str]]] = None,
+                              user_id: Optional[str] = None, on_text: Optional[Callable[[str], Any]] = None) -> str:
+        """Get initial detailed response from Claude, streamed to `on_text` if given"""
         history_text = ""
         if message_history:
             history_text = "\n".join([
                 f"User: {msg['content']}" if msg['role'] == 'user' else f"Assistant: {msg['content']}"
-                for msg in message_history[-5:]
+                for msg in message_history[-Config.HISTORY_WINDOW:]
             ])
 
         system_prompt = """Eres un experto asistente de RAESA, especializado en servicios de desazolve y gestión de residuos.
@@ -124,30 +545,47 @@ class RAESAChatbot:
         6. Enfatiza la experiencia y profesionalismo de RAESA
         7. Destaca las ventajas competitivas cuando sea relevante"""
 
-        response = self.anthropic.messages.create(
-            model=Config.MODEL_NAME,
-            max_tokens=8192,
+        params = self.policy.generation_params(user_input, context)
+        request = dict(
+            model=params["model"],
+            max_tokens=params["max_tokens"],
             temperature=0.7,
             system=system_prompt,
             messages=[{
                 "role": "user",
                 "content": f"""
                 Historial: {history_text}
-                
+            
                 Consulta: {user_input}
-                
+            
                 Contexto: {context}
-                
+            
                 Proporciona una respuesta completa y detallada sin omitir ninguna información.
                 """
             }]
         )
+        with self.latency.time("generation", self.last_timings):
+            if on_text is not None:
+                return self._stream_message(user_id, on_text, **request)
+            response = self._create_message(user_id, **request)
         
         # Acceder al contenido correctamente para Claude 3
         return response.content[0].text
 
-    def _format_response_with_ai(self, content: str, original_query: str) -> str:
-        """Format the response using basic HTML text formatting"""
+    @staticmethod
+    def _segment_note(segment: Optional[int]) -> str:
+        """Extra formatting instruction when only one part of the response is formatted"""
+        if segment is None:
+            return ""
+        note = (f"Este es el fragmento {segment + 1} de una respuesta más larga que se formatea por partes. "
+                "Formatea solo este fragmento, sin introducción ni cierre")
+        if segment == 0:
+            return note + "."
+        return note + ", sin título principal y sin repetir encabezados de fragmentos anteriores."
+
+    def _format_response_with_ai(self, content: str, original_query: str, user_id: Optional[str] = None,
+                                 segment: Optional[int] = None) -> str:
+        """Format the response (or its `segment`-th part, in pipelined mode) using basic HTML text formatting"""
         system_prompt = """Eres un experto en presentación de información clara y atractiva.
         Tu tarea es formatear la información usando elementos HTML básicos para mejorar la legibilidad.
         
@@ -183,73 +621,61 @@ class RAESAChatbot:
         <h3>💰 Detalles Comerciales</h3>
         <p>Información sobre precios y condiciones...</p>"""
 
-        response = self.anthropic.messages.create(
-            model=Config.MODEL_NAME,
-            max_tokens=8192,
-            temperature=0.7,
-            system=system_prompt,
-            messages=[{
-                "role": "user",
-                "content": f"""
-                Consulta original: {original_query}
+        params = self.policy.formatting_params(content)
+        with self.latency.time("formatting", self.last_timings):
+            # Formatting always follows a generation the scheduler already admitted
+            response = self._create_message(
+                user_id,
+                follow_up=True,
+                model=params["model"],
+                max_tokens=params["max_tokens"],
+                temperature=0.7,
+                system=system_prompt,
+                messages=[{
+                    "role": "user",
+                    "content": f"""
+                    Consulta original: {original_query}
                 
-                Información a formatear:
-                {content}
+                    Información a formatear:
+                    {content}
                 
-                Por favor, formatea esta información usando elementos HTML básicos para mejorar su legibilidad.
-                Asegúrate de:
-                1. Organizar la informaci��n en secciones claras
-                2. Resaltar datos importantes
-                3. Usar emojis relevantes
-                4. Mantener un espaciado adecuado
-                5. Crear una jerarquía visual clara
-                """
-            }]
-        )
+                    Por favor, formatea esta información usando elementos HTML básicos para mejorar su legibilidad.
+                    Asegúrate de:
+                    1. Organizar la informaci��n en secciones claras
+                    2. Resaltar datos importantes
+                    3. Usar emojis relevantes
+                    4. Mantener un espaciado adecuado
+                    5. Crear una jerarquía visual clara
+                    {self._segment_note(segment)}
+                    """
+                }]
+            )
         
+        if getattr(response, "stop_reason", None) == "max_tokens":
+            # Truncated HTML would silently lose the end of the answer; the local formatter keeps all of it
+            print(f"Formatting stopped at max_tokens ({params['max_tokens']}), formatting this part locally")
+            return format_locally(content)
         return self.clean_response(response.content[0].text)
 
-    def _create_rich_context(self, docs, user_input: str) -> str:
-        """Create rich context from documents and RAESA data"""
-        services_info = []
+    @staticmethod
+    def _split_databook(docs) -> Tuple[List[Any], Dict[str, List[str]]]:
+        """Retrieved DataBook chunks grouped like section_index; everything else stays a document"""
+        remaining, sections = [], section_index([])
         for doc in docs:
-            services_info.append(doc.page_content)
-        
-        # Extract relevant information from RAESA data
-        # Since RAESA_DataBook.json is a list of dictionaries
-        services = []
-        areas = []
-        ventajas = []
-        
-        for item in self.raesa_data:
-            if item.get("Documento") == "DataBook":
-                # Extract services information
-                if "servicios" in item.get("Sección", "").lower():
-                    services.append(item.get("Contenido", ""))
-                # Extract coverage areas
-                if "áreas" in item.get("Sección", "").lower() or "cobertura" in item.get("Sección", "").lower():
-                    areas.append(item.get("Contenido", ""))
-                # Extract competitive advantages
-                if "ventajas" in item.get("Sección", "").lower():
-                    ventajas.append(item.get("Contenido", ""))
-        
-        raesa_context = {
-            "servicios": services,
-            "areas_cobertura": areas,
-            "ventajas_competitivas": ventajas
-        }
-        
-        return f"""
-        Consulta del usuario: {user_input}
-        
-        Información relevante de servicios:
-        {' '.join(services_info)}
-        
-        Contexto de RAESA:
-        - Servicios: {json.dumps(raesa_context['servicios'], indent=2, ensure_ascii=False)}
-        - Áreas de cobertura: {json.dumps(raesa_context['areas_cobertura'], indent=2, ensure_ascii=False)}
-        - Ventajas competitivas: {json.dumps(raesa_context['ventajas_competitivas'], indent=2, ensure_ascii=False)}
-        """
+            grouped = section_index([{**doc.metadata, "Contenido": doc.page_content}]) \
+                if doc.metadata.get("source") == "databook" else {}
+            if not any(grouped.values()):
+                remaining.append(doc)
+            for name, contents in grouped.items():
+                sections[name].extend(contents)
+        return remaining, sections
+
+    def _create_rich_context(self, docs, user_input: str, sections: Optional[Dict[str, List[str]]] = None) -> str:
+        """Create rich context from documents and RAESA data, de-duplicated and within the token budget"""
+        # DataBook services, coverage areas and advantages, grouped at build time
+        raesa_context = sections if sections is not None else section_index(self.raesa_data)
+        context, self.last_context = self.context_builder.build(user_input, docs, raesa_context)
+        return context
 
     def clean_response(self, text: Any) -> str:
         """Clean and format the response text"""
@@ -283,3 +709,38 @@ class RAESAChatbot:
         return text
 
     # ... rest of the methods ...
+
+
+_generation_pool: Optional[ThreadPoolExecutor] = None
+_generation_pool_lock = threading.Lock()
+
+
+def get_generation_pool() -> ThreadPoolExecutor:
+    """Threads running LLM generations that a response deadline may stop waiting for"""
+    global _generation_pool
+    if _generation_pool is None:
+        with _generation_pool_lock:
+            if _generation_pool is None:
+                # Calls wait for a slot in the scheduler, so allow every queued request a thread
+                _generation_pool = ThreadPoolExecutor(
+                    max_workers=Config.LLM_MAX_CONCURRENT + Config.LLM_MAX_QUEUE_DEPTH,
+                    thread_name_prefix="llm-generation",
+                )
+    return _generation_pool
+
+
+_formatting_pool: Optional[ThreadPoolExecutor] = None
+_formatting_pool_lock = threading.Lock()
+
+
+def get_formatting_pool() -> ThreadPoolExecutor:
+    """Threads for pipelined first stages and segment formatting, apart from the generation pool"""
+    global _formatting_pool
+    if _formatting_pool is None:
+        with _formatting_pool_lock:
+            if _formatting_pool is None:
+                _formatting_pool = ThreadPoolExecutor(
+                    max_workers=Config.LLM_MAX_CONCURRENT + Config.LLM_MAX_QUEUE_DEPTH,
+                    thread_name_prefix="llm-formatting",
+                )
+    return _formatting_pool
@@ -0,0 +1,87 @@
+import html
+import re
+from typing import Any, Dict, List, Optional, Sequence
+import sys
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.chatbot.reranker import normalize_terms, split_fields
+
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+# Fields shown for a property document, in order
+PROPERTY_FIELDS = ("Industrial Park", "market2", "submarket2", "Available", "type", "class")
+HEADER_FIELDS = ("Documento", "Capítulo", "Sección")
+SECTION_TITLES = {
+    "servicios": "🔧 Servicios",
+    "areas_cobertura": "📍 Áreas de cobertura",
+    "ventajas_competitivas": "⭐ Ventajas competitivas",
+}
+
+
+def best_sentences(query_terms: set, text: str, limit: int = 2) -> List[str]:
+    """Sentences of `text` sharing the most terms with the query, in their original order"""
+    sentences = [s.strip() for s in SENTENCE_END.split(" ".join(text.split())) if len(s.strip()) > 20]
+    scored = [(len(query_terms & set(normalize_terms(s))), i) for i, s in enumerate(sentences)]
+    chosen = sorted(i for score, i in sorted(scored, reverse=True)[:limit] if score > 0)
+    return [_shorten(sentences[i]) for i in chosen]
+
+
+def _shorten(sentence: str, limit: int = 300) -> str:
+    return sentence if len(sentence) <= limit else sentence[:limit].rsplit(" ", 1)[0] + "…"
+
+
+def _body(text: str) -> str:
+    """Passage text without the Documento/Capítulo/Sección header lines"""
+    lines = [line for line in text.splitlines() if line.partition(":")[0].strip() not in HEADER_FIELDS]
+    return re.sub(r'^\s*Contenido:\s*', '', "\n".join(lines))
+
+
+def _property_item(fields: Dict[str, str]) -> Optional[str]:
+    name = fields.get("Building Name")
+    if not name:
+        return None
+    details = [f"{field}: {html.escape(fields[field].strip())}" for field in PROPERTY_FIELDS if fields.get(field)]
+    return f"<li><strong>{html.escape(name.strip())}</strong> — {', '.join(details)}</li>"
+
+
+def extractive_answer(query: str, documents: Sequence[Any], sections: Optional[Dict[str, List[str]]] = None,
+                      max_items: int = 6) -> str:
+    """HTML answer assembled locally from retrieved documents, shown while the LLM is late.
+
+    DataBook passages contribute their sentences that best match the query;
+    property documents contribute a one-line summary.
+    """
+    terms = set(normalize_terms(query))
+    parts = [
+        "<h2>📋 Respuesta preliminar</h2>",
+        "<p>El asistente está tardando más de lo normal. Mientras tanto, esta es la información "
+        "más relevante encontrada; la respuesta completa aparecerá aquí en cuanto esté lista.</p>",
+    ]
+
+    for name, contents in (sections or {}).items():
+        items = [f"<li>{html.escape(sentence)}</li>"
+                 for content in contents for sentence in best_sentences(terms, _body(content))][:max_items]
+        if items:
+            parts.append(f"<h3>{SECTION_TITLES.get(name, name)}</h3><ul>{''.join(items)}</ul>")
+
+    passages, properties = [], []
+    for doc in documents:
+        fields = {}
+        for field, value in split_fields(doc.page_content):
+            fields.setdefault(field, value)
+        item = _property_item(fields)
+        if item is not None:
+            properties.append(item)
+        else:
+            passages.extend(f"<li>{html.escape(s)}</li>" for s in best_sentences(terms, _body(doc.page_content)))
+    if passages:
+        parts.append(f"<h3>🔍 Información relacionada</h3><ul>{''.join(passages[:max_items])}</ul>")
+    if properties:
+        parts.append(f"<h3>🏢 Propiedades relacionadas</h3><ul>{''.join(properties[:max_items])}</ul>")
+    if len(parts) == 2:
+        parts.append("<p>No se encontró información suficiente para una respuesta preliminar.</p>")
+    return "".join(parts)
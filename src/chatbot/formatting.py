@@ -0,0 +1,80 @@
+import html
+import re
+from typing import List, Optional
+import sys
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.config import Config
+
+BOLD = re.compile(r'\*\*(.+?)\*\*')
+HEADING = re.compile(r'^(#{1,3})\s+(.*)$')
+BULLET = re.compile(r'^(?:[-•*]|\d+[.)])\s+(.*)$')
+
+
+class ParagraphSegmenter:
+    """Cuts streamed text into paragraph-sized segments.
+
+    A segment ends at a blank line once it has at least `min_chars`
+    characters, so short headings stay with the paragraph or list they
+    introduce.
+    """
+
+    def __init__(self, min_chars: int = Config.PIPELINE_MIN_SEGMENT_CHARS):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        """Add streamed text; returns the segments it completed"""
+        self._buffer += text
+        segments = []
+        while True:
+            cut = self._buffer.find("\n\n", self.min_chars)
+            if cut == -1:
+                return segments
+            segment, self._buffer = self._buffer[:cut].strip(), self._buffer[cut + 2:]
+            if segment:
+                segments.append(segment)
+
+    def flush(self) -> Optional[str]:
+        """The remaining text once the stream has ended"""
+        segment, self._buffer = self._buffer.strip(), ""
+        return segment or None
+
+
+def _inline(text: str) -> str:
+    return BOLD.sub(r'<strong>\1</strong>', html.escape(text.strip()))
+
+
+def format_locally(segment: str) -> str:
+    """Basic HTML for a plain text / light markdown segment, without an LLM call"""
+    parts, items = [], []
+
+    def close_list():
+        if items:
+            parts.append(f"<ul>{''.join(items)}</ul>")
+            items.clear()
+
+    for line in segment.splitlines():
+        line = line.strip()
+        if not line:
+            close_list()
+            continue
+        heading, bullet = HEADING.match(line), BULLET.match(line)
+        if bullet:
+            items.append(f"<li>{_inline(bullet.group(1))}</li>")
+            continue
+        close_list()
+        if heading:
+            level = len(heading.group(1)) + 1
+            parts.append(f"<h{level}>{_inline(heading.group(2))}</h{level}>")
+        elif line.endswith(":") and len(line) <= 80:
+            parts.append(f"<h3>{_inline(line.rstrip(':'))}</h3>")
+        else:
+            parts.append(f"<p>{_inline(line)}</p>")
+    close_list()
+    return "".join(parts)
@@ -0,0 +1,64 @@
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Optional
+
+
+class LatencyRecorder:
+    """Rolling per-stage latency samples for the response pipeline"""
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=self.window))
+        self._counts: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self._samples[stage].append(seconds)
+            self._counts[stage] += 1
+
+    @contextmanager
+    def time(self, stage: str, timings: Optional[Dict[str, float]] = None):
+        """Time a block; optionally also store the duration in `timings`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.record(stage, elapsed)
+            if timings is not None:
+                timings[stage] = elapsed
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Count, mean, p50, p95 and max per stage, in seconds"""
+        with self._lock:
+            snapshot = {stage: sorted(samples) for stage, samples in self._samples.items()}
+            counts = dict(self._counts)
+        result = {}
+        for stage, samples in snapshot.items():
+            if not samples:
+                continue
+            result[stage] = {
+                "count": counts[stage],
+                "mean": sum(samples) / len(samples),
+                "p50": samples[len(samples) // 2],
+                "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+                "max": samples[-1],
+            }
+        return result
+
+
+_recorder: Optional[LatencyRecorder] = None
+_recorder_lock = threading.Lock()
+
+
+def get_latency_recorder() -> LatencyRecorder:
+    """Return the process-wide stage latency recorder"""
+    global _recorder
+    if _recorder is None:
+        with _recorder_lock:
+            if _recorder is None:
+                _recorder = LatencyRecorder()
+    return _recorder
@@ -0,0 +1,74 @@
+import re
+from typing import Any, Dict
+import sys
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.config import Config
+from src.data.records import estimate_tokens
+
+
+class StagePolicy:
+    """Chooses model and max_tokens for each stage of the response pipeline"""
+
+    COMPARISON_PATTERN = re.compile(r'\b(compar\w*|diferencia\w*|versus|vs\.?|frente a|mejor que)\b')
+    LIST_PATTERN = re.compile(r'\b(cu[aá]les|lista\w*|enumera\w*|qu[eé] servicios|todos los|todas las)\b')
+    DETAIL_PATTERN = re.compile(r'\b(c[oó]mo funciona|proceso|explica\w*|detall\w*|an[aá]lisis|por qu[eé])\b')
+
+    def __init__(self,
+                 generation_model: str = Config.GENERATION_MODEL,
+                 formatting_model: str = Config.FORMATTING_MODEL,
+                 query_type_tokens: Dict[str, int] = Config.QUERY_TYPE_MAX_TOKENS,
+                 max_tokens: int = Config.MAX_TOKENS,
+                 formatting_max_tokens: int = Config.FORMATTING_MAX_TOKENS):
+        self.generation_model = generation_model
+        self.formatting_model = formatting_model
+        self.query_type_tokens = query_type_tokens
+        self.max_tokens = max_tokens
+        self.formatting_max_tokens = formatting_max_tokens
+
+    estimate_tokens = staticmethod(estimate_tokens)
+
+    def classify_query(self, query: str) -> str:
+        """Route a query to one of the output-size classes, locally and without an LLM call"""
+        text = query.lower()
+        if self.COMPARISON_PATTERN.search(text):
+            return "comparativa"
+        if self.LIST_PATTERN.search(text):
+            return "listado"
+        if self.DETAIL_PATTERN.search(text) or len(text.split()) > 25:
+            return "detallada"
+        return "breve"
+
+    def generation_params(self, query: str, context: str) -> Dict[str, Any]:
+        """Model and output limit for the first (content) stage"""
+        query_type = self.classify_query(query)
+        # A QUERY_TYPE_MAX_TOKENS override may leave out classes; those get the full budget
+        base = self.query_type_tokens.get(query_type, self.query_type_tokens.get("detallada", self.max_tokens))
+        # Larger retrieved contexts carry more facts the answer has to cover
+        extra = int(self.estimate_tokens(context) * Config.CONTEXT_OUTPUT_RATIO)
+        return {
+            "model": self.generation_model,
+            "max_tokens": max(256, min(self.max_tokens, base + extra)),
+            "query_type": query_type,
+        }
+
+    def formatting_input_limit(self) -> int:
+        """Largest content (estimated tokens) whose formatted output still fits the formatting limit"""
+        limit = min(self.max_tokens, self.formatting_max_tokens)
+        return max(256, int((limit - 256) / Config.FORMATTING_OUTPUT_RATIO))
+
+    def formatting_params(self, content: str) -> Dict[str, Any]:
+        """Model and output limit for the HTML formatting stage"""
+        # Formatting re-marks up existing text: output is the input plus tags and emojis
+        needed = int(self.estimate_tokens(content) * Config.FORMATTING_OUTPUT_RATIO) + 256
+        # The formatting model has its own (smaller) output limit
+        limit = min(self.max_tokens, self.formatting_max_tokens)
+        return {
+            "model": self.formatting_model,
+            "max_tokens": max(min(512, limit), min(limit, needed)),
+        }
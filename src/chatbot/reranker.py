@@ -0,0 +1,176 @@
+import hashlib
+import math
+import re
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+import sys
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.config import Config
+from src.chatbot.policy import StagePolicy
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+STOPWORDS = frozenset("""
+a al algo algun alguna algunas alguno algunos ante antes como con cual cuales cuando de del desde
+donde el ella ellos en entre era es esa esas ese eso esos esta estan estas este esto estos fue ha
+hay la las le les lo los mas me mi mis mucho muy no nos o otra otro para pero poco por que quien se
+ser si sin sobre son su sus tambien te tiene tienen todo todos tu un una unas uno unos y ya
+""".split())
+
+
+def normalize_terms(text: str) -> List[str]:
+    """Lowercase, accent-free word tokens without Spanish stopwords"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return [t for t in TOKEN_PATTERN.findall(text) if len(t) > 1 and t not in STOPWORDS]
+
+
+def split_fields(text: str) -> List[Tuple[str, str]]:
+    """(field, value) pairs from 'Field: value' lines; other lines belong to 'Contenido'"""
+    fields = []
+    for line in text.splitlines():
+        name, sep, value = line.partition(":")
+        if sep and name and len(name) <= 40:
+            fields.append((name.strip(), value))
+        elif line.strip():
+            fields.append(("Contenido", line))
+    return fields
+
+
+@lru_cache(maxsize=4096)
+def document_terms(text: str) -> Tuple[Tuple[str, FrozenSet[str]], ...]:
+    """Per-field term sets of a document; documents repeat across queries, so parse once"""
+    return tuple((name, frozenset(normalize_terms(value))) for name, value in split_fields(text))
+
+
+class LocalReranker:
+    """Re-scores retrieved documents locally and keeps the best ones within a token budget.
+
+    The score mixes field-weighted lexical overlap with the query (IDF computed
+    over the candidate set) and, when search distances are available, the
+    embedding cosine between query and document vectors. Duplicate documents
+    are dropped before scoring.
+    """
+
+    def __init__(self,
+                 field_weights: Dict[str, float] = Config.RERANK_FIELD_WEIGHTS,
+                 cosine_weight: float = Config.RERANK_COSINE_WEIGHT,
+                 token_budget: int = Config.RERANK_TOKEN_BUDGET,
+                 max_documents: int = Config.RERANK_MAX_DOCS,
+                 mmr_lambda: float = Config.RERANK_MMR_LAMBDA,
+                 duplicate_threshold: float = Config.RERANK_DUPLICATE_THRESHOLD):
+        self.field_weights = field_weights
+        self.default_weight = field_weights.get("*", 0.5)
+        self.cosine_weight = cosine_weight
+        self.token_budget = token_budget
+        self.max_documents = max_documents
+        self.mmr_lambda = mmr_lambda
+        self.duplicate_threshold = duplicate_threshold
+
+    @staticmethod
+    def cosine_from_l2(distance: float) -> float:
+        """Cosine similarity from a squared L2 distance between unit vectors (OpenAI embeddings)"""
+        return 1.0 - distance / 2.0
+
+    @staticmethod
+    def _dedupe(scored: Iterable[Tuple[Any, Optional[float]]]) -> List[Tuple[Any, Optional[float]]]:
+        seen = set()
+        unique = []
+        for doc, distance in scored:
+            digest = hashlib.sha1(" ".join(doc.page_content.split()).encode("utf-8")).digest()
+            if digest in seen:
+                continue
+            seen.add(digest)
+            unique.append((doc, distance))
+        return unique
+
+    def lexical_scores(self, query: str, documents: Sequence[Any]) -> List[float]:
+        query_terms = set(normalize_terms(query))
+        if not query_terms:
+            return [0.0] * len(documents)
+        parsed = [document_terms(doc.page_content) for doc in documents]
+        # Document frequency of each query term within the candidate set
+        frequency = Counter()
+        for fields in parsed:
+            present = set()
+            for _, terms in fields:
+                present |= terms & query_terms
+            frequency.update(present)
+        total = len(documents)
+        idf = {term: math.log(1 + (total - frequency[term] + 0.5) / (frequency[term] + 0.5)) for term in query_terms}
+
+        scores = []
+        for fields in parsed:
+            best: Dict[str, float] = {}
+            for name, terms in fields:
+                weight = self.field_weights.get(name, self.default_weight)
+                for term in terms & query_terms:
+                    # A term counts once per document, in its highest-weighted field
+                    best[term] = max(best.get(term, 0.0), weight * idf[term])
+            scores.append(sum(best.values()))
+        return scores
+
+    def rerank(self, query: str, scored_documents: Iterable[Tuple[Any, Optional[float]]],
+               vectors=None) -> Tuple[List[Any], Dict[str, Any]]:
+        """Order (document, L2 distance or None) pairs by relevance and cut to the budget.
+
+        With the index's DocumentVectors, near-duplicate vectors are dropped
+        too and the order is diversified with MMR.
+        """
+        candidates = list(scored_documents)
+        unique = self._dedupe(candidates)
+        positions = [doc.metadata.get("position") for doc, _ in unique]
+        use_vectors = vectors is not None and bool(unique) and all(p is not None for p in positions)
+        if use_vectors:
+            repeated = set(vectors.near_duplicates(positions, self.duplicate_threshold))
+            unique = [pair for i, pair in enumerate(unique) if i not in repeated]
+            positions = [p for i, p in enumerate(positions) if i not in repeated]
+        documents = [doc for doc, _ in unique]
+        lexical = _scale(self.lexical_scores(query, documents))
+        distances = [distance for _, distance in unique]
+        if self.cosine_weight > 0 and unique and all(d is not None for d in distances):
+            cosine = _scale([self.cosine_from_l2(d) for d in distances])
+            scores = [(1 - self.cosine_weight) * lex + self.cosine_weight * cos
+                      for lex, cos in zip(lexical, cosine)]
+        else:
+            scores = lexical
+        if use_vectors and self.mmr_lambda < 1:
+            order = vectors.mmr(positions, scores, self.max_documents, self.mmr_lambda)
+        else:
+            # Stable sort keeps the vector-search order between equal scores
+            order = sorted(range(len(documents)), key=lambda i: -scores[i])
+
+        kept, used = [], 0
+        for i in order:
+            tokens = StagePolicy.estimate_tokens(documents[i].page_content)
+            if kept and (len(kept) >= self.max_documents or used + tokens > self.token_budget):
+                break
+            kept.append(documents[i])
+            used += tokens
+        report = {
+            "candidates": len(candidates),
+            "duplicates": len(candidates) - len(unique),
+            "diversified": use_vectors and self.mmr_lambda < 1,
+            "kept": len(kept),
+            "tokens": used,
+            "candidate_tokens": sum(StagePolicy.estimate_tokens(doc.page_content) for doc in documents),
+        }
+        return kept, report
+
+
+def _scale(values: List[float]) -> List[float]:
+    """Min-max scale to [0, 1]; all zeros when the values are constant"""
+    if not values:
+        return values
+    low, high = min(values), max(values)
+    if high - low <= 1e-12:
+        return [0.0] * len(values)
+    return [(v - low) / (high - low) for v in values]
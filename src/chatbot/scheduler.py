@@ -0,0 +1,293 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+import sys
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.config import Config
+
+
+class QueueFullError(Exception):
+    """Raised when a request is rejected because the scheduler queue is too deep"""
+
+    def __init__(self, message: str, queued: int, retry_after: float):
+        super().__init__(message)
+        self.queued = queued
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate` units per second"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Block until `amount` units are available; return False on timeout"""
+        if self.rate <= 0:
+            return True
+        # A single request larger than the bucket can never fit, so cap it
+        amount = min(amount, self.capacity)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return True
+                wait = (amount - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    def available(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+class _Ticket:
+    __slots__ = ("user_id", "event", "enqueued_at", "cancelled")
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.event = threading.Event()
+        self.enqueued_at = time.monotonic()
+        self.cancelled = False
+
+
+class RequestScheduler:
+    """Bounded-concurrency scheduler for LLM calls.
+
+    Requests wait in per-user FIFO queues. Free slots are handed out round-robin
+    across users so one user submitting many prompts cannot starve the others.
+    Admitted requests additionally pass through request and token buckets that
+    mirror the upstream API rate limits.
+    """
+
+    def __init__(self,
+                 max_concurrent: int = Config.LLM_MAX_CONCURRENT,
+                 max_queue_depth: int = Config.LLM_MAX_QUEUE_DEPTH,
+                 max_user_queue_depth: int = Config.LLM_MAX_USER_QUEUE_DEPTH,
+                 queue_timeout: float = Config.LLM_QUEUE_TIMEOUT,
+                 requests_per_minute: int = Config.LLM_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: int = Config.LLM_TOKENS_PER_MINUTE):
+        self.max_concurrent = max_concurrent
+        self.max_queue_depth = max_queue_depth
+        self.max_user_queue_depth = max_user_queue_depth
+        self.queue_timeout = queue_timeout
+        # A full minute of budget, like the upstream limits: a single large prompt never waits
+        self.request_bucket = TokenBucket(requests_per_minute / 60.0, max(1, requests_per_minute))
+        self.token_bucket = TokenBucket(tokens_per_minute / 60.0, max(1, tokens_per_minute))
+
+        self._lock = threading.Lock()
+        self._queues: Dict[str, Deque[_Ticket]] = {}
+        self._turns: Deque[str] = deque()
+        self._active = 0
+        self._queued = 0
+        # Admitted requests still waiting for rate budget, per user; they count as queued
+        self._throttled: Dict[str, int] = {}
+
+        # Metrics
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._peak_queued = 0
+        self._total_wait = 0.0
+
+    def submit(self, user_id: Optional[str], fn: Callable[..., Any], *args,
+               estimated_tokens: int = 0, follow_up: bool = False, **kwargs) -> Any:
+        """Run `fn(*args, **kwargs)` once rate budget and a slot are available.
+
+        The rate budget is reserved before the request takes its turn for a
+        slot, so a request waiting on the buckets never holds one of the
+        `max_concurrent` slots that other users are queued for.
+
+        A `follow_up` request belongs to an answer the scheduler already
+        admitted, so it is not held to the per-user queue depth; it still
+        counts toward the global depth and waits its turn like any other.
+        """
+        user_id = user_id or "anonymous"
+        ticket = self._admit(user_id, follow_up)
+        deadline = ticket.enqueued_at + self.queue_timeout
+        try:
+            reserved = self.request_bucket.acquire(1, timeout=self.queue_timeout)
+            if reserved and estimated_tokens:
+                reserved = self.token_bucket.acquire(estimated_tokens, timeout=max(0.0, deadline - time.monotonic()))
+            if not reserved:
+                with self._lock:
+                    self._unthrottle(ticket)
+                    self._queued -= 1
+                    self._timed_out += 1
+                    raise self._timeout_error()
+            self._enqueue(ticket)
+            if not ticket.event.wait(max(0.0, deadline - time.monotonic())):
+                with self._lock:
+                    if not ticket.event.is_set():
+                        self._cancel(ticket)
+                        self._timed_out += 1
+                        raise self._timeout_error()
+            with self._lock:
+                self._total_wait += time.monotonic() - ticket.enqueued_at
+            return fn(*args, **kwargs)
+        finally:
+            if ticket.event.is_set():
+                self._release()
+
+    def _timeout_error(self) -> QueueFullError:
+        return QueueFullError(
+            "El asistente está atendiendo muchas consultas en este momento. "
+            "Por favor, intenta de nuevo en unos segundos.",
+            queued=self._queued,
+            retry_after=self.queue_timeout,
+        )
+
+    def _admit(self, user_id: str, follow_up: bool = False) -> _Ticket:
+        """Check the queue depths and count a new request as queued while it waits for rate budget"""
+        with self._lock:
+            queue = self._queues.get(user_id)
+            user_depth = 0 if follow_up else (len(queue) if queue else 0) + self._throttled.get(user_id, 0)
+            if self._queued >= self.max_queue_depth or user_depth >= self.max_user_queue_depth:
+                self._rejected += 1
+                # Rough estimate: every queued request needs one slot turn
+                retry_after = max(1.0, self._queued / max(1, self.max_concurrent) * 5.0)
+                if user_depth >= self.max_user_queue_depth:
+                    message = ("Ya tienes consultas en proceso. Espera a que terminen "
+                               "antes de enviar una nueva.")
+                else:
+                    message = (f"El asistente está saturado ({self._queued} consultas en espera). "
+                               f"Por favor, intenta de nuevo en {int(retry_after)} segundos.")
+                raise QueueFullError(message, queued=self._queued, retry_after=retry_after)
+
+            ticket = _Ticket(user_id)
+            self._throttled[user_id] = self._throttled.get(user_id, 0) + 1
+            self._queued += 1
+            self._submitted += 1
+            self._peak_queued = max(self._peak_queued, self._queued)
+            return ticket
+
+    def _unthrottle(self, ticket: _Ticket):
+        """The ticket is done waiting for rate budget (lock held)"""
+        left = self._throttled[ticket.user_id] - 1
+        if left:
+            self._throttled[ticket.user_id] = left
+        else:
+            del self._throttled[ticket.user_id]
+
+    def _enqueue(self, ticket: _Ticket):
+        """Queue a ticket whose rate budget is reserved for its turn at a slot"""
+        with self._lock:
+            self._unthrottle(ticket)
+            queue = self._queues.get(ticket.user_id)
+            if queue is None:
+                queue = self._queues[ticket.user_id] = deque()
+                self._turns.append(ticket.user_id)
+            queue.append(ticket)
+            self._dispatch()
+
+    def _dispatch(self):
+        """Hand free slots to queued tickets, one user at a time (lock held)"""
+        while self._active < self.max_concurrent and self._turns:
+            user_id = self._turns.popleft()
+            queue = self._queues[user_id]
+            ticket = queue.popleft()
+            if queue:
+                self._turns.append(user_id)
+            else:
+                del self._queues[user_id]
+            self._queued -= 1
+            self._active += 1
+            ticket.event.set()
+
+    def _cancel(self, ticket: _Ticket):
+        """Remove a ticket that gave up waiting (lock held)"""
+        queue = self._queues.get(ticket.user_id)
+        if queue and ticket in queue:
+            queue.remove(ticket)
+            self._queued -= 1
+            if not queue:
+                del self._queues[ticket.user_id]
+                self._turns.remove(ticket.user_id)
+
+    def _release(self):
+        with self._lock:
+            self._active -= 1
+            self._completed += 1
+            self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of queue depth and throughput counters"""
+        with self._lock:
+            admitted = self._submitted - self._queued - self._timed_out
+            return {
+                "active": self._active,
+                "queued": self._queued,
+                "queued_per_user": {user: len(q) for user, q in self._queues.items()},
+                "throttled": sum(self._throttled.values()),
+                "peak_queued": self._peak_queued,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+                "avg_wait_seconds": self._total_wait / admitted if admitted > 0 else 0.0,
+                "request_budget": self.request_bucket.available(),
+                "token_budget": self.token_bucket.available(),
+            }
+
+
+def process_limits(processes: int = Config.LLM_PROCESSES) -> Dict[str, int]:
+    """This process's share of the LLM limits, which are totals across `processes` workers.
+
+    Every process keeps at least one slot, so with more workers than
+    LLM_MAX_CONCURRENT the total concurrency is the worker count.
+    """
+    def share(total: int) -> int:
+        return max(1, total // processes) if total > 0 else total
+
+    return {
+        "max_concurrent": share(Config.LLM_MAX_CONCURRENT),
+        "requests_per_minute": share(Config.LLM_REQUESTS_PER_MINUTE),
+        "tokens_per_minute": share(Config.LLM_TOKENS_PER_MINUTE),
+    }
+
+
+def describe_limits(processes: int) -> str:
+    """Effective LLM limits for `processes` workers, per worker and in total"""
+    limits = process_limits(processes)
+    return (f"LLM limits: {processes} x ({limits['max_concurrent']} concurrent, "
+            f"{limits['requests_per_minute']} RPM, {limits['tokens_per_minute']} TPM) = "
+            f"{processes * limits['max_concurrent']} concurrent, {processes * limits['requests_per_minute']} RPM, "
+            f"{processes * limits['tokens_per_minute']} TPM")
+
+
+_scheduler: Optional[RequestScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> RequestScheduler:
+    """Return the process-wide scheduler shared by every chat session"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = RequestScheduler(**process_limits())
+    return _scheduler
@@ -0,0 +1,200 @@
+import json
+import queue
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+import sys
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.config import Config
+from src.chatbot.scheduler import QueueFullError
+from src.chatbot.warmup import get_warmup
+
+MAX_BODY_BYTES = 1 << 20
+
+
+def parse_chat_request(body: Any) -> Dict[str, Any]:
+    """Validated chat request fields; raises ValueError with a message for the client"""
+    if not isinstance(body, dict):
+        raise ValueError("request body must be a JSON object")
+    message = body.get("message")
+    if not isinstance(message, str) or not message.strip():
+        raise ValueError("'message' is required")
+    history = body.get("history") or []
+    if not isinstance(history, list) or not all(
+        isinstance(m, dict) and isinstance(m.get("role"), str) and isinstance(m.get("content"), str)
+        for m in history
+    ):
+        raise ValueError("'history' must be a list of {role, content} strings")
+    user_id = body.get("user_id")
+    if user_id is not None and not isinstance(user_id, str):
+        raise ValueError("'user_id' must be a string or null")
+    deadline = body.get("deadline", Config.RESPONSE_DEADLINE)
+    # null waits for the full answer; bool is an int subclass, so reject it explicitly
+    if deadline is not None and (isinstance(deadline, bool) or not isinstance(deadline, (int, float))
+                                 or deadline <= 0):
+        raise ValueError("'deadline' must be a positive number of seconds or null")
+    return {"message": message, "history": history, "user_id": user_id, "deadline": deadline}
+
+
+class ChatbotPool:
+    """Reusable RAESAChatbot instances, one per request in flight.
+
+    A chatbot keeps per-request state (timings, scope, context report), so
+    concurrent requests must not share one; all of them share the index,
+    scheduler and caches, so an instance is cheap to keep around.
+    """
+
+    def __init__(self):
+        self._idle: "queue.LifoQueue[Any]" = queue.LifoQueue()
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return get_warmup().create_chatbot()
+
+    def release(self, chatbot):
+        self._idle.put(chatbot)
+
+
+def metrics() -> Dict[str, Any]:
+    """Operator view of the engine: stage latencies, LLM scheduler, batching and cache efficiency"""
+    from src.chatbot.cache import get_response_cache
+    from src.chatbot.metrics import get_latency_recorder
+    from src.chatbot.scheduler import get_scheduler
+    from src.chatbot.singleflight import get_single_flight
+    from src.data.shared_index import get_embedding_batcher, get_search_batcher
+
+    warmup = get_warmup()
+    data = {
+        "latency": get_latency_recorder().summary(),
+        "scheduler": get_scheduler().stats(),
+        "single_flight": get_single_flight().stats(),
+        "response_cache": get_response_cache().stats(),
+        "batching": {"embedding": get_embedding_batcher().stats(), "search": get_search_batcher().stats()},
+        "warmup": warmup.timings,
+    }
+    if warmup.ready:
+        index = warmup.vectorstore.current()
+        data["index"] = {"version": index.version, "caches": index.cache_stats()}
+    return data
+
+
+class EngineHandler(BaseHTTPRequestHandler):
+    """JSON and server-sent-events API over the chatbot engine.
+
+    POST /v1/chat          {"message", "history", "user_id"} -> {"response", "timings", ...}
+    POST /v1/chat/stream   same body (+ "deadline") -> SSE: segment*, preliminary?, done | error
+    GET  /healthz          readiness and index version
+    GET  /metrics          see metrics()
+    """
+
+    server_version = "RAESAEngine/1.0"
+    pool = ChatbotPool()
+
+    def do_GET(self):
+        if self.path == "/healthz":
+            warmup = get_warmup()
+            if warmup.ready:
+                self._send_json(200, {"status": "ok", "index_version": warmup.vectorstore.version})
+            else:
+                self._send_json(503, {"status": "error" if warmup.error else "starting"})
+        elif self.path == "/metrics":
+            self._send_json(200, metrics())
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path not in ("/v1/chat", "/v1/chat/stream"):
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_BODY_BYTES:
+                raise ValueError("request body too large")
+            request = parse_chat_request(json.loads(self.rfile.read(length) or b"{}"))
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        try:
+            chatbot = self.pool.acquire()
+        except Exception as e:
+            print(f"Engine not ready: {e}")
+            self._send_json(503, {"error": "engine not ready"})
+            return
+        try:
+            if self.path == "/v1/chat":
+                self._chat(chatbot, request)
+            else:
+                self._chat_stream(chatbot, request)
+        finally:
+            self.pool.release(chatbot)
+
+    def _chat(self, chatbot, request: Dict[str, Any]):
+        try:
+            response = chatbot.get_response(request["message"], request["history"], request["user_id"])
+        except QueueFullError as e:
+            self._send_json(429, {"error": str(e)}, {"Retry-After": str(int(e.retry_after))})
+            return
+        except Exception as e:
+            print(f"Error answering request: {e}")
+            self._send_json(500, {"error": str(e)})
+            return
+        self._send_json(200, {
+            "response": response,
+            "timings": chatbot.last_timings,
+            "context_tokens": chatbot.last_context_tokens,
+            "scope": chatbot.last_scope,
+        })
+
+    def _chat_stream(self, chatbot, request: Dict[str, Any]):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        try:
+            for event, html in chatbot.stream_response(request["message"], request["history"],
+                                                       request["user_id"], request["deadline"]):
+                data = {"html": html}
+                if event == "done":
+                    data["timings"] = chatbot.last_timings
+                self._send_event(event, data)
+        except (BrokenPipeError, ConnectionResetError):
+            print("Client disconnected during a streamed response")
+        except QueueFullError as e:
+            self._send_event("error", {"html": f"<p>⏳ {e}</p>", "detail": str(e)})
+        except Exception as e:
+            print(f"Error streaming response: {e}")
+            self._send_event("error", {"html": chatbot.GENERATION_ERROR, "detail": str(e)})
+
+    def _send_event(self, event: str, data: Dict[str, Any]):
+        self.wfile.write(f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def _send_json(self, status: int, data: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args):
+        print(f"{self.address_string()} {format % args}")
+
+
+def create_server(host: str = Config.ENGINE_HOST, port: int = Config.ENGINE_PORT) -> ThreadingHTTPServer:
+    """HTTP server for the engine API; the warm-up starts right away so /healthz turns ready"""
+    get_warmup().start()
+    server = ThreadingHTTPServer((host, port), EngineHandler)
+    server.daemon_threads = True
+    return server
+
@@ -0,0 +1,90 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, Type
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one execution.
+
+    The first caller for a key (the leader) runs the function; callers
+    arriving while it is still running block and receive the same result (or
+    exception). Nothing is kept once the call finishes, so this is not a cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._executed = 0
+        self._coalesced = 0
+        self._rerun = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any],
+           rerun_on: Tuple[Type[BaseException], ...] = ()) -> Tuple[Any, bool]:
+        """Run `fn` for `key` or join the in-flight run; returns (result, leader).
+
+        A follower whose leader failed with one of `rerun_on` (an error about
+        the leader's caller rather than the work itself) runs `fn` on its own.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self._executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                if not isinstance(call.error, rerun_on):
+                    raise call.error
+                with self._lock:
+                    self._rerun += 1
+                return fn(), True
+            return call.result, False
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, True
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "executed": self._executed,
+                "coalesced": self._coalesced,
+                "rerun": self._rerun,
+            }
+
+
+_single_flight: Optional[SingleFlight] = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """Return the process-wide group shared by every chat session"""
+    global _single_flight
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                _single_flight = SingleFlight()
+    return _single_flight
@@ -0,0 +1,124 @@
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import sys
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.config import Config
+
+
+def warmup_settings() -> Dict[str, Any]:
+    """Warm-up queries and whether to pre-generate answers: WARMUP_FILE if present, else Config"""
+    settings = {"queries": Config.WARMUP_QUERIES, "generate": Config.WARMUP_GENERATE}
+    if Config.WARMUP_FILE.exists():
+        import yaml
+        with open(Config.WARMUP_FILE, encoding="utf-8") as f:
+            settings.update(yaml.safe_load(f) or {})
+    return settings
+
+
+class Warmup:
+    """Loads the heavy chatbot dependencies on a background thread.
+
+    Started while the login form is shown, so by the time a user signs in the
+    engine modules are imported, the shared index is mapped and the common
+    queries (see warmup_settings) are embedded and searched. Pre-generating
+    their answers, if enabled, continues on its own thread after that.
+    """
+
+    def __init__(self):
+        self.vectorstore = None
+        self.error: Optional[BaseException] = None
+        self.timings: Dict[str, float] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def start(self):
+        """Start warming up unless it already started; never blocks"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="chatbot-warmup", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        try:
+            start = time.perf_counter()
+            from src.chatbot.engine import RAESAChatbot  # anthropic, faiss, langchain
+            from src.data.embeddings import EmbeddingManager
+            self.timings["imports"] = time.perf_counter() - start
+
+            # Fetch (or report the missing) token encoding now rather than in the first request
+            start = time.perf_counter()
+            from src.chatbot.context import load_encoding
+            load_encoding()
+            self.timings["encoding"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            vectorstore = EmbeddingManager().load_shared_index()
+            vectorstore.current()
+            self.timings["index"] = time.perf_counter() - start
+            self.vectorstore = vectorstore
+
+            settings = warmup_settings()
+            queries: List[str] = list(settings.get("queries") or [])
+            if queries:
+                try:
+                    self.timings.update(RAESAChatbot(vectorstore).warm_up(queries))
+                except Exception as e:
+                    # Cold queries are slower, not broken
+                    print(f"Warming common queries failed: {e}")
+            print("Warm-up finished: " + ", ".join(f"{k}={v:.2f}s" for k, v in self.timings.items()))
+            if queries and settings.get("generate"):
+                threading.Thread(target=self._generate, args=(queries,),
+                                 name="chatbot-warmup-answers", daemon=True).start()
+        except BaseException as e:
+            self.error = e
+            print(f"Warm-up failed: {e}")
+        finally:
+            self._done.set()
+
+    def _generate(self, queries: List[str]):
+        from src.chatbot.engine import RAESAChatbot
+        try:
+            timings = RAESAChatbot(self.vectorstore).warm_up(queries, generate=True)
+            print(f"Pre-generated {len(queries)} answers in {timings['answers']:.2f}s")
+        except Exception as e:
+            print(f"Pre-generating answers failed: {e}")
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set() and self.error is None
+
+    def create_chatbot(self, timeout: Optional[float] = None):
+        """Wait for the warm-up (starting it if needed) and build a session chatbot"""
+        self.start()
+        if not self._done.wait(timeout):
+            raise TimeoutError("Chatbot warm-up did not finish in time")
+        if self.error is not None:
+            # Allow a later session to retry after a transient failure
+            with self._lock:
+                error, self.error, self._thread = self.error, None, None
+                self._done.clear()
+            raise error
+        from src.chatbot.engine import RAESAChatbot
+        return RAESAChatbot(self.vectorstore)
+
+
+_warmup: Optional[Warmup] = None
+_warmup_lock = threading.Lock()
+
+
+def get_warmup() -> Warmup:
+    """Return the process-wide warm-up"""
+    global _warmup
+    if _warmup is None:
+        with _warmup_lock:
+            if _warmup is None:
+                _warmup = Warmup()
+    return _warmup
@@ -1,7 +1,7 @@
 import os
+import json
 from dotenv import load_dotenv
 from pathlib import Path
-import pandas as pd
 
 load_dotenv()
 
@@ -20,7 +20,21 @@ class Config:
     # Cache directory using absolute path
     CACHE_DIR = BASE_DIR / 'cache'
     MODEL_NAME = "claude-3-5-sonnet-20240620"
-    MAX_TOKENS = 8192
+    MAX_TOKENS = int(os.getenv('MAX_TOKENS', '8192'))
+    
+    # Modelo y límite de salida por etapa del pipeline
+    GENERATION_MODEL = os.getenv('GENERATION_MODEL', MODEL_NAME)
+    FORMATTING_MODEL = os.getenv('FORMATTING_MODEL', "claude-3-haiku-20240307")
+    # Límite de salida del modelo de formateo (claude-3-haiku admite hasta 4096)
+    FORMATTING_MAX_TOKENS = int(os.getenv('FORMATTING_MAX_TOKENS', '4096'))
+    QUERY_TYPE_MAX_TOKENS = json.loads(os.getenv('QUERY_TYPE_MAX_TOKENS', json.dumps({
+        "breve": 1024,
+        "listado": 2048,
+        "comparativa": 3072,
+        "detallada": 4096
+    })))
+    CONTEXT_OUTPUT_RATIO = float(os.getenv('CONTEXT_OUTPUT_RATIO', '0.1'))
+    FORMATTING_OUTPUT_RATIO = float(os.getenv('FORMATTING_OUTPUT_RATIO', '1.6'))
     
     EMBEDDINGS_CACHE = CACHE_DIR / "embeddings.pkl"
     MARKET_ANALYSIS_CACHE = CACHE_DIR / "market_analysis.json"
@@ -28,16 +42,172 @@ class Config:
     # Configuración de caché
     CACHE_TTL = 3600  # 1 hora en segundos
     PROMPT_CACHE_SIZE = 1000
+    # Embeddings y resultados de búsqueda por consulta, por versión del índice
+    QUERY_CACHE_SIZE = int(os.getenv('QUERY_CACHE_SIZE', '256'))
+    # Calentamiento al arrancar: consultas (las del mensaje de bienvenida) cuyos embeddings y
+    # resultados se pre-calculan al cargar el índice; config/warmup.yaml las reemplaza si existe
+    WARMUP_FILE = Path(os.getenv('WARMUP_FILE', str(BASE_DIR / 'config' / 'warmup.yaml')))
+    WARMUP_QUERIES = json.loads(os.getenv('WARMUP_QUERIES', json.dumps([
+        "¿Qué servicios ofrecen para el sector industrial?",
+        "¿Cuál es el proceso de limpieza de trampas de grasa?",
+        "¿Qué sectores demandan más el servicio de disposición de lodos?",
+        "¿Cómo funciona el servicio de video inspección?",
+        "¿Qué ventajas tiene RAESA frente a la competencia?",
+        "Disposición de lodos",
+        "Desazolve de cárcamos y plantas de tratamiento",
+        "Limpieza de trampas de grasa",
+        "Limpieza de drenajes sanitarios",
+        "Bombeo de lodos",
+        "Remoción de raíces",
+        "Limpieza de cisternas y tanques",
+        "Video inspección de drenajes",
+        "Transporte de aguas tratadas"
+    ])))
+    # Pre-generar también sus respuestas (llamadas al LLM) en segundo plano
+    WARMUP_GENERATE = os.getenv('WARMUP_GENERATE', 'false').lower() == 'true'
     
     # Asegurar que el directorio de caché existe
     CACHE_DIR.mkdir(exist_ok=True)
     
+    # Índice compartido (mmap) entre procesos de trabajo
+    SHARED_INDEX_DIR = Path(os.getenv('SHARED_INDEX_DIR', str(CACHE_DIR / 'index')))
+    SHARED_INDEX_CHECK_INTERVAL = float(os.getenv('SHARED_INDEX_CHECK_INTERVAL', '5'))
+    SHARED_INDEX_KEEP_VERSIONS = int(os.getenv('SHARED_INDEX_KEEP_VERSIONS', '3'))
+    INDEX_BUILD_LOCK_TIMEOUT = int(os.getenv('INDEX_BUILD_LOCK_TIMEOUT', '1800'))  # segundos
+    BUILD_WORKERS = int(os.getenv('BUILD_WORKERS', '4'))  # peticiones de embeddings en paralelo
+    BUILD_BATCH_SIZE = int(os.getenv('BUILD_BATCH_SIZE', '256'))
+    WORKER_COUNT = int(os.getenv('WORKER_COUNT', '2'))
+    # Servicio del motor (scripts/run_engine.py); con ENGINE_URL la app de Streamlit
+    # le delega las consultas en lugar de ejecutar el motor en su propio proceso
+    ENGINE_HOST = os.getenv('ENGINE_HOST', '127.0.0.1')
+    ENGINE_PORT = int(os.getenv('ENGINE_PORT', '8700'))
+    ENGINE_URL = os.getenv('ENGINE_URL', '')
+    
     # Configuración de embeddings
     EMBEDDING_DIMENSION = 1536  # Dimensión de embeddings de OpenAI
     EMBEDDING_BATCH_SIZE = 100
     VECTOR_SEARCH_NPROBE = 5
+    RETRIEVAL_K = int(os.getenv('RETRIEVAL_K', '100'))
+    # Tipo de índice (cadena de faiss.index_factory): "Flat", "SQfp16", "SQ8", "PCA256,SQ8"
+    INDEX_FACTORY = os.getenv('INDEX_FACTORY', 'Flat')
+    # Candidatos por resultado que se re-puntúan con los vectores exactos (índices comprimidos)
+    INDEX_RESCORE_FACTOR = int(os.getenv('INDEX_RESCORE_FACTOR', '4'))
+    # Fragmentación de textos largos (DataBook) y fragmentos vecinos añadidos al contexto
+    CHUNK_MAX_TOKENS = int(os.getenv('CHUNK_MAX_TOKENS', '256'))
+    CHUNK_PARENT_WINDOW = int(os.getenv('CHUNK_PARENT_WINDOW', '1'))
+    
+    # Búsqueda filtrada por metadatos y repartida en shards (uno por Documento)
+    SEARCH_SHARD_WORKERS = int(os.getenv('SEARCH_SHARD_WORKERS', '4'))
+    # Fracción máxima del índice que se busca de forma exacta sobre los vectores del subconjunto
+    SEARCH_EXACT_FRACTION = float(os.getenv('SEARCH_EXACT_FRACTION', '0.25'))
+    # Micro-batching de embeddings de consultas y búsquedas concurrentes. Desactivado por
+    # defecto: en las pruebas de carga redujo el throughput; activarlo solo con mucha concurrencia
+    BATCH_ENABLED = os.getenv('BATCH_ENABLED', 'false').lower() == 'true'
+    BATCH_WINDOW_MS = float(os.getenv('BATCH_WINDOW_MS', '10'))
+    BATCH_MAX_SIZE = int(os.getenv('BATCH_MAX_SIZE', '32'))
+    # Campos que una consulta puede acotar al mencionar uno de sus valores
+    SEARCH_SCOPE_FIELDS = json.loads(os.getenv('SEARCH_SCOPE_FIELDS', '["sector", "service", "market2"]'))
+    # Palabras clave (sin acentos) con las que se etiquetan sector y servicio de los fragmentos
+    SEARCH_SECTORS = json.loads(os.getenv('SEARCH_SECTORS', json.dumps({
+        "industrial": ["industria", "planta", "fabrica", "manufactur"],
+        "restaurantes": ["restaurante", "cocina", "alimentos"],
+        "centros_comerciales": ["centro comercial", "centros comerciales", "plaza"],
+        "hoteles": ["hotel"],
+        "municipios": ["municip", "gobierno"],
+        "residencial": ["residencial", "condominio", "vivienda"]
+    })))
+    SEARCH_SERVICES = json.loads(os.getenv('SEARCH_SERVICES', json.dumps({
+        "desazolve": ["desazolve"],
+        "video_inspeccion": ["video inspeccion", "videoinspeccion", "inspeccion"],
+        "lodos": ["lodo"],
+        "trampas_grasa": ["trampa de grasa", "trampas de grasa"],
+        "carcamos": ["carcamo"],
+        "fosas": ["fosa"],
+        "drenaje": ["drenaje"],
+        "mantenimiento": ["mantenimiento", "preventivo"],
+        "emergencias": ["emergencia"]
+    })))
+    
+    # Re-ranking local de los documentos recuperados antes de armar el contexto
+    RERANK_ENABLED = os.getenv('RERANK_ENABLED', 'true').lower() == 'true'
+    RERANK_TOKEN_BUDGET = int(os.getenv('RERANK_TOKEN_BUDGET', '3000'))
+    RERANK_MAX_DOCS = int(os.getenv('RERANK_MAX_DOCS', '20'))
+    RERANK_COSINE_WEIGHT = float(os.getenv('RERANK_COSINE_WEIGHT', '0.5'))
+    # Diversificación MMR (1 = sin diversificar) y umbral de casi-duplicados (coseno)
+    RERANK_MMR_LAMBDA = float(os.getenv('RERANK_MMR_LAMBDA', '0.7'))
+    RERANK_DUPLICATE_THRESHOLD = float(os.getenv('RERANK_DUPLICATE_THRESHOLD', '0.98'))
+    # Peso por campo ("*" = campos no listados)
+    RERANK_FIELD_WEIGHTS = json.loads(os.getenv('RERANK_FIELD_WEIGHTS', json.dumps({
+        "Sección": 2.0,
+        "Capítulo": 1.5,
+        "Contenido": 1.0,
+        "Building Name": 1.5,
+        "Industrial Park": 1.5,
+        "market2": 2.0,
+        "submarket2": 2.0,
+        "region": 1.5,
+        "type": 1.0,
+        "class": 1.0,
+        "*": 0.5
+    })))
+
+    # Contexto del prompt: presupuesto de tokens (contados con tiktoken si está disponible)
+    # y orden de prioridad de las fuentes al llenarlo
+    CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '6000'))
+    CONTEXT_ENCODING = os.getenv('CONTEXT_ENCODING', 'cl100k_base')
+    # tiktoken descarga la codificación la primera vez y la guarda aquí (el warm-up la carga al
+    # arrancar). Sin tiktoken, red ni copia local, los tokens se estiman como caracteres / 4 y el
+    # presupuesto es aproximado; el aviso se registra una vez. Sin red, copiar este directorio
+    TIKTOKEN_CACHE_DIR = Path(os.getenv('TIKTOKEN_CACHE_DIR', str(CACHE_DIR / 'tiktoken')))
+    # tiktoken solo lee la variable de entorno; se fija una vez, al cargar la configuración
+    os.environ.setdefault('TIKTOKEN_CACHE_DIR', str(TIKTOKEN_CACHE_DIR))
+    CONTEXT_PRIORITY = json.loads(os.getenv('CONTEXT_PRIORITY', json.dumps(
+        ["documentos", "servicios", "ventajas_competitivas", "areas_cobertura"]
+    )))
+    
+    # Planificador de llamadas al LLM (compartido por todas las sesiones)
+    LLM_MAX_CONCURRENT = int(os.getenv('LLM_MAX_CONCURRENT', '4'))
+    LLM_MAX_QUEUE_DEPTH = int(os.getenv('LLM_MAX_QUEUE_DEPTH', '32'))
+    LLM_MAX_USER_QUEUE_DEPTH = int(os.getenv('LLM_MAX_USER_QUEUE_DEPTH', '2'))
+    LLM_QUEUE_TIMEOUT = float(os.getenv('LLM_QUEUE_TIMEOUT', '60'))
+    LLM_REQUESTS_PER_MINUTE = int(os.getenv('LLM_REQUESTS_PER_MINUTE', '50'))
+    LLM_TOKENS_PER_MINUTE = int(os.getenv('LLM_TOKENS_PER_MINUTE', '40000'))
+    # Procesos que comparten los límites anteriores (run_workers.py lo fija en cada worker):
+    # cada proceso aplica su parte, para que el total no supere los límites de la API
+    LLM_PROCESSES = max(1, int(os.getenv('LLM_PROCESSES', '1')))
+    # Tiempo máximo por llamada al LLM y plazo de respuesta visible para el usuario (segundos);
+    # pasado el plazo se muestra una respuesta extractiva local hasta que llegue la completa
+    LLM_REQUEST_TIMEOUT = float(os.getenv('LLM_REQUEST_TIMEOUT', '60'))
+    RESPONSE_DEADLINE = float(os.getenv('RESPONSE_DEADLINE', '15'))
+    RESPONSE_FINAL_WAIT = float(os.getenv('RESPONSE_FINAL_WAIT', '120'))
+
+    # Etapas de generación y formateo: sequential (una tras otra), pipelined (el formateo
+    # de cada párrafo se traslapa con la generación en streaming) o local (formateo sin LLM)
+    PIPELINE_MODE = os.getenv('PIPELINE_MODE', 'pipelined')
+    # Tamaño mínimo (caracteres) de un segmento antes de enviarlo a formatear
+    PIPELINE_MIN_SEGMENT_CHARS = int(os.getenv('PIPELINE_MIN_SEGMENT_CHARS', '600'))
+    # Máximo de llamadas de formateo por respuesta; el resto del texto se formatea en la última
+    PIPELINE_MAX_SEGMENTS = int(os.getenv('PIPELINE_MAX_SEGMENTS', '3'))
+    
+    # Historial de chat: mensajes renderizados por página
+    CHAT_HISTORY_PAGE_SIZE = int(os.getenv('CHAT_HISTORY_PAGE_SIZE', '20'))
+    # Mensajes previos que se envían al modelo como historial
+    HISTORY_WINDOW = int(os.getenv('HISTORY_WINDOW', '5'))
+    
+    # Persistencia de conversaciones (SQLite en modo WAL)
+    CONVERSATIONS_DB = Path(os.getenv('CONVERSATIONS_DB', str(CACHE_DIR / 'conversations.db')))
+    CONVERSATION_FLUSH_SIZE = int(os.getenv('CONVERSATION_FLUSH_SIZE', '20'))
+    CONVERSATION_FLUSH_INTERVAL = float(os.getenv('CONVERSATION_FLUSH_INTERVAL', '2'))
+
+    # Sesiones inactivas: pasado SESSION_IDLE_TIMEOUT (segundos) se liberan su chatbot y sus
+    # mensajes en memoria (ya guardados en CONVERSATIONS_DB); se revisan cada SESSION_REAP_INTERVAL
+    SESSION_IDLE_TIMEOUT = float(os.getenv('SESSION_IDLE_TIMEOUT', '1800'))
+    SESSION_REAP_INTERVAL = float(os.getenv('SESSION_REAP_INTERVAL', '60'))
     
     # Update cookie settings
     COOKIE_NAME = "raesa_chat_cookie"
     COOKIE_KEY = "raesa_chat_signature"
-    COOKIE_EXPIRY_DAYS = 30
\ No newline at end of file
+    COOKIE_EXPIRY_DAYS = 30
+    # Cookies de re-autenticación validados recientemente (por proceso)
+    AUTH_COOKIE_CACHE_SIZE = int(os.getenv('AUTH_COOKIE_CACHE_SIZE', '256'))
+    AUTH_LOGIN_SLEEP_TIME = float(os.getenv('AUTH_LOGIN_SLEEP_TIME', '0'))
\ No newline at end of file
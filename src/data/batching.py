@@ -0,0 +1,134 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import sys
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.config import Config
+
+
+class _Pending:
+    __slots__ = ("item", "caller", "done", "result", "error", "queued", "lead")
+
+    def __init__(self, item: Any, caller: object):
+        self.item = item
+        self.caller = caller
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.queued = time.perf_counter()
+        self.lead = False
+
+
+class MicroBatcher:
+    """Run calls that arrive within a short window as one batched call.
+
+    The first caller of a batch waits up to `window` seconds (less once
+    `max_batch` items are queued), then runs `fn` on every queued item and
+    hands each caller its result; the other callers only wait. The wait ends
+    as soon as every caller in flight has queued, so a lone query pays no delay.
+    Items left over beyond `max_batch` promote one of their callers to lead
+    the next batch, so no background thread is needed.
+    """
+
+    def __init__(self, fn: Callable[[List[Any]], Sequence[Any]],
+                 window: float = Config.BATCH_WINDOW_MS / 1000,
+                 max_batch: int = Config.BATCH_MAX_SIZE):
+        self.fn = fn
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self._cond = threading.Condition()
+        self._queue: List[_Pending] = []
+        self._collecting = False
+        self._active = 0
+        self._batches = 0
+        self._items = 0
+        self._largest = 0
+        self._wait = 0.0
+        self._run_time = 0.0
+
+    def submit(self, item: Any) -> Any:
+        return self.submit_many([item])[0]
+
+    def submit_many(self, items: Sequence[Any]) -> List[Any]:
+        """Queue `items` together and block until all of them are processed"""
+        caller = object()
+        pending = [_Pending(item, caller) for item in items]
+        with self._cond:
+            self._active += 1
+            self._queue.extend(pending)
+            lead = not self._collecting
+            self._collecting = True
+            self._cond.notify_all()
+        try:
+            if lead:
+                self._lead()
+            for call in pending:
+                call.done.wait()
+                while call.lead:
+                    # Promoted: this call heads the queue, so it runs in the batch we lead
+                    call.lead = False
+                    call.done.clear()
+                    self._lead()
+                    call.done.wait()
+        finally:
+            with self._cond:
+                self._active -= 1
+        for call in pending:
+            if call.error is not None:
+                raise call.error
+        return [call.result for call in pending]
+
+    def _lead(self):
+        deadline = time.perf_counter() + self.window
+        with self._cond:
+            # Stop early once every caller in flight has queued: nobody else is about to join
+            while len(self._queue) < self.max_batch and self._active > len({c.caller for c in self._queue}):
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch, self._queue = self._queue[:self.max_batch], self._queue[self.max_batch:]
+            if self._queue:
+                self._queue[0].lead = True
+                self._queue[0].done.set()
+            else:
+                self._collecting = False
+
+        start = time.perf_counter()
+        try:
+            results = self.fn([call.item for call in batch])
+            for call, result in zip(batch, results):
+                call.result = result
+        except BaseException as e:
+            for call in batch:
+                call.error = e
+        finished = time.perf_counter()
+        with self._cond:
+            self._batches += 1
+            self._items += len(batch)
+            self._largest = max(self._largest, len(batch))
+            self._wait += sum(start - call.queued for call in batch)
+            self._run_time += finished - start
+        for call in batch:
+            call.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """Batching efficiency: batch sizes, calls saved and time spent waiting for a batch"""
+        with self._cond:
+            batches, items = self._batches, self._items
+            return {
+                "batches": batches,
+                "items": items,
+                "mean_batch": items / batches if batches else 0.0,
+                "max_batch": self._largest,
+                "calls_saved": items - batches,
+                "mean_wait_ms": self._wait / items * 1000 if items else 0.0,
+                "mean_run_ms": self._run_time / batches * 1000 if batches else 0.0,
+                "queued": len(self._queue),
+            }
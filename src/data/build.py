@@ -0,0 +1,299 @@
+"""Offline preprocessing: turn the processed JSON files into a runtime bundle.
+
+Reads DATA_PATH, RAESA_DATA_PATH and MARKET_ANALYSIS_PATH once, streaming,
+and writes a versioned bundle (columnar tables, DataBook section index,
+market rollups, FAISS index, manifest with content hashes) that the app only
+has to memory-map.
+
+Usage:
+    python -m src.data.build [--workers 4] [--batch-size 256] [--no-reuse]
+"""
+import argparse
+import codecs
+import hashlib
+import json
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import sys
+
+import numpy as np
+from langchain_core.documents import Document
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.config import Config
+from src.chatbot.metrics import LatencyRecorder
+from src.data.chunking import chunk_record
+from src.data.filters import FILTERS_FILE, build_filters, content_tags
+from src.data.records import present
+from src.data.shared_index import STAMP_FILE, SharedIndex, create_index, write_version
+
+SECTIONS_FILE = "sections.json"
+MARKET_FILE = "market.json"
+_WHITESPACE = " \t\r\n"
+
+
+def iter_json_array(path, hasher=None, chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """Yield the items of a top-level JSON array without loading the whole file.
+
+    `hasher` (e.g. hashlib.sha256()) is fed the raw bytes as they are read, so
+    the content hash comes from the same pass.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer, position, eof = "", 0, False
+
+    with open(path, "rb") as f:
+        def fill():
+            nonlocal buffer, position, eof
+            block = f.read(chunk_size)
+            if hasher is not None:
+                hasher.update(block)
+            eof = not block
+            buffer = buffer[position:] + utf8.decode(block, final=eof)
+            position = 0
+
+        def skip(chars: str):
+            nonlocal position
+            while True:
+                while position < len(buffer) and buffer[position] in chars:
+                    position += 1
+                if position < len(buffer) or eof:
+                    return
+                fill()
+
+        skip(_WHITESPACE)
+        if position >= len(buffer) or buffer[position] != "[":
+            raise ValueError(f"{path} is not a JSON array")
+        position += 1
+        while True:
+            skip(_WHITESPACE + ",")
+            if position >= len(buffer):
+                raise ValueError(f"{path}: unterminated JSON array")
+            if buffer[position] == "]":
+                break
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()  # item continues in the next block
+                continue
+            if end == len(buffer) and not eof:
+                fill()  # a number may be cut at the block boundary
+                continue
+            yield item
+            position = end
+        while not eof:
+            fill()  # hash the trailing bytes too
+
+
+def section_index(items) -> Dict[str, List[str]]:
+    """DataBook contents grouped the way the prompt context uses them"""
+    sections = {"servicios": [], "areas_cobertura": [], "ventajas_competitivas": []}
+    for item in items:
+        if item.get("Documento") != "DataBook":
+            continue
+        section = (item.get("Sección") or "").lower()
+        content = item.get("Contenido") or ""
+        if "servicios" in section:
+            sections["servicios"].append(content)
+        if "áreas" in section or "cobertura" in section:
+            sections["areas_cobertura"].append(content)
+        if "ventajas" in section:
+            sections["ventajas_competitivas"].append(content)
+    return sections
+
+
+class MarketRollup:
+    """Per-market aggregates accumulated one property at a time"""
+
+    def __init__(self):
+        self.markets: Dict[str, Dict[str, Any]] = defaultdict(lambda: {
+            "propiedades": 0, "area_disponible": 0.0, "rentas": [], "tipos": defaultdict(int)
+        })
+
+    def add(self, record: Dict[str, Any]):
+        market = self.markets[str(record.get("market2") or "Sin mercado").strip()]
+        market["propiedades"] += 1
+        if present(record.get("Available")):
+            market["area_disponible"] += float(record["Available"])
+        if present(record.get("min")) and record["min"] > 0:
+            market["rentas"].append(float(record["min"]))
+        market["tipos"][record.get("type") or "N/A"] += 1
+
+    def result(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {
+                "propiedades": market["propiedades"],
+                "area_disponible": market["area_disponible"],
+                "renta_promedio": sum(market["rentas"]) / len(market["rentas"]) if market["rentas"] else None,
+                "tipos": dict(market["tipos"]),
+            }
+            for name, market in sorted(self.markets.items(), key=lambda kv: -kv[1]["propiedades"])
+        }
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def known_vectors(root: Path = Config.SHARED_INDEX_DIR, embeddings=None) -> Dict[str, np.ndarray]:
+    """Vectors already computed for a text, from the live version or the legacy FAISS cache"""
+    vectors: Dict[str, np.ndarray] = {}
+    stamp = Path(root) / STAMP_FILE
+    if stamp.exists():
+        current = SharedIndex(Path(root) / stamp.read_text(encoding="utf-8").strip())
+        for position, text in enumerate(current.texts):
+            # Compressed indexes only reconstruct approximations; prefer the exact matrix
+            vectors[_text_hash(text)] = (current.vectors.matrix[position] if current.vectors is not None
+                                         else current.index.reconstruct(position))
+    elif Config.EMBEDDINGS_CACHE.exists() and embeddings is not None:
+        from langchain_community.vectorstores import FAISS
+        try:
+            legacy = FAISS.load_local(str(Config.EMBEDDINGS_CACHE), embeddings,
+                                      allow_dangerous_deserialization=True)
+        except Exception as e:
+            print(f"Ignoring unreadable embeddings cache: {e}")
+            return vectors
+        for position, doc_id in legacy.index_to_docstore_id.items():
+            vectors[_text_hash(legacy.docstore.search(doc_id).page_content)] = legacy.index.reconstruct(position)
+    return vectors
+
+
+def embed_texts(embeddings, texts: List[str], workers: int = Config.BUILD_WORKERS,
+                batch_size: int = Config.BUILD_BATCH_SIZE,
+                reuse: Optional[Dict[str, np.ndarray]] = None) -> Tuple[np.ndarray, int]:
+    """Embed texts in parallel batches, skipping those with a known vector; returns (vectors, embedded)"""
+    reuse = reuse or {}
+    hashes = [_text_hash(text) for text in texts]
+    missing = [i for i, h in enumerate(hashes) if h not in reuse]
+    batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+    computed: Dict[int, List[float]] = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = pool.map(lambda batch: embeddings.embed_documents([texts[i] for i in batch]), batches)
+        for batch, vectors in zip(batches, results):
+            computed.update(zip(batch, vectors))
+    matrix = np.stack([
+        np.asarray(computed[i] if i in computed else reuse[hashes[i]], dtype=np.float32)
+        for i in range(len(texts))
+    ]) if texts else np.zeros((0, Config.EMBEDDING_DIMENSION), dtype=np.float32)
+    return matrix, len(missing)
+
+
+def build_bundle(path: Path, embeddings, workers: int = Config.BUILD_WORKERS,
+                 batch_size: int = Config.BUILD_BATCH_SIZE, reuse: bool = True,
+                 timings: Optional[Dict[str, float]] = None,
+                 index_factory: str = Config.INDEX_FACTORY) -> int:
+    """Write a complete bundle into `path`; returns the number of indexed chunks"""
+    timings = {} if timings is None else timings
+    recorder = LatencyRecorder()
+
+    with recorder.time("load", timings):
+        data_hash, databook_hash, market_hash = hashlib.sha256(), hashlib.sha256(), hashlib.sha256()
+        records: List[Dict[str, Any]] = []
+        documents: List[Document] = []
+        rollup = MarketRollup()
+
+        def load_properties():
+            for record in iter_json_array(Config.DATA_PATH, data_hash):
+                documents.extend(chunk_record(record, f"real_estate:{len(records)}", {
+                    "source": str(len(records)), "Documento": "real_estate",
+                    "market2": str(record.get("market2") or "").strip() or None,
+                }))
+                records.append(record)
+                rollup.add(record)
+
+        def load_databook():
+            return list(iter_json_array(Config.RAESA_DATA_PATH, databook_hash))
+
+        def load_market():
+            with open(Config.MARKET_ANALYSIS_PATH, "rb") as f:
+                raw = f.read()
+            market_hash.update(raw)
+            return json.loads(raw)
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            properties = pool.submit(load_properties)
+            databook_future = pool.submit(load_databook)
+            market_future = pool.submit(load_market)
+            properties.result()
+            databook = databook_future.result()
+            market_analysis = market_future.result()
+
+        # Long DataBook entries are searched as chunks; the prompt gets only the retrieved ones
+        for i, item in enumerate(databook):
+            for chunk in chunk_record(item, f"databook:{i}", {
+                "source": "databook", "Documento": item.get("Documento"), "Sección": item.get("Sección"),
+            }):
+                chunk.metadata.update(content_tags(chunk.page_content))
+                documents.append(chunk)
+        texts = [doc.page_content for doc in documents]
+
+        # The index size check counts chunks, so it cannot see a record that produced none
+        indexed = {doc.metadata["parent"] for doc in documents}
+        missing = [parent for parent in (
+            [f"real_estate:{i}" for i in range(len(records))] + [f"databook:{i}" for i in range(len(databook))]
+        ) if parent not in indexed]
+        if missing:
+            raise ValueError(f"{len(missing)} source records have no indexed chunk, e.g. {missing[:5]}")
+
+    with recorder.time("embed", timings):
+        known = known_vectors(embeddings=embeddings) if reuse else {}
+        vectors, embedded = embed_texts(embeddings, texts, workers, batch_size, known)
+    print(f"Embedded {embedded} new texts, reused {len(texts) - embedded} ({len(texts)} chunks from "
+          f"{len(records)} properties and {len(databook)} DataBook entries)")
+
+    with recorder.time("index", timings):
+        index = create_index(vectors, index_factory)
+
+    with recorder.time("write", timings):
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        with open(path / SECTIONS_FILE, "w", encoding="utf-8") as f:
+            json.dump(section_index(databook), f, ensure_ascii=False)
+        with open(path / MARKET_FILE, "w", encoding="utf-8") as f:
+            json.dump({"analisis": market_analysis, "por_mercado": rollup.result()}, f, ensure_ascii=False)
+        with open(path / FILTERS_FILE, "w", encoding="utf-8") as f:
+            json.dump(build_filters(doc.metadata for doc in documents), f, ensure_ascii=False)
+        write_version(path, index, documents, tables={
+            "real_estate": records,
+            "databook": databook,
+        }, manifest={"sources": {
+            "data": data_hash.hexdigest(),
+            "raesa_data": databook_hash.hexdigest(),
+            "market_analysis": market_hash.hexdigest(),
+        }, "index_factory": index_factory, "chunk_max_tokens": Config.CHUNK_MAX_TOKENS}, vectors=vectors)
+    return len(texts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=Config.BUILD_WORKERS, help="parallel embedding requests")
+    parser.add_argument("--batch-size", type=int, default=Config.BUILD_BATCH_SIZE, help="texts per embedding request")
+    parser.add_argument("--no-reuse", action="store_true", help="re-embed every text instead of reusing known vectors")
+    args = parser.parse_args()
+
+    from src.data.index_builder import IndexBuilder
+
+    builder = IndexBuilder(workers=args.workers, batch_size=args.batch_size, reuse=not args.no_reuse)
+    start = time.perf_counter()
+    try:
+        version = builder.build(force=True)
+    except Exception:
+        sys.exit(2)
+    if version is None:
+        sys.exit(1)
+    for stage, seconds in builder.last_timings.items():
+        print(f"{stage:>8}: {seconds:.2f}s")
+    print(f"{'total':>8}: {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
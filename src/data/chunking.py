@@ -0,0 +1,157 @@
+import re
+from typing import Any, Dict, List, Optional, Sequence
+import sys
+from pathlib import Path
+
+from langchain_core.documents import Document
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.config import Config
+from src.data.records import describe_record, estimate_tokens
+
+# "1.1. Fuente de Datos", "Fortalezas", "Introducción": short lines without closing punctuation
+HEADING = re.compile(r'^(\d+(\.\d+)*\.?\s+\S.{0,80}|[^\W\d_][^.!?;:]{0,60})$')
+SENTENCE_END = re.compile(r'(?<=[.!?;])\s+')
+GAP = "\n[...]\n"
+
+
+def _blocks(text: str) -> List[str]:
+    """Paragraphs and headed sections; a heading starts a new block and stays with its body"""
+    blocks, current = [], []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped or HEADING.match(stripped):
+            if current:
+                blocks.append("\n".join(current))
+            current = [stripped] if stripped else []
+        else:
+            current.append(stripped)
+    if current:
+        blocks.append("\n".join(current))
+    return blocks
+
+
+def _pieces(block: str, max_tokens: int) -> List[str]:
+    """A block that fits, or its sentences (words for run-on sentences) that do"""
+    if estimate_tokens(block) <= max_tokens:
+        return [block]
+    pieces = []
+    for sentence in SENTENCE_END.split(block):
+        if estimate_tokens(sentence) <= max_tokens:
+            pieces.append(sentence)
+            continue
+        words, part = sentence.split(" "), []
+        for word in words:
+            if part and estimate_tokens(" ".join(part + [word])) > max_tokens:
+                pieces.append(" ".join(part))
+                part = []
+            part.append(word)
+        pieces.append(" ".join(part))
+    return pieces
+
+
+def split_text(text: str, max_tokens: int = Config.CHUNK_MAX_TOKENS) -> List[str]:
+    """Split on section, paragraph and sentence boundaries into chunks of at most `max_tokens`"""
+    chunks, current = [], ""
+    for block in _blocks(text):
+        for piece in _pieces(block, max_tokens):
+            candidate = f"{current}\n{piece}" if current else piece
+            if current and estimate_tokens(candidate) > max_tokens:
+                chunks.append(current)
+                candidate = piece
+            current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def chunk_record(record: Dict[str, Any], parent: str, metadata: Optional[Dict[str, Any]] = None,
+                 max_tokens: int = Config.CHUNK_MAX_TOKENS) -> List[Document]:
+    """'column: value' documents for one record, long fields split into chunks.
+
+    A record that fits stays one document with the same text as before. Otherwise
+    every chunk repeats the short fields as a header, so it embeds (and reads)
+    with its context, and carries its parent id and position within the parent.
+    A record that is long only because it has many short fields is split
+    between its field lines. Every record yields at least one document.
+    """
+    base = {**(metadata or {}), "parent": parent}
+    text = describe_record(record)
+    if estimate_tokens(text) <= max_tokens:
+        return [Document(page_content=text, metadata={**base, "chunk": 0, "chunks": 1, "header": 0})]
+
+    long_fields = [name for name, value in record.items()
+                   if isinstance(value, str) and estimate_tokens(value) > max_tokens // 4]
+    if long_fields:
+        header = describe_record({name: value for name, value in record.items() if name not in long_fields})
+        header = f"{header}\n" if header else ""
+        # Leave room for the header and the "field: " prefix
+        budget = max(max_tokens // 4, max_tokens - estimate_tokens(header) - 4)
+        bodies = [f"{name}: {chunk}" for name in long_fields for chunk in split_text(record[name], budget)]
+    else:
+        # No field to split: one block per "field: value" line, so chunks break between fields
+        header = ""
+        bodies = split_text("\n\n".join(text.splitlines()), max_tokens)
+    bodies = bodies or [text]
+    return [
+        Document(page_content=header + body,
+                 metadata={**base, "chunk": i, "chunks": len(bodies), "header": len(header)})
+        for i, body in enumerate(bodies)
+    ]
+
+
+def expand_window(documents: Sequence[Document], index, window: int = Config.CHUNK_PARENT_WINDOW,
+                  token_budget: int = Config.RERANK_TOKEN_BUDGET) -> List[Document]:
+    """Merge chunks of the same parent and add up to `window` neighbouring chunks around each.
+
+    Neighbours are added for the best-ranked chunks first and only while the
+    total stays within `token_budget`. Chunks of a parent are stored at
+    consecutive index positions, so a neighbour is one document lookup.
+    """
+    used = sum(estimate_tokens(doc.page_content) for doc in documents)
+    parents: Dict[str, Dict[int, Document]] = {}
+    order: List[Any] = []
+    for doc in documents:
+        parent, position = doc.metadata.get("parent"), doc.metadata.get("position")
+        if parent is None or position is None or doc.metadata.get("chunks", 1) <= 1:
+            order.append(doc)
+            continue
+        if parent not in parents:
+            parents[parent] = {}
+            order.append(parent)
+        parents[parent][doc.metadata["chunk"]] = doc
+
+    for doc in documents:
+        parent = doc.metadata.get("parent")
+        if parent not in parents or doc.metadata.get("position") is None:
+            continue
+        chunk, position = doc.metadata["chunk"], doc.metadata["position"]
+        for offset in [o for d in range(1, window + 1) for o in (d, -d)]:
+            neighbour = chunk + offset
+            if not 0 <= neighbour < doc.metadata["chunks"] or neighbour in parents[parent]:
+                continue
+            candidate = index.document(position + offset)
+            tokens = estimate_tokens(candidate.page_content[candidate.metadata.get("header", 0):])
+            if used + tokens > token_budget:
+                continue
+            parents[parent][neighbour] = candidate
+            used += tokens
+
+    merged = []
+    for item in order:
+        if isinstance(item, Document):
+            merged.append(item)
+            continue
+        chunks = parents[item]
+        numbers = sorted(chunks)
+        first = chunks[numbers[0]]
+        text = first.page_content
+        for previous, number in zip(numbers, numbers[1:]):
+            doc = chunks[number]
+            text += ("\n" if number == previous + 1 else GAP) + doc.page_content[doc.metadata.get("header", 0):]
+        merged.append(Document(page_content=text, metadata={**first.metadata, "merged": numbers}))
+    return merged
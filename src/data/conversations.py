@@ -0,0 +1,167 @@
+import atexit
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import sys
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.config import Config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    html TEXT,
+    timestamp REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_user_time ON messages (user_id, timestamp);
+"""
+
+
+class ConversationStore:
+    """Per-user chat history persisted in SQLite (WAL mode) with batched writes.
+
+    Messages are buffered and written once `flush_size` accumulate, every
+    `flush_interval` seconds by a background thread, and at exit. Reads
+    merge the buffer in, so they never force a write.
+    """
+
+    def __init__(self, path: Path = Config.CONVERSATIONS_DB,
+                 flush_size: int = Config.CONVERSATION_FLUSH_SIZE,
+                 flush_interval: float = Config.CONVERSATION_FLUSH_INTERVAL):
+        self.path = Path(path)
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._pending: List[Tuple[str, str, str, Optional[str], float]] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        atexit.register(self.flush)
+        threading.Thread(target=self._run, name="conversation-flush", daemon=True).start()
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread; Streamlit runs each session on its own thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def append(self, user_id: str, message: Dict[str, Any]):
+        """Queue a message; it is written with the next batch"""
+        with self._lock:
+            self._pending.append((
+                user_id,
+                message["role"],
+                str(message["content"]),
+                message.get("html"),
+                message["timestamp"],
+            ))
+            due = (len(self._pending) >= self.flush_size
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write all queued messages in one transaction"""
+        with self._lock:
+            batch, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+            if not batch:
+                return
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO messages (user_id, role, content, html, timestamp) VALUES (?, ?, ?, ?, ?)",
+                    batch
+                )
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                if time.monotonic() - self._last_flush >= self.flush_interval:
+                    self.flush()
+            except Exception as e:
+                print(f"Conversation flush failed: {e}")
+
+    def _buffered(self, user_id: str, before: Optional[float]) -> List[Dict[str, Any]]:
+        """A user's messages still waiting in the buffer (lock held)"""
+        return [
+            self._to_message({"role": role, "content": content, "html": html, "timestamp": timestamp})
+            for uid, role, content, html, timestamp in self._pending
+            if uid == user_id and (before is None or timestamp < before)
+        ]
+
+    def count(self, user_id: str, before: Optional[float] = None) -> int:
+        """Number of stored messages, optionally only those older than `before`"""
+        query = "SELECT COUNT(*) FROM messages WHERE user_id = ?"
+        params: List[Any] = [user_id]
+        if before is not None:
+            query += " AND timestamp < ?"
+            params.append(before)
+        # Under the lock a flush cannot move rows from the buffer to the table mid-read
+        with self._lock:
+            return self._connection().execute(query, params).fetchone()[0] + len(self._buffered(user_id, before))
+
+    def load_window(self, user_id: str, limit: int, before: Optional[float] = None) -> List[Dict[str, Any]]:
+        """The `limit` most recent messages (older than `before`), oldest first"""
+        query = "SELECT role, content, html, timestamp FROM messages WHERE user_id = ?"
+        params: List[Any] = [user_id]
+        if before is not None:
+            query += " AND timestamp < ?"
+            params.append(before)
+        query += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._connection().execute(query, params).fetchall()
+            buffered = self._buffered(user_id, before)
+        stored = [self._to_message(row) for row in reversed(rows)]
+        # Stable sort: stored rows keep their order and come before buffered ones with the same timestamp
+        return sorted(stored + buffered, key=lambda message: message["timestamp"])[-limit:]
+
+    def iter_messages(self, user_id: str) -> Iterator[Dict[str, Any]]:
+        """Stream a user's full history, oldest first, without loading it all"""
+        self.flush()
+        cursor = self._connection().execute(
+            "SELECT role, content, html, timestamp FROM messages WHERE user_id = ? ORDER BY timestamp, id",
+            (user_id,)
+        )
+        for row in cursor:
+            yield self._to_message(row)
+
+    @staticmethod
+    def _to_message(row) -> Dict[str, Any]:
+        message = {"role": row["role"], "content": row["content"], "timestamp": row["timestamp"]}
+        if row["html"] is not None:
+            message["html"] = row["html"]
+        return message
+
+
+_store: Optional[ConversationStore] = None
+_store_lock = threading.Lock()
+
+
+def get_conversation_store() -> ConversationStore:
+    """Return the process-wide conversation store"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ConversationStore()
+    return _store
@@ -1,7 +1,7 @@
 import pickle
 from pathlib import Path
 import faiss
-from typing import List, Dict
+from typing import List, Dict, Optional
 import numpy as np
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import FAISS
@@ -14,8 +14,10 @@ if project_root not in sys.path:
     sys.path.append(project_root)
 
 from src.config import Config
-import pickle
-import pandas as pd
+from src.data.shared_index import SharedIndexManager, get_shared_index_manager
+from src.data.vectors import DocumentVectors
+from src.data.index_builder import get_index_builder
+from src.data.records import describe_record
 
 class EmbeddingManager:
     def __init__(self):
@@ -25,6 +27,30 @@ class EmbeddingManager:
         self.cache_dir = Config.CACHE_DIR
         self.cache_dir.mkdir(exist_ok=True)
         
+    def load_shared_index(self) -> SharedIndexManager:
+        """Map the shared index bundle, building it on first use"""
+        manager = get_shared_index_manager(self.embeddings)
+        if manager.exists():
+            # Sources changed since the live version was built: rebuild without blocking
+            builder = get_index_builder(self)
+            if builder.needs_rebuild() and builder.start_background_build():
+                print("Source data changed, rebuilding shared index in the background...")
+        else:
+            print("Building shared index bundle...")
+            builder = get_index_builder(self)
+            if builder.build(force=True) is None:
+                # Another worker holds the build lock; map its bundle once published
+                builder.wait_until_published()
+        return manager
+
+    def document_vectors(self) -> Optional[DocumentVectors]:
+        """Memory-mapped float32 matrix of the current version's document vectors"""
+        # Read the mapped version directly; the source-hash check belongs to loading, not every lookup
+        manager = get_shared_index_manager(self.embeddings)
+        if not manager.exists():
+            manager = self.load_shared_index()
+        return manager.current().vectors
+
     def create_service_embeddings(self, df) -> FAISS:
         """Create or load cached embeddings for RAESA services"""
         if Config.EMBEDDINGS_CACHE.exists():
@@ -65,20 +91,5 @@ class EmbeddingManager:
         """
         Creates textual descriptions combining document content and metadata.
         """
-        descriptions = []
-        
-        for _, row in df.iterrows():
-            # Combine all relevant characteristics into text
-            description_parts = []
-            
-            # Add each available field to description
-            for column in df.columns:
-                if pd.notna(row[column]):
-                    value = str(row[column])
-                    description_parts.append(f"{column}: {value}")
-            
-            # Join all parts into complete description
-            full_description = "\n".join(description_parts)
-            descriptions.append(full_description)
-        
-        return descriptions
+        # Same text as the index build, so both paths embed identical strings
+        return [describe_record(row.to_dict()) for _, row in df.iterrows()]
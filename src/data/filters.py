@@ -0,0 +1,83 @@
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.config import Config
+
+FILTERS_FILE = "filters.json"
+# Metadata fields with an inverted list per value; "Documento" also defines the shards
+FILTER_FIELDS = ("Documento", "Sección", "sector", "service", "market2")
+VOCABULARIES = {"sector": Config.SEARCH_SECTORS, "service": Config.SEARCH_SERVICES}
+
+
+def fold(text: str) -> str:
+    """Lowercase, accent-free text with single spaces, for keyword matching"""
+    text = unicodedata.normalize("NFKD", str(text).lower())
+    return " ".join("".join(ch for ch in text if not unicodedata.combining(ch)).split())
+
+
+NON_WORD = re.compile(r'[^\w]+')
+
+
+def _words(text: str) -> str:
+    """Folded words padded with spaces, so ' monterrey ' matches whole words only"""
+    return " " + " ".join(NON_WORD.sub(" ", fold(text)).split()) + " "
+
+
+def tag_text(text: str, vocabulary: Dict[str, List[str]]) -> List[str]:
+    """Names in `vocabulary` with at least one keyword in `text`"""
+    text = fold(text)
+    return [name for name, keywords in vocabulary.items() if any(keyword in text for keyword in keywords)]
+
+
+def content_tags(text: str) -> Dict[str, List[str]]:
+    """Sector and service tags of a chunk, from the configured keywords"""
+    return {field: tag_text(text, vocabulary) for field, vocabulary in VOCABULARIES.items()}
+
+
+def build_filters(metadatas: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, List[int]]]:
+    """Inverted lists field -> value -> positions over FILTER_FIELDS (list values count for each item)"""
+    filters: Dict[str, Dict[str, List[int]]] = {field: {} for field in FILTER_FIELDS}
+    for position, metadata in enumerate(metadatas):
+        for field in FILTER_FIELDS:
+            values = metadata.get(field)
+            for value in values if isinstance(values, list) else [values]:
+                if value is not None and str(value).strip():
+                    filters[field].setdefault(str(value).strip(), []).append(position)
+    return {field: values for field, values in filters.items() if values}
+
+
+def select(filters: Dict[str, Dict[str, List[int]]], scope: Dict[str, List[str]]) -> Optional[np.ndarray]:
+    """Sorted positions matching every field of `scope` (any of its values); None for an empty scope"""
+    selected = None
+    for field, values in scope.items():
+        lists = [filters.get(field, {}).get(value, []) for value in values]
+        positions = np.unique(np.concatenate([np.asarray(p, dtype=np.int64) for p in lists])) \
+            if lists else np.zeros(0, dtype=np.int64)
+        selected = positions if selected is None else np.intersect1d(selected, positions, assume_unique=True)
+    return selected
+
+
+def query_scope(query: str, filters: Dict[str, Dict[str, List[int]]],
+                fields: List[str] = Config.SEARCH_SCOPE_FIELDS) -> Dict[str, List[str]]:
+    """Filter values a query mentions: sector/service by keyword, other fields by value name"""
+    words = _words(query)
+    scope = {}
+    for field in fields:
+        known = filters.get(field, {})
+        if field in VOCABULARIES:
+            values = [name for name in tag_text(query, VOCABULARIES[field]) if name in known]
+        else:
+            values = [value for value in known if _words(value) in words]
+        if values:
+            scope[field] = values
+    return scope
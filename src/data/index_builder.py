@@ -0,0 +1,206 @@
+"""Rebuild the shared index in the background and hot-swap it.
+
+Usage (e.g. from cron):
+    python -m src.data.index_builder            # rebuild only if the source JSON changed
+    python -m src.data.index_builder --force    # always rebuild
+    python -m src.data.index_builder --check    # exit 1 if a rebuild is needed
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+import sys
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.config import Config
+from src.data.build import build_bundle
+from src.data.shared_index import STAMP_FILE, activate_version, staging_path
+
+LOCK_FILE = ".build.lock"
+
+
+def source_fingerprint() -> Dict[str, str]:
+    """Content hashes of the processed JSON files the index is built from"""
+    hashes = {}
+    for name, path in (("data", Config.DATA_PATH), ("raesa_data", Config.RAESA_DATA_PATH),
+                       ("market_analysis", Config.MARKET_ANALYSIS_PATH)):
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        hashes[name] = digest.hexdigest()
+    return hashes
+
+
+class IndexBuilder:
+    """Builds new index versions next to the live one and swaps them in atomically.
+
+    A version is written to a hidden staging directory, validated, renamed into
+    place and only then announced through the CURRENT stamp. Workers map the
+    new version on their next stamp check; queries already running keep the
+    SharedIndex they started with, and its files stay readable until unmapped.
+    """
+
+    def __init__(self, root: Path = Config.SHARED_INDEX_DIR, embedding_manager=None,
+                 workers: int = Config.BUILD_WORKERS, batch_size: int = Config.BUILD_BATCH_SIZE,
+                 reuse: bool = True):
+        self.root = Path(root)
+        self.embedding_manager = embedding_manager
+        self.workers = workers
+        self.batch_size = batch_size
+        self.reuse = reuse
+        self.last_timings: Dict[str, float] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self.last_error: Optional[str] = None
+
+    def current_manifest(self) -> Optional[Dict]:
+        try:
+            version = (self.root / STAMP_FILE).read_text(encoding="utf-8").strip()
+            with open(self.root / version / "manifest.json", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+
+    def needs_rebuild(self) -> bool:
+        manifest = self.current_manifest()
+        return manifest is None or manifest.get("sources") != source_fingerprint()
+
+    def _acquire_lock(self) -> bool:
+        """Cross-process lock so only one worker builds at a time"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        lock = self.root / LOCK_FILE
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            # A crashed builder leaves its lock behind
+            if time.time() - lock.stat().st_mtime < Config.INDEX_BUILD_LOCK_TIMEOUT:
+                return False
+            lock.unlink(missing_ok=True)
+            return self._acquire_lock()
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        return True
+
+    def _release_lock(self):
+        (self.root / LOCK_FILE).unlink(missing_ok=True)
+
+    def build(self, force: bool = False) -> Optional[str]:
+        """Build, validate and activate a new version; returns it, or None if skipped"""
+        if not force and not self.needs_rebuild():
+            print("Shared index is up to date")
+            return None
+        if not self._acquire_lock():
+            print("Another index build is already running")
+            return None
+        staging = staging_path(self.root)
+        try:
+            start = time.perf_counter()
+            version = self._build_into(staging)
+            self.prune()
+            print(f"Shared index version {version} activated in {time.perf_counter() - start:.1f}s")
+            self.last_error = None
+            return version
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Index build failed: {e}")
+            raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+            self._release_lock()
+
+    def _build_into(self, staging: Path) -> str:
+        from src.data.embeddings import EmbeddingManager
+
+        embedding_manager = self.embedding_manager or EmbeddingManager()
+        self.last_timings = {}
+        count = build_bundle(staging, embedding_manager.embeddings, self.workers, self.batch_size,
+                             self.reuse, self.last_timings)
+        start = time.perf_counter()
+        version = activate_version(self.root, staging, expected_count=count)
+        self.last_timings["activate"] = time.perf_counter() - start
+        return version
+
+    def prune(self, keep: int = Config.SHARED_INDEX_KEEP_VERSIONS):
+        """Delete old versions; processes still mapping them keep their open files"""
+        current = (self.root / STAMP_FILE).read_text(encoding="utf-8").strip()
+        versions = sorted((p for p in self.root.iterdir()
+                           if p.is_dir() and not p.name.startswith(".") and p.name != current),
+                          key=lambda p: p.stat().st_mtime)
+        for old in versions[:max(0, len(versions) - (keep - 1))]:
+            # Windows refuses to delete mapped files; retried on the next build
+            shutil.rmtree(old, ignore_errors=True)
+
+    def wait_until_published(self, timeout: float = Config.INDEX_BUILD_LOCK_TIMEOUT, poll: float = 1.0):
+        """Block until some process has published a version"""
+        deadline = time.monotonic() + timeout
+        while not (self.root / STAMP_FILE).exists():
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"No shared index published under {self.root} after {timeout}s")
+            time.sleep(poll)
+
+    def start_background_build(self, force: bool = False) -> bool:
+        """Run build() on a daemon thread unless one is already running"""
+        with self._thread_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._thread = threading.Thread(target=self._build_quietly, args=(force,),
+                                            name="index-builder", daemon=True)
+            self._thread.start()
+            return True
+
+    def _build_quietly(self, force: bool):
+        try:
+            self.build(force)
+        except Exception:
+            pass  # already logged and kept in last_error
+
+    @property
+    def building(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+
+_builder: Optional[IndexBuilder] = None
+_builder_lock = threading.Lock()
+
+
+def get_index_builder(embedding_manager=None) -> IndexBuilder:
+    """Return the process-wide builder, so one worker never runs two builds"""
+    global _builder
+    if _builder is None:
+        with _builder_lock:
+            if _builder is None:
+                _builder = IndexBuilder(embedding_manager=embedding_manager)
+    if _builder.embedding_manager is None:
+        _builder.embedding_manager = embedding_manager
+    return _builder
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--force", action="store_true", help="rebuild even if the sources did not change")
+    parser.add_argument("--check", action="store_true", help="only report whether a rebuild is needed")
+    args = parser.parse_args()
+
+    builder = IndexBuilder()
+    if args.check:
+        needed = builder.needs_rebuild()
+        print("Rebuild needed" if needed else "Shared index is up to date")
+        sys.exit(1 if needed else 0)
+    try:
+        builder.build(force=args.force)
+    except Exception:
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+import math
+from typing import Any, Dict
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token)"""
+    return len(text) // 4
+
+
+def present(value: Any) -> bool:
+    """False for missing values: None and NaN (how pandas marks empty cells)"""
+    return value is not None and not (isinstance(value, float) and math.isnan(value))
+
+
+def describe_record(record: Dict[str, Any]) -> str:
+    """Text that gets embedded for one record: one "field: value" line per present field"""
+    return "\n".join(f"{column}: {value}" for column, value in record.items() if present(value))
@@ -0,0 +1,586 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import sys
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.config import Config
+from src.data.vectors import DocumentVectors
+from src.data.filters import FILTERS_FILE, select
+from src.data.batching import MicroBatcher
+from src.chatbot.cache import TTLCache
+
+STAMP_FILE = "CURRENT"
+
+
+class StringColumn:
+    """Read-only column of strings stored as one UTF-8 blob plus (start, end) spans.
+
+    Both files are memory-mapped, so every process reading the same column
+    shares the page cache instead of holding its own copy.
+    """
+
+    def __init__(self, prefix: Path):
+        self.spans = np.load(f"{prefix}.spans.npy", mmap_mode="r")
+        blob_path = Path(f"{prefix}.bin")
+        # np.memmap cannot map an empty file
+        self.blob = np.memmap(blob_path, dtype=np.uint8, mode="r") if blob_path.stat().st_size else np.zeros(0, np.uint8)
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def __getitem__(self, i: int) -> Optional[str]:
+        start, end = int(self.spans[i, 0]), int(self.spans[i, 1])
+        if start < 0:
+            return None
+        return self.blob[start:end].tobytes().decode("utf-8")
+
+    def __iter__(self) -> Iterator[Optional[str]]:
+        for i in range(len(self)):
+            yield self[i]
+
+    @staticmethod
+    def write(prefix: Path, values: Iterable[Optional[str]]):
+        """Write a column; None values get a (-1, -1) span"""
+        spans = []
+        position = 0
+        with open(f"{prefix}.bin", "wb") as blob:
+            for value in values:
+                if value is None:
+                    spans.append((-1, -1))
+                    continue
+                data = value.encode("utf-8")
+                blob.write(data)
+                spans.append((position, position + len(data)))
+                position += len(data)
+        np.save(f"{prefix}.spans.npy", np.asarray(spans, dtype=np.int64).reshape(-1, 2))
+
+
+def _missing_to_none(value: Any) -> Any:
+    """Normalize NaN (pandas' missing marker) and numpy scalars for storage"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+class ColumnarTable:
+    """Memory-mapped table: numeric columns as .npy, everything else as StringColumn"""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        with open(self.directory / "schema.json", encoding="utf-8") as f:
+            self.schema: Dict[str, str] = json.load(f)
+        self.columns: Dict[str, Any] = {}
+        for i, (name, kind) in enumerate(self.schema.items()):
+            prefix = self.directory / f"c{i}"
+            if kind == "string":
+                self.columns[name] = StringColumn(prefix)
+            else:
+                self.columns[name] = np.load(f"{prefix}.npy", mmap_mode="r")
+
+    def __len__(self) -> int:
+        first = next(iter(self.columns.values()), None)
+        return len(first) if first is not None else 0
+
+    def row(self, i: int) -> Dict[str, Any]:
+        return {name: _missing_to_none(column[i]) for name, column in self.columns.items()}
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self)):
+            yield self.row(i)
+
+    def to_dataframe(self):
+        import pandas as pd
+        return pd.DataFrame({name: list(column) for name, column in self.columns.items()})
+
+    @staticmethod
+    def write(directory: Path, records: List[Dict[str, Any]]):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        names: List[str] = []
+        for record in records:
+            for name in record:
+                if name not in names:
+                    names.append(name)
+        schema = {}
+        for i, name in enumerate(names):
+            values = [_missing_to_none(record.get(name)) for record in records]
+            prefix = directory / f"c{i}"
+            present = [v for v in values if v is not None]
+            if present and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+                dtype = np.int64 if all(isinstance(v, int) for v in present) and len(present) == len(values) else np.float64
+                np.save(f"{prefix}.npy", np.asarray([np.nan if v is None else v for v in values], dtype=dtype))
+                schema[name] = np.dtype(dtype).name
+            else:
+                StringColumn.write(prefix, (None if v is None else str(v) for v in values))
+                schema[name] = "string"
+        with open(directory / "schema.json", "w", encoding="utf-8") as f:
+            json.dump(schema, f, ensure_ascii=False)
+
+
+class SharedIndex:
+    """One immutable, memory-mapped version of the search index and data caches"""
+
+    def __init__(self, path: Path, embeddings=None):
+        self.path = Path(path)
+        self.version = self.path.name
+        self.embeddings = embeddings
+        with open(self.path / "manifest.json", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.index = self._read_index(self.path / "index.faiss")
+        self.texts = StringColumn(self.path / "texts")
+        self.metadatas = StringColumn(self.path / "metadata")
+        # Exact document vectors aligned with positions (bundles built before this have none)
+        self.vectors = DocumentVectors(self.path) if DocumentVectors.exists(self.path) else None
+        # Compressed indexes only shortlist; the exact vectors decide the final order
+        self.rescore = (self.manifest.get("index_factory", "Flat") != "Flat"
+                        and self.vectors is not None and Config.INDEX_RESCORE_FACTOR > 0)
+        self._tables: Dict[str, ColumnarTable] = {}
+        self._sections: Optional[Dict[str, List[str]]] = None
+        self._filters: Optional[Dict[str, Dict[str, List[int]]]] = None
+        # Results only change with the version, so these live and die with it
+        self._embedding_cache = TTLCache(Config.QUERY_CACHE_SIZE, ttl=None)
+        self._search_cache = TTLCache(Config.QUERY_CACHE_SIZE, ttl=None)
+
+    @staticmethod
+    def _read_index(path: Path):
+        # IO_FLAG_MMAP_IFC maps flat vector storage zero-copy (faiss >= 1.8)
+        flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+        try:
+            return faiss.read_index(str(path), flags)
+        except RuntimeError:
+            return faiss.read_index(str(path))
+
+    def table(self, name: str) -> ColumnarTable:
+        if name not in self._tables:
+            self._tables[name] = ColumnarTable(self.path / "tables" / name)
+        return self._tables[name]
+
+    def sections(self) -> Dict[str, List[str]]:
+        """DataBook section index precomputed by the build step"""
+        if self._sections is None:
+            with open(self.path / "sections.json", encoding="utf-8") as f:
+                self._sections = json.load(f)
+        return self._sections
+
+    def market(self) -> Dict[str, Any]:
+        """Market analysis and per-market rollups precomputed by the build step"""
+        with open(self.path / "market.json", encoding="utf-8") as f:
+            return json.load(f)
+
+    def filters(self) -> Dict[str, Dict[str, List[int]]]:
+        """Metadata inverted lists written by the build step (empty for older bundles)"""
+        if self._filters is None:
+            try:
+                with open(self.path / FILTERS_FILE, encoding="utf-8") as f:
+                    self._filters = json.load(f)
+            except FileNotFoundError:
+                self._filters = {}
+        return self._filters
+
+    def document(self, position: int) -> Document:
+        metadata = self.metadatas[position]
+        metadata = json.loads(metadata) if metadata else {}
+        metadata["position"] = position
+        return Document(page_content=self.texts[position], metadata=metadata)
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               filter: Optional[Dict[str, List[str]]] = None) -> List[Tuple[Document, float]]:
+        """(document, squared L2 distance) pairs, nearest first, like LangChain's FAISS store.
+
+        `filter` maps metadata fields to accepted values (see filters.select);
+        only matching documents are searched. Concurrent callers are batched
+        into one search when BATCH_ENABLED.
+        """
+        if Config.BATCH_ENABLED:
+            return get_search_batcher().submit((self, embedding, k, filter))
+        return self.search_many([embedding], k, filter)[0]
+
+    def search_many(self, embeddings: Sequence[List[float]], k: int = 4,
+                    filter: Optional[Dict[str, List[str]]] = None) -> List[List[Tuple[Document, float]]]:
+        """Scored results for several query vectors with one matrix search"""
+        queries = np.asarray(embeddings, dtype=np.float32).reshape(len(embeddings), -1)
+        selected = select(self.filters(), filter) if filter else None
+        if selected is None:
+            return self._search(queries, min(k, self.index.ntotal))
+        if not len(selected):
+            return [[] for _ in queries]
+        k = min(k, len(selected))
+        if self.vectors is not None and len(selected) <= Config.SEARCH_EXACT_FRACTION * self.index.ntotal:
+            # Small subsets: exact distances over just their rows of the mapped matrix
+            distances = self.vectors.squared_l2(queries, selected)
+            return [self._ranked(selected, row, k) for row in distances]
+        params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(selected))
+        return self._search(queries, k, params)
+
+    def _search(self, queries: np.ndarray, k: int, params=None) -> List[List[Tuple[Document, float]]]:
+        if not self.rescore:
+            distances, positions = self.index.search(queries, k, params=params)
+            return [[(self.document(int(p)), float(d)) for p, d in zip(row, row_distances) if p >= 0]
+                    for row, row_distances in zip(positions, distances)]
+        _, shortlists = self.index.search(queries, min(self.index.ntotal, k * Config.INDEX_RESCORE_FACTOR), params=params)
+        results = []
+        for query, positions in zip(queries, shortlists):
+            positions = positions[positions >= 0]
+            results.append(self._ranked(positions, self.vectors.squared_l2(query, positions), k))
+        return results
+
+    def _ranked(self, positions: np.ndarray, distances: np.ndarray, k: int) -> List[Tuple[Document, float]]:
+        order = np.argsort(distances, kind="stable")[:k]
+        return [(self.document(int(positions[i])), float(distances[i])) for i in order]
+
+    def embed_query(self, query: str) -> np.ndarray:
+        return self.embed_queries([query])[0]
+
+    def embed_queries(self, queries: Sequence[str]) -> List[np.ndarray]:
+        """Query vectors, from the cache or (for the rest) one batched embedding request"""
+        vectors = [self._embedding_cache.get(query) for query in queries]
+        missing = list(dict.fromkeys(q for q, v in zip(queries, vectors) if v is None))
+        if missing:
+            if Config.BATCH_ENABLED:
+                found = get_embedding_batcher().submit_many([(self.embeddings, q) for q in missing])
+            else:
+                found = self.embeddings.embed_documents(missing) if len(missing) > 1 \
+                    else [self.embeddings.embed_query(missing[0])]
+            # float32 arrays are ~8x smaller than lists of Python floats
+            fresh = {query: np.asarray(vector, dtype=np.float32) for query, vector in zip(missing, found)}
+            for query, vector in fresh.items():
+                self._embedding_cache.put(query, vector)
+            vectors = [v if v is not None else fresh[q] for q, v in zip(queries, vectors)]
+        return vectors
+
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Hit rates of this version's query embedding and search result caches"""
+        return {"embeddings": self._embedding_cache.stats(), "search": self._search_cache.stats()}
+
+    def similarity_search_sharded(self, query: str, k: int = 4,
+                                  scope: Optional[Dict[str, List[str]]] = None) -> List[Tuple[Document, float]]:
+        """Search each Documento shard in parallel, narrowed by `scope` where it applies, and merge.
+
+        A scope field that matches nothing within a shard is ignored for that
+        shard, so a market name does not empty the DataBook shard and vice versa.
+        Results are cached per query, k and scope for the life of this version.
+        """
+        key = (query, k, json.dumps(scope or {}, sort_keys=True, ensure_ascii=False))
+        cached = self._search_cache.get(key)
+        if cached is not None:
+            return list(cached)
+        results = self._search_sharded(self.embed_query(query), k, scope)
+        self._search_cache.put(key, results)
+        return list(results)
+
+    def _search_sharded(self, embedding: np.ndarray, k: int,
+                        scope: Optional[Dict[str, List[str]]]) -> List[Tuple[Document, float]]:
+        shards = list(self.filters().get("Documento", {}))
+        if not shards:
+            return self.similarity_search_with_score_by_vector(embedding, k, scope or None)
+
+        shard_filters = []
+        for shard in shards:
+            shard_filter = {"Documento": [shard]}
+            for field, values in (scope or {}).items():
+                narrowed = {**shard_filter, field: values}
+                if len(select(self.filters(), narrowed)):
+                    shard_filter = narrowed
+            shard_filters.append(shard_filter)
+
+        if Config.BATCH_ENABLED:
+            # One batch item per shard; the batch runs each shard group on the search pool
+            found = get_search_batcher().submit_many([(self, embedding, k, f) for f in shard_filters])
+        else:
+            found = get_search_pool().map(lambda f: self.search_many([embedding], k, f)[0], shard_filters)
+        results = [pair for pairs in found for pair in pairs]
+        return sorted(results, key=lambda pair: pair[1])[:k]
+
+    def similarity_search_with_score(self, query: str, k: int = 4) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embed_query(query), k)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search(self, query: str, k: int = 4) -> List[Document]:
+        return self.similarity_search_by_vector(self.embed_query(query), k)
+
+
+class SharedIndexManager:
+    """Serves the current SharedIndex and follows the on-disk version stamp.
+
+    Every worker process maps the version named in `<root>/CURRENT`. When the
+    stamp changes, the next lookup maps the new version; callers that already
+    hold the previous SharedIndex keep using it until they drop it.
+    """
+
+    def __init__(self, root: Path = Config.SHARED_INDEX_DIR, embeddings=None,
+                 check_interval: float = Config.SHARED_INDEX_CHECK_INTERVAL):
+        self.root = Path(root)
+        self.embeddings = embeddings
+        self.check_interval = check_interval
+        self._current: Optional[SharedIndex] = None
+        self._stamp: Optional[str] = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def exists(self) -> bool:
+        return (self.root / STAMP_FILE).exists()
+
+    def read_stamp(self) -> Optional[str]:
+        try:
+            return (self.root / STAMP_FILE).read_text(encoding="utf-8").strip() or None
+        except FileNotFoundError:
+            return None
+
+    def current(self) -> SharedIndex:
+        now = time.monotonic()
+        if self._current is not None and now - self._checked < self.check_interval:
+            return self._current
+        with self._lock:
+            self._checked = now
+            stamp = self.read_stamp()
+            if stamp is None:
+                if self._current is None:
+                    raise FileNotFoundError(f"No shared index published under {self.root}")
+                return self._current
+            if stamp != self._stamp:
+                print(f"Mapping shared index version {stamp}")
+                self._current = SharedIndex(self.root / stamp, self.embeddings)
+                self._stamp = stamp
+            return self._current
+
+    @property
+    def version(self) -> str:
+        return self.current().version
+
+    def similarity_search(self, query: str, k: int = 4) -> List[Document]:
+        return self.current().similarity_search(query, k)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4) -> List[Document]:
+        return self.current().similarity_search_by_vector(embedding, k)
+
+    def similarity_search_with_score(self, query: str, k: int = 4) -> List[Tuple[Document, float]]:
+        return self.current().similarity_search_with_score(query, k)
+
+    def similarity_search_sharded(self, query: str, k: int = 4,
+                                  scope: Optional[Dict[str, List[str]]] = None) -> List[Tuple[Document, float]]:
+        return self.current().similarity_search_sharded(query, k, scope)
+
+
+def create_index(vectors: np.ndarray, factory: str = Config.INDEX_FACTORY):
+    """FAISS index from a faiss.index_factory string ("Flat", "SQfp16", "SQ8", "PCA256,SQ8"), trained on `vectors`"""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    reduction = re.match(r'PCA(\d+),', factory)
+    if reduction and len(vectors) < int(reduction.group(1)):
+        # PCA cannot learn more components than it has training vectors
+        print(f"Only {len(vectors)} vectors, skipping the {reduction.group(0)} stage of {factory}")
+        factory = factory[reduction.end():]
+    index = faiss.index_factory(vectors.shape[1], factory, faiss.METRIC_L2)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+def new_version_name() -> str:
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{os.urandom(3).hex()}"
+
+
+def artifact_hashes(path: Path) -> Dict[str, str]:
+    """sha256 of every file in a version directory except the manifest"""
+    hashes = {}
+    for file in sorted(Path(path).rglob("*")):
+        if file.is_file() and file.name != "manifest.json":
+            digest = hashlib.sha256()
+            with open(file, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+            hashes[file.relative_to(path).as_posix()] = digest.hexdigest()
+    return hashes
+
+
+def write_version(path: Path, index, documents: List[Document],
+                  tables: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+                  manifest: Optional[Dict[str, Any]] = None, vectors: Optional[np.ndarray] = None) -> Path:
+    """Write a complete index version directory (without activating it)"""
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    faiss.write_index(index, str(path / "index.faiss"))
+    DocumentVectors.write(path, index.reconstruct_n(0, index.ntotal) if vectors is None else vectors)
+    StringColumn.write(path / "texts", (doc.page_content for doc in documents))
+    StringColumn.write(path / "metadata", (json.dumps(doc.metadata, ensure_ascii=False) for doc in documents))
+    for name, records in (tables or {}).items():
+        ColumnarTable.write(path / "tables" / name, records)
+    with open(path / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump({
+            "version": path.name.lstrip("."),
+            "created": time.time(),
+            "count": index.ntotal,
+            "dimension": index.d,
+            "artifacts": artifact_hashes(path),
+            **(manifest or {}),
+        }, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def validate_version(path: Path, expected_count: Optional[int] = None, samples: int = 5):
+    """Map a built version and check it is complete and searchable; raises ValueError"""
+    index = SharedIndex(path)
+    if index.index.ntotal == 0:
+        raise ValueError("index is empty")
+    if expected_count is not None and index.index.ntotal != expected_count:
+        raise ValueError(f"index has {index.index.ntotal} vectors, expected {expected_count}")
+    if len(index.texts) != index.index.ntotal or len(index.metadatas) != index.index.ntotal:
+        raise ValueError("documents are not aligned with the index")
+    if index.vectors is None or len(index.vectors) != index.index.ntotal or index.vectors.dimension != index.index.d:
+        raise ValueError("document vectors are not aligned with the index")
+    if index.index.d != Config.EMBEDDING_DIMENSION:
+        raise ValueError(f"dimension {index.index.d} != {Config.EMBEDDING_DIMENSION}")
+    # Stored vectors must find themselves through the serving search path
+    step = max(1, index.index.ntotal // samples)
+    for position in range(0, index.index.ntotal, step)[:samples]:
+        found = index.similarity_search_with_score_by_vector(index.vectors.matrix[position], 1)
+        if not found or found[0][0].page_content != index.texts[position]:
+            raise ValueError(f"self-search failed for document {position}")
+
+
+def publish_stamp(root: Path, version: str):
+    """Point every worker at `version`; os.replace makes the swap atomic"""
+    stamp = Path(root) / STAMP_FILE
+    tmp = stamp.with_suffix(".tmp")
+    tmp.write_text(version, encoding="utf-8")
+    os.replace(tmp, stamp)
+
+
+def activate_version(root: Path, staging: Path, expected_count: Optional[int] = None) -> str:
+    """Validate a staged version, move it into place and switch the stamp to it"""
+    staging = Path(staging)
+    validate_version(staging, expected_count)
+    version = staging.name.lstrip(".")
+    os.replace(staging, Path(root) / version)
+    publish_stamp(root, version)
+    return version
+
+
+def staging_path(root: Path) -> Path:
+    """Hidden directory for a version under construction"""
+    return Path(root) / f".{new_version_name()}"
+
+
+def publish_vectorstore(vectorstore, root: Path = Config.SHARED_INDEX_DIR,
+                        tables: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+                        manifest: Optional[Dict[str, Any]] = None) -> str:
+    """Export a LangChain FAISS store into the shared layout and activate it"""
+    documents = [vectorstore.docstore.search(vectorstore.index_to_docstore_id[i])
+                 for i in range(vectorstore.index.ntotal)]
+    staging = staging_path(root)
+    write_version(staging, vectorstore.index, documents, tables, manifest)
+    return activate_version(root, staging, expected_count=len(documents))
+
+
+_manager: Optional[SharedIndexManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_shared_index_manager(embeddings=None) -> SharedIndexManager:
+    """Return the process-wide manager, so all sessions share one mapping"""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = SharedIndexManager(embeddings=embeddings)
+    if _manager.embeddings is None:
+        _manager.embeddings = embeddings
+    return _manager
+
+
+_search_pool: Optional[ThreadPoolExecutor] = None
+_search_pool_lock = threading.Lock()
+
+
+def get_search_pool() -> ThreadPoolExecutor:
+    """Threads shared by every shard fan-out (FAISS releases the GIL while searching)"""
+    global _search_pool
+    if _search_pool is None:
+        with _search_pool_lock:
+            if _search_pool is None:
+                _search_pool = ThreadPoolExecutor(max_workers=Config.SEARCH_SHARD_WORKERS,
+                                                  thread_name_prefix="shard-search")
+    return _search_pool
+
+
+def _embed_batch(items: List[Tuple[Any, str]]) -> List[List[float]]:
+    """(embeddings, query) items -> vectors, one embed_documents request per embeddings object.
+
+    OpenAI embeds queries and documents the same way, so a batch of queries
+    is one documents request; repeated queries are sent once.
+    """
+    groups: Dict[int, List[int]] = {}
+    for i, (embeddings, _) in enumerate(items):
+        groups.setdefault(id(embeddings), []).append(i)
+    results: List[Any] = [None] * len(items)
+    for indices in groups.values():
+        embeddings = items[indices[0]][0]
+        texts = list(dict.fromkeys(items[i][1] for i in indices))
+        vectors = dict(zip(texts, embeddings.embed_documents(texts)))
+        for i in indices:
+            results[i] = vectors[items[i][1]]
+    return results
+
+
+def _search_batch(items: List[Tuple[SharedIndex, List[float], int, Optional[Dict[str, List[str]]]]]):
+    """(index, vector, k, filter) items -> scored results, one matrix search per (index, k, filter)"""
+    groups: Dict[Tuple, List[int]] = {}
+    for i, (index, _, k, filter) in enumerate(items):
+        key = (id(index), k, json.dumps(filter, sort_keys=True, ensure_ascii=False))
+        groups.setdefault(key, []).append(i)
+    results: List[Any] = [None] * len(items)
+
+    def run(indices: List[int]):
+        index, _, k, filter = items[indices[0]]
+        for i, found in zip(indices, index.search_many([items[i][1] for i in indices], k, filter)):
+            results[i] = found
+
+    if len(groups) == 1:
+        run(next(iter(groups.values())))
+    else:
+        list(get_search_pool().map(run, groups.values()))
+    return results
+
+
+_embedding_batcher: Optional[MicroBatcher] = None
+_search_batcher: Optional[MicroBatcher] = None
+_batcher_lock = threading.Lock()
+
+
+def get_embedding_batcher() -> MicroBatcher:
+    """Return the process-wide batcher for query embeddings"""
+    global _embedding_batcher
+    if _embedding_batcher is None:
+        with _batcher_lock:
+            if _embedding_batcher is None:
+                _embedding_batcher = MicroBatcher(_embed_batch)
+    return _embedding_batcher
+
+
+def get_search_batcher() -> MicroBatcher:
+    """Return the process-wide batcher for vector searches"""
+    global _search_batcher
+    if _search_batcher is None:
+        with _batcher_lock:
+            if _search_batcher is None:
+                _search_batcher = MicroBatcher(_search_batch)
+    return _search_batcher
@@ -0,0 +1,93 @@
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+VECTORS_FILE = "vectors.npy"
+NORMS_FILE = "norms.npy"
+
+
+class DocumentVectors:
+    """Stored document embeddings as one memory-mapped float32 matrix.
+
+    Row i is the vector of document i (docstore position i), so batched
+    similarity only gathers the rows it needs instead of re-embedding text.
+    """
+
+    def __init__(self, directory: Path):
+        directory = Path(directory)
+        self.matrix = np.load(directory / VECTORS_FILE, mmap_mode="r")
+        self.norms = np.load(directory / NORMS_FILE, mmap_mode="r")
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    @property
+    def dimension(self) -> int:
+        return self.matrix.shape[1]
+
+    @staticmethod
+    def write(directory: Path, vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        np.save(Path(directory) / VECTORS_FILE, vectors)
+        np.save(Path(directory) / NORMS_FILE, np.linalg.norm(vectors, axis=1).astype(np.float32))
+
+    @staticmethod
+    def exists(directory: Path) -> bool:
+        return (Path(directory) / VECTORS_FILE).exists()
+
+    def normalized(self, positions: Sequence[int]) -> np.ndarray:
+        """Unit-length rows for `positions` (gathers only those rows)"""
+        positions = np.asarray(positions, dtype=np.int64)
+        rows = self.matrix[positions]
+        return rows / np.maximum(self.norms[positions], 1e-12)[:, None]
+
+    def cosine(self, query: Sequence[float], positions: Optional[Sequence[int]] = None) -> np.ndarray:
+        """Cosine between `query` and the given documents (all documents if None)"""
+        query = np.asarray(query, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        if positions is None:
+            # Matrix-vector product straight over the mapped pages, no copy of the matrix
+            return (self.matrix @ query) / np.maximum(self.norms, 1e-12)
+        return self.normalized(positions) @ query
+
+    def squared_l2(self, query: Sequence[float], positions: Sequence[int]) -> np.ndarray:
+        """Exact squared L2 distances, the metric of the FAISS index (one row per query for a 2-D query)"""
+        positions = np.asarray(positions, dtype=np.int64)
+        rows = self.matrix[positions]
+        query = np.asarray(query, dtype=np.float32)
+        if query.ndim == 1:
+            return ((rows - query) ** 2).sum(axis=1)
+        # |x - q|^2 = |x|^2 - 2 x.q + |q|^2, one matrix product for the whole batch
+        norms = np.asarray(self.norms[positions]) ** 2
+        distances = norms[None, :] - 2 * (query @ rows.T) + (query ** 2).sum(axis=1)[:, None]
+        return np.maximum(distances, 0)
+
+    def pairwise_cosine(self, positions: Sequence[int]) -> np.ndarray:
+        rows = self.normalized(positions)
+        return rows @ rows.T
+
+    def mmr(self, positions: Sequence[int], relevance: Sequence[float], k: int,
+            lambda_mult: float = 0.5) -> List[int]:
+        """Maximal marginal relevance: indices into `positions`, most relevant and least redundant first"""
+        if not len(positions):
+            return []
+        relevance = np.asarray(relevance, dtype=np.float32)
+        similarity = self.pairwise_cosine(positions)
+        selected = [int(np.argmax(relevance))]
+        redundancy = similarity[selected[0]].copy()
+        available = np.ones(len(positions), dtype=bool)
+        available[selected[0]] = False
+        while len(selected) < min(k, len(positions)):
+            scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+            scores[~available] = -np.inf
+            best = int(np.argmax(scores))
+            selected.append(best)
+            available[best] = False
+            redundancy = np.maximum(redundancy, similarity[best])
+        return selected
+
+    def near_duplicates(self, positions: Sequence[int], threshold: float = 0.98) -> List[int]:
+        """Indices into `positions` whose vector nearly repeats an earlier one"""
+        similarity = np.triu(self.pairwise_cosine(positions), k=1)
+        return [int(i) for i in np.nonzero((similarity >= threshold).any(axis=0))[0]]
@@ -0,0 +1,212 @@
+import copy
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.config import Config
+
+AUTH_YAML = Path(Config.BASE_DIR) / 'config' / 'auth.yaml'
+DOTENV_PATH = Path(Config.BASE_DIR) / '.env'
+
+
+def _file_key(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = path.stat()
+        return stat.st_mtime_ns, stat.st_size
+    except FileNotFoundError:
+        return None
+
+
+def _parse_auth_config() -> Dict[str, Any]:
+    """AUTH_CREDENTIALS from the environment, falling back to config/auth.yaml"""
+    try:
+        auth_credentials = os.getenv('AUTH_CREDENTIALS')
+        if not auth_credentials:
+            raise ValueError("AUTH_CREDENTIALS not found in environment")
+
+        # Clean and parse the JSON string
+        auth_credentials = auth_credentials.strip().strip("'\"")
+        auth_credentials = auth_credentials.replace('\\"', '"')
+        try:
+            return json.loads(auth_credentials)
+        except json.JSONDecodeError as je:
+            print(f"JSON Decode Error: {je}")
+            raise
+    except Exception as e:
+        print(f"Falling back to YAML config due to error: {str(e)}")
+        import yaml
+        from yaml.loader import SafeLoader
+        with open(AUTH_YAML) as file:
+            return yaml.load(file, Loader=SafeLoader)
+
+
+def _hash_passwords(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of `config` with plain text passwords bcrypt-hashed.
+
+    Runs on the script thread the first time a process (or a changed config)
+    needs it; AuthConfigCache keeps the result, so later reruns skip it.
+    """
+    from streamlit_authenticator import Hasher
+
+    config = copy.deepcopy(config)
+    users = config['credentials']['usernames']
+    pending = [user for user in users.values()
+               if 'password' in user and not Hasher.is_hash(str(user['password']))]
+    if pending:
+        start = time.perf_counter()
+        for user in pending:
+            user['password'] = Hasher.hash(str(user['password']))
+        print(f"Hashed {len(pending)} plain text passwords in {time.perf_counter() - start:.2f}s")
+    return config
+
+
+class AuthConfigCache:
+    """Parsed auth config with pre-hashed passwords, rebuilt only when its source changes.
+
+    The source key is the raw AUTH_CREDENTIALS value plus the mtime/size of
+    .env and config/auth.yaml, so checking it on a rerun costs a getenv and
+    two stat calls.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dotenv_key: Any = object()
+        self._key: Optional[Tuple] = None
+        self._config: Optional[Dict[str, Any]] = None
+
+    def source_key(self) -> Tuple:
+        dotenv_key = _file_key(DOTENV_PATH)
+        if dotenv_key != self._dotenv_key:
+            load_dotenv()
+            self._dotenv_key = dotenv_key
+        return os.getenv('AUTH_CREDENTIALS'), _file_key(AUTH_YAML)
+
+    def get(self) -> Tuple[Dict[str, Any], Tuple]:
+        key = self.source_key()
+        if key != self._key:
+            with self._lock:
+                if key != self._key:
+                    self._config = _hash_passwords(_parse_auth_config())
+                    self._key = key
+                    # Tokens were validated against the previous cookie key and user list
+                    get_cookie_cache().clear()
+        return self._config, self._key
+
+
+class CookieCache:
+    """Bounded LRU of recently validated re-authentication cookies"""
+
+    def __init__(self, max_size: int = Config.AUTH_COOKIE_CACHE_SIZE):
+        self.max_size = max_size
+        self._tokens: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            payload = self._tokens.get(token)
+            if payload is None:
+                return None
+            if payload['exp_date'] <= time.time():
+                del self._tokens[token]
+                return None
+            self._tokens.move_to_end(token)
+            return payload
+
+    def put(self, token: str, payload: Dict[str, Any]):
+        with self._lock:
+            self._tokens[token] = payload
+            self._tokens.move_to_end(token)
+            while len(self._tokens) > self.max_size:
+                self._tokens.popitem(last=False)
+
+    def discard(self, token: Optional[str]):
+        with self._lock:
+            self._tokens.pop(token, None)
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+
+
+_config_cache = AuthConfigCache()
+_cookie_cache: Optional[CookieCache] = None
+_cookie_cache_lock = threading.Lock()
+
+
+def get_cookie_cache() -> CookieCache:
+    """Return the process-wide cookie validation cache"""
+    global _cookie_cache
+    if _cookie_cache is None:
+        with _cookie_cache_lock:
+            if _cookie_cache is None:
+                _cookie_cache = CookieCache()
+    return _cookie_cache
+
+
+def get_authenticator():
+    """The session's Authenticate, built from the process-wide config cache.
+
+    One instance per session (its cookie manager is a per-session component),
+    reused across reruns and rebuilt only when the auth config changes.
+    """
+    import streamlit as st
+    import streamlit_authenticator as stauth
+
+    config, key = _config_cache.get()
+    if st.session_state.get('_auth_key') != key or '_authenticator' not in st.session_state:
+        st.session_state['_authenticator'] = stauth.Authenticate(
+            # stauth mutates credentials (login state, failed attempts) per session
+            copy.deepcopy(config['credentials']),
+            config['cookie']['name'],
+            config['cookie']['key'],
+            config['cookie']['expiry_days'],
+            auto_hash=False,
+            # Cookies are read server-side, no need to wait for the cookie component
+            login_sleep_time=Config.AUTH_LOGIN_SLEEP_TIME,
+        )
+        st.session_state['_auth_key'] = key
+    return st.session_state['_authenticator']
+
+
+def _cookie_token(authenticator) -> Optional[str]:
+    import streamlit as st
+    return st.context.cookies.get(authenticator.cookie_controller.cookie_model.cookie_name)
+
+
+def login_from_cookie(authenticator) -> bool:
+    """Restore a session from a recently validated cookie without decoding it again"""
+    import streamlit as st
+
+    if st.session_state.get('logout'):
+        return False
+    token = _cookie_token(authenticator)
+    payload = get_cookie_cache().get(token) if token else None
+    if payload is None:
+        return False
+    authenticator.authentication_controller.login(token=payload)
+    return bool(st.session_state.get('authentication_status'))
+
+
+def remember_cookie(authenticator):
+    """Cache the session's cookie once stauth has validated it"""
+    token = _cookie_token(authenticator)
+    payload = authenticator.cookie_controller.cookie_model.token
+    if token and isinstance(payload, dict) and 'username' in payload:
+        get_cookie_cache().put(token, {'username': payload['username'], 'exp_date': payload['exp_date']})
+
+
+def forget_cookie(authenticator):
+    """Drop the session's cookie from the cache on logout"""
+    get_cookie_cache().discard(_cookie_token(authenticator))
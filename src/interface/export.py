@@ -0,0 +1,272 @@
+import html
+import io
+import json
+import re
+import tempfile
+import time
+from datetime import datetime
+from html.parser import HTMLParser
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Tuple
+
+import sys
+from pathlib import Path
+
+from fpdf import FPDF
+from jinja2 import Template
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.interface.rendering import sanitize_html
+
+PDF_TITLE = 'STRTGY - Historial de Conversación'
+PDF_FOOTER = 'STRTGY - Asistente de Bienes Raíces Industriales'
+
+# Core PDF fonts are cp1252 encoded: map the typographic characters the model
+# commonly emits to their cp1252 code points, anything else outside Latin-1
+# (emojis) is dropped
+_CP1252_MAP = str.maketrans({
+    '•': chr(149), '–': chr(150), '—': chr(151), '‘': chr(145), '’': chr(146),
+    '“': chr(147), '”': chr(148), '…': chr(133), '€': chr(128),
+})
+_INLINE_SPACES = re.compile(r'[ \t\r\f\v]+')
+
+# Tags rendered as line breaks when flattening HTML to text
+_BLOCK_TAGS = {'p', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'li', 'br', 'hr',
+               'tr', 'table', 'blockquote', 'pre'}
+_SKIP_TAGS = {'script', 'style'}
+
+
+class HTMLTextExtractor(HTMLParser):
+    """Flatten chat HTML to plain text in a single tokenizer pass"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self.skipping += 1
+        elif tag == 'li':
+            self.parts.append('\n• ')
+        elif tag in _BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            self.skipping = max(0, self.skipping - 1)
+        elif tag in _BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.parts.append(_INLINE_SPACES.sub(' ', data.replace('\n', ' ')))
+
+    def text(self) -> str:
+        self.close()
+        lines = (line.strip() for line in ''.join(self.parts).split('\n'))
+        return '\n'.join(line for line in lines if line)
+
+
+def html_to_text(content: str) -> str:
+    """Plain-text version of a chat message"""
+    extractor = HTMLTextExtractor()
+    extractor.feed(content)
+    return extractor.text()
+
+
+def pdf_text(text: str) -> str:
+    """Make text safe for the core (Latin-1) PDF fonts"""
+    text = text.translate(_CP1252_MAP)
+    return text.encode('latin-1', 'ignore').decode('latin-1')
+
+
+# Definir la clase PDF personalizada
+class PDF(FPDF):
+    def header(self):
+        # Encabezado de página
+        self.set_font('Arial', 'B', 9)
+        self.cell(0, 10, pdf_text(PDF_TITLE), 0, 0, 'C')
+        self.ln(20)
+
+    def footer(self):
+        # Pie de página
+        self.set_y(-15)
+        self.set_font('Arial', 'I', 8)
+        self.cell(0, 10, pdf_text(f'Página {self.page_no()}'), 0, 0, 'R')
+
+    def chapter_title(self, title):
+        # Título de capítulo
+        self.set_font('Arial', 'B', 12)
+        self.cell(0, 10, pdf_text(title), 0, 1, 'L')
+        self.ln(10)
+
+    def chapter_body(self, body):
+        # Contenido del capítulo
+        self.set_font('Arial', '', 10)
+        self.multi_cell(0, 10, pdf_text(body))
+        self.ln()
+
+    def add_message(self, timestamp, role, content):
+        # Agregar un mensaje con formato
+        self.set_font('Arial', 'B', 10)
+        self.cell(0, 10, pdf_text(f'[{timestamp}] {role}:'), 0, 1)
+
+        self.set_font('Arial', '', 10)
+        # Limpiar HTML y mantener formato básico
+        content = html_to_text(content)
+
+        # Escribir contenido con formato
+        self.multi_cell(0, 6, pdf_text(content))
+        self.ln(5)
+
+        # Línea separadora
+        self.line(self.l_margin, self.get_y(), self.w - self.r_margin, self.get_y())
+        self.ln(5)
+
+
+def role_display(role: str) -> str:
+    return "Usuario" if role == "user" else "Asistente"
+
+
+def format_export_time(timestamp: float) -> str:
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))
+
+
+def export_filename(extension: str) -> str:
+    return f"STRTGY_chat_{time.strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+
+def build_pdf(messages: Iterable[Dict[str, Any]], buffer: io.BytesIO = None) -> io.BytesIO:
+    """Render a conversation to PDF in memory, without external processes"""
+    pdf = PDF(format='Letter')
+    pdf.set_margins(25, 25, 25)
+    pdf.set_auto_page_break(True, margin=25)
+    pdf.alias_nb_pages()
+    pdf.add_page()
+    pdf.chapter_title(f"Generado el {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    for msg in messages:
+        pdf.add_message(format_export_time(msg["timestamp"]), role_display(msg["role"]), str(msg["content"]))
+
+    pdf.set_font('Arial', 'I', 8)
+    pdf.cell(0, 10, pdf_text(PDF_FOOTER), 0, 1, 'C')
+
+    data = pdf.output(dest='S')
+    # pyfpdf returns a Latin-1 str, fpdf2 returns bytes
+    if isinstance(data, str):
+        data = data.encode('latin-1')
+    buffer = buffer or io.BytesIO()
+    buffer.write(data)
+    buffer.seek(0)
+    return buffer
+
+
+# Compiled once; rendered incrementally with Template.generate()
+HTML_TEMPLATE = Template("""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>STRTGY - Historial de Conversación</title>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 0; padding: 20px; color: #1E293B; line-height: 1.6; }
+        .header { text-align: center; margin-bottom: 30px; }
+        .header h1 { font-size: 24px; margin-bottom: 10px; color: #000; }
+        .header h2 { font-size: 20px; font-weight: normal; margin-bottom: 15px; color: #000; }
+        .header p { font-size: 14px; color: #666; margin-bottom: 20px; }
+        .divider { border-bottom: 1px solid #000; margin: 20px 0; }
+        .message { margin: 15px 0; padding: 10px; background-color: #F8F9FA; }
+        .timestamp { color: #666; font-size: 12px; margin-bottom: 5px; }
+        .role { color: #1E3A8A; font-weight: bold; margin-bottom: 5px; }
+        .content { margin-left: 15px; }
+        .content ul { margin: 5px 0; padding-left: 20px; }
+        .content li { margin: 3px 0; }
+        .footer { text-align: center; font-size: 12px; color: #666; margin-top: 30px; }
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h1>STRTGY</h1>
+        <h2>Historial de Conversación</h2>
+        <p>Generado el {{ current_time }}</p>
+    </div>
+    <div class="divider"></div>
+{% for message in messages %}
+    <div class="message">
+        <div class="timestamp">{{ message.timestamp }}</div>
+        <div class="role">{{ message.role_display }}</div>
+        <div class="content">{{ message.content | safe }}</div>
+    </div>
+{% endfor %}
+    <div class="footer">
+        <p>STRTGY - Asistente de Bienes Raíces Industriales</p>
+    </div>
+</body>
+</html>
+""")
+
+
+def iter_txt(messages: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """Plain-text export, one chunk per message"""
+    yield "Historial de Conversación STRTGY\n\n"
+    for msg in messages:
+        content = html_to_text(str(msg["content"])) if msg["role"] != "user" else str(msg["content"])
+        yield f"[{format_export_time(msg['timestamp'])}] {role_display(msg['role'])}:\n{content}\n\n"
+
+
+def iter_jsonl(messages: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """JSON Lines export with the raw message fields"""
+    for msg in messages:
+        yield json.dumps({
+            "role": msg["role"],
+            "content": msg["content"],
+            "timestamp": msg["timestamp"],
+        }, ensure_ascii=False) + "\n"
+
+
+def iter_html(messages: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """Standalone HTML export streamed from the compiled template"""
+    rows = ({
+        'timestamp': format_export_time(msg["timestamp"]),
+        'role_display': role_display(msg["role"]),
+        'content': (html.escape(str(msg["content"])) if msg["role"] == "user"
+                    else sanitize_html(str(msg["content"]))),
+    } for msg in messages)
+    return HTML_TEMPLATE.generate(
+        current_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        messages=rows
+    )
+
+
+def iter_pdf(messages: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """PDF export; fpdf lays out the whole document before emitting it"""
+    yield build_pdf(messages).getvalue()
+
+
+# format -> (writer, file extension, mime type)
+EXPORT_FORMATS: Dict[str, Tuple[Callable[[Iterable[Dict[str, Any]]], Iterator[Any]], str, str]] = {
+    "TXT": (iter_txt, "txt", "text/plain"),
+    "JSON Lines": (iter_jsonl, "jsonl", "application/x-ndjson"),
+    "HTML": (iter_html, "html", "text/html"),
+    "PDF": (iter_pdf, "pdf", "application/pdf"),
+}
+
+
+def iter_export(export_format: str, messages: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """Encoded chunks of a conversation export"""
+    writer = EXPORT_FORMATS[export_format][0]
+    for chunk in writer(messages):
+        yield chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+
+
+def spool_export(export_format: str, messages: Iterable[Dict[str, Any]]) -> BinaryIO:
+    """Write an export chunk by chunk to a temporary file, ready to be served"""
+    # Unbuffered so the download handler receives a raw file object it can read directly
+    spool = tempfile.TemporaryFile(buffering=0)
+    for chunk in iter_export(export_format, messages):
+        spool.write(chunk)
+    spool.seek(0)
+    return spool
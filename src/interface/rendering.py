@@ -0,0 +1,110 @@
+import html
+import time
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional
+
+# Tags the formatting stage is allowed to emit (see RAESAChatbot._format_response_with_ai)
+ALLOWED_TAGS = {
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'ul', 'ol', 'li', 'strong', 'b', 'em', 'i',
+    'u', 'br', 'hr', 'div', 'span', 'a', 'code', 'pre', 'blockquote',
+    'table', 'thead', 'tbody', 'tr', 'th', 'td',
+}
+VOID_TAGS = {'br', 'hr'}
+# Tags whose text content must be dropped along with the tag
+DROP_CONTENT_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'template'}
+SAFE_URL_SCHEMES = ('http://', 'https://', 'mailto:')
+
+
+class _Sanitizer(HTMLParser):
+    """Single-pass allow-list sanitizer for model generated HTML"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self.open_tags: List[str] = []
+        self.dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping or tag not in ALLOWED_TAGS:
+            return
+        attributes = ''
+        if tag == 'a':
+            href = dict(attrs).get('href') or ''
+            if href.strip().lower().startswith(SAFE_URL_SCHEMES):
+                attributes = f' href="{html.escape(href, quote=True)}" target="_blank" rel="noopener"'
+        self.parts.append(f'<{tag}{attributes}>')
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in VOID_TAGS and not self.dropping:
+            self.parts.append(f'<{tag}>')
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping = max(0, self.dropping - 1)
+            return
+        if self.dropping or tag not in self.open_tags:
+            return
+        # Close any unclosed children so the output stays well formed
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.parts.append(f'</{open_tag}>')
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self.dropping:
+            return
+        if not data.strip():
+            # Indentation between tags would otherwise reach the Markdown
+            # renderer as blank lines and code blocks
+            data = ' '
+        self.parts.append(html.escape(data, quote=False))
+
+    def result(self) -> str:
+        self.close()
+        closing = ''.join(f'</{tag}>' for tag in reversed(self.open_tags))
+        return ''.join(self.parts) + closing
+
+
+def sanitize_html(content: str) -> str:
+    """Keep only the basic formatting tags and safe links from `content`"""
+    sanitizer = _Sanitizer()
+    sanitizer.feed(content)
+    return sanitizer.result()
+
+
+def render_message_html(role: str, content: Any) -> str:
+    """Pre-render a chat message into the HTML block shown in the chat"""
+    # Ensure content is a string and clean it
+    content = str(content).strip()
+    # Remove any extra quotes at the start/end if present
+    content = content.strip('"\'')
+    if role == "user":
+        # User input is plain text, never markup
+        body = html.escape(content).replace('\n', '<br>')
+    else:
+        body = sanitize_html(content)
+    return f'<div class="chat-message">{body}</div>'
+
+
+def make_message(role: str, content: str, timestamp: Optional[float] = None) -> Dict[str, Any]:
+    """Build a chat message with its rendered HTML computed once"""
+    return {
+        "role": role,
+        "content": content,
+        "timestamp": timestamp if timestamp is not None else time.time(),
+        "html": render_message_html(role, content),
+    }
+
+
+def message_html(message: Dict[str, Any]) -> str:
+    """Return the cached HTML for a message, rendering older messages on first use"""
+    rendered = message.get("html")
+    if rendered is None:
+        rendered = message["html"] = render_message_html(message["role"], message["content"])
+    return rendered
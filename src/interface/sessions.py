@@ -0,0 +1,195 @@
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+from pathlib import Path
+
+import numpy as np
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.config import Config
+
+# Attributes of a session chatbot that point at process-wide objects
+SHARED_ATTRS = {"vectorstore", "anthropic", "scheduler", "single_flight", "latency", "response_cache",
+                "policy", "context_builder"}
+
+
+def approximate_size(obj: Any, seen: Optional[set] = None) -> int:
+    """sys.getsizeof of `obj` and the containers, strings and arrays it holds, each object counted once"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        # Memory-mapped arrays are backed by the shared page cache, not the session
+        return sys.getsizeof(obj) + (0 if isinstance(obj, np.memmap) else obj.nbytes)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(approximate_size(k, seen) + approximate_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(approximate_size(item, seen) for item in obj)
+    return size
+
+
+def session_size(objects: Dict[str, Any]) -> int:
+    """Approximate bytes held by one session's objects; shared engine state is not counted"""
+    seen: set = set()
+    total = 0
+    for obj in objects.values():
+        if hasattr(obj, "__dict__") and not isinstance(obj, (dict, list)):
+            seen.add(id(obj))
+            total += sys.getsizeof(obj) + sum(
+                approximate_size(value, seen) for name, value in vars(obj).items() if name not in SHARED_ATTRS
+            )
+        else:
+            total += approximate_size(obj, seen)
+    return total
+
+
+def measure(objects: Dict[str, Any]) -> Optional[int]:
+    """session_size, or None if a session thread changed a container while it was being walked"""
+    try:
+        return session_size(objects)
+    except RuntimeError as e:
+        # "changed size during iteration": the next pass measures it again
+        print(f"Skipped measuring a session: {e}")
+        return None
+
+
+class SessionRegistry:
+    """Last activity and approximate memory of every live chat session.
+
+    A session's chatbot and message window are registered here. A reaper
+    thread measures them and, once a session has been idle for `idle_timeout`
+    seconds, releases them: the chatbot reference is dropped and the message
+    list is emptied in place. The messages are already in `store` (the
+    app's conversation store), so a returning session reloads its window.
+    """
+
+    def __init__(self, store=None, idle_timeout: float = Config.SESSION_IDLE_TIMEOUT,
+                 reap_interval: float = Config.SESSION_REAP_INTERVAL):
+        self.store = store
+        self.idle_timeout = idle_timeout
+        self.reap_interval = reap_interval
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._evicted = 0
+        self._freed = 0
+
+    def touch(self, session_id: str, username: str) -> bool:
+        """Record activity; False when the session holds nothing in memory (new, or evicted while idle)"""
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or session["username"] != username:
+                self._sessions[session_id] = {"username": username, "opened": now, "last_active": now,
+                                              "bytes": 0, "objects": {}}
+                return False
+            session["last_active"] = now
+            return True
+
+    def get(self, session_id: str, name: str) -> Optional[Any]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return session["objects"].get(name) if session else None
+
+    def put(self, session_id: str, name: str, obj: Any) -> Any:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session["objects"][name] = obj
+        return obj
+
+    def reap(self) -> int:
+        """Measure every session and release the idle ones; returns how many were released"""
+        now = time.monotonic()
+        with self._lock:
+            idle = [sid for sid, s in self._sessions.items() if now - s["last_active"] > self.idle_timeout]
+            released = [self._sessions.pop(sid) for sid in idle]
+            # put() adds objects under the lock; measure copies of the registrations
+            live = [(session, dict(session["objects"])) for session in self._sessions.values()]
+        for session, objects in live:
+            # Session threads still mutate their lists without this lock
+            size = measure(objects)
+            if size is not None:
+                session["bytes"] = size
+        freed = 0
+        for session in released:
+            freed += measure(session["objects"]) or session["bytes"]
+            for obj in session["objects"].values():
+                if isinstance(obj, (list, dict)):
+                    # The Streamlit session still references the list; empty it where it is
+                    obj.clear()
+            session["objects"].clear()
+        if released:
+            if self.store is not None:
+                self.store.flush()
+            with self._lock:
+                self._evicted += len(released)
+                self._freed += freed
+            print(f"Released {len(released)} idle sessions (~{freed / 1024:.0f} KiB)")
+        return len(released)
+
+    def start(self):
+        """Start the reaper thread unless it is running; never blocks"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="session-reaper", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.reap_interval)
+            try:
+                released = self.reap()
+                if released or self._sessions:
+                    self.log_stats()
+            except Exception as e:
+                print(f"Session reaper failed: {e}")
+
+    def log_stats(self):
+        """One operator log line with the stats() totals; the reaper writes it after every busy pass"""
+        stats = self.stats()
+        print(f"Sessions: {stats['sessions']} live ({stats['users']} users), "
+              f"~{stats['bytes'] / 1024:.0f} KiB (largest ~{stats['largest_bytes'] / 1024:.0f} KiB), "
+              f"oldest idle {stats['oldest_idle_s']:.0f}s; released {stats['evicted']} "
+              f"(~{stats['freed_bytes'] / 1024:.0f} KiB) since start")
+
+    def stats(self) -> Dict[str, Any]:
+        """Operator totals: live sessions, their approximate memory, and what the reaper released"""
+        now = time.monotonic()
+        with self._lock:
+            sessions = list(self._sessions.values())
+            return {
+                "sessions": len(sessions),
+                "users": len({s["username"] for s in sessions}),
+                "bytes": sum(s["bytes"] for s in sessions),
+                "largest_bytes": max((s["bytes"] for s in sessions), default=0),
+                "oldest_idle_s": max((now - s["last_active"] for s in sessions), default=0.0),
+                "evicted": self._evicted,
+                "freed_bytes": self._freed,
+            }
+
+
+_registry: Optional[SessionRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_session_registry(store=None) -> SessionRegistry:
+    """Return the process-wide session registry, with its reaper running.
+
+    `store` is the caller's conversation store, passed in so the registry
+    flushes the same instance the app writes to.
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = SessionRegistry(store)
+                _registry.start()
+    return _registry
@@ -0,0 +1,548 @@
+import base64
+import re
+from functools import lru_cache
+from typing import Optional
+import sys
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.config import Config
+
+FONT_SIZES = {
+    "Muy pequeño": "11px",
+    "Pequeño": "14px",
+    "Normal": "16px",
+    "Grande": "20px",
+    "Muy grande": "24px"
+}
+
+LOGO_PATHS = {
+    "Claro": Path(Config.BASE_DIR) / 'src' / 'assets' / 'strtgy-logo.png',
+    "Oscuro": Path(Config.BASE_DIR) / 'src' / 'assets' / 'strtgy-logo2.png',
+}
+
+# Layout, login page and theme toggle styles shared by both themes
+BASE_CSS = """
+    /* Use system fonts instead */
+    body {
+        font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen-Sans, Ubuntu, Cantarell, 'Helvetica Neue', sans-serif !important;
+    }
+
+    /* Remove all padding and margins */
+    #root > div:nth-child(1) > div > div > div > div > section > div {padding-top: 0 !important;}
+    .main > div {padding-top: 0 !important;}
+    .stApp {padding-top: 0 !important;}
+    section[data-testid="stSidebar"] {padding-top: 0 !important;}
+
+    /* Hide default Streamlit elements */
+    div[data-testid="stToolbar"] {visibility: hidden;}
+    div[data-testid="stDecoration"] {visibility: hidden;}
+    div[data-testid="stHeader"] {display: none;}
+    footer {visibility: hidden;}
+    header {display: none;}
+    #MainMenu {visibility: hidden;}
+
+    /* Remove login form container styling */
+    [data-testid="stForm"] {
+        background: transparent !important;
+        border: none !important;
+        padding: 0 !important;
+        margin: 0 !important;
+        box-shadow: none !important;
+    }
+
+    /* Adjust login page container */
+    .login-page {
+        padding-top: 1rem !important;
+    }
+
+    /* Remove any extra spacing */
+    .element-container {
+        margin-bottom: 0 !important;
+        padding: 0 !important;
+    }
+
+    /* Remove block container padding */
+    .block-container {
+        padding-top: 0 !important;
+        padding-bottom: 0 !important;
+        margin-top: 0 !important;
+    }
+
+    /* Main container styles */
+    .stApp {
+        font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Roboto', sans-serif;
+    }
+
+    /* Sidebar styles */
+    .sidebar-logo {
+        padding: 1rem;
+        text-align: center;
+        border-bottom: 1px solid rgba(49, 51, 63, 0.1);
+    }
+
+    .sidebar-logo img {
+        max-width: 150px;
+        margin: 0 auto;
+    }
+
+    /* Widget styles */
+    .stButton>button {
+        width: 100%;
+    }
+
+    /* Text styles */
+    h1, h2, h3 {
+        font-weight: 600;
+    }
+
+    /* Theme toggle switch */
+    .theme-toggle {
+        position: fixed;
+        top: 0.75rem;
+        right: 0.75rem;
+        z-index: 1000;
+        padding: 4px;
+        border-radius: 20px;
+        background: transparent;
+    }
+
+    .theme-toggle button {
+        background-color: var(--theme-toggle-bg) !important;
+        color: var(--theme-toggle-text) !important;
+        border: 1px solid var(--theme-toggle-border) !important;
+        border-radius: 16px !important;
+        padding: 0.35rem 0.75rem !important;
+        font-size: 1rem !important;
+        display: inline-flex !important;
+        align-items: center !important;
+        gap: 0.35rem !important;
+        transition: all 0.2s ease !important;
+        min-width: auto !important;
+        width: auto !important;
+        cursor: pointer !important;
+    }
+
+    .theme-toggle button:hover {
+        background-color: var(--theme-toggle-hover) !important;
+        transform: translateY(-1px);
+    }
+
+    /* Main container */
+    .login-page {
+        display: flex;
+        flex-direction: column;
+        align-items: center;
+        max-width: 420px;
+        margin: 0 auto;
+        padding-top: 4rem;
+    }
+
+    /* Theme-specific variables */
+    [data-theme="light"] {
+        --theme-toggle-bg: #f8fafc;
+        --theme-toggle-text: #1E293B;
+        --theme-toggle-border: #e2e8f0;
+        --theme-toggle-hover: #f1f5f9;
+    }
+
+    [data-theme="dark"] {
+        --theme-toggle-bg: #1e1e1e;
+        --theme-toggle-text: #ffffff;
+        --theme-toggle-border: #2d2d2d;
+        --theme-toggle-hover: #2d2d2d;
+    }
+"""
+
+DARK_CSS = """
+    /* Dark theme styles */
+    .stApp {
+        background-color: #111827 !important;
+        color: #F3F4F6 !important;
+    }
+
+    /* Login form container dark theme */
+    [data-testid="stForm"] {
+        background-color: #0F172A !important;
+        border: 1px solid #1E293B !important;
+        border-radius: 12px !important;
+        padding: 2rem !important;
+    }
+
+    /* Login form elements dark theme */
+    .element-container[data-testid="stFormSubmitter"] {
+        background-color: #1E293B !important;
+        color: #F3F4F6 !important;
+    }
+
+    /* Input fields in dark mode */
+    .stTextInput input {
+        background-color: #0f172a !important;
+        border-color: #334155 !important;
+        color: #f1f5f9 !important;
+    }
+
+    /* Radio buttons in dark mode */
+    .stRadio > div {
+        background-color: #1F2937 !important;
+        color: #F3F4F6 !important;
+    }
+
+    /* Slider in dark mode */
+    .stSlider > div > div > div {
+        background-color: #4B5563 !important;
+    }
+
+    /* Chat messages */
+    .stChatMessage {
+        background-color: #1F2937 !important;
+        color: #F3F4F6 !important;
+        border: 1px solid #374151 !important;
+    }
+
+    /* User message */
+    .stChatMessage.user {
+        background-color: #2563EB !important;
+        color: white !important;
+    }
+
+    /* Assistant message */
+    .stChatMessage.assistant {
+        background-color: #1F2937 !important;
+    }
+
+    /* Buttons */
+    .stButton > button {
+        background-color: #3B82F6 !important;
+        color: white !important;
+        border: none !important;
+    }
+    .stButton > button:hover {
+        background-color: #2563EB !important;
+    }
+
+    /* Text elements */
+    h1, h2, h3, h4, h5, h6, p, span, div, label {
+        color: #F3F4F6 !important;
+    }
+
+    /* Links */
+    a {
+        color: #60A5FA !important;
+    }
+    a:hover {
+        color: #93C5FD !important;
+    }
+
+    /* Bottom block container fix */
+    [data-testid="stBottomBlockContainer"] {
+        background-color: #111827 !important;
+    }
+
+    /* Chat input styling */
+    [data-testid="stChatInput"] {
+        background-color: #1F2937 !important;
+        border-color: #374151 !important;
+    }
+
+    /* Ensure consistent dark theme */
+    .stChatFloatingInputContainer {
+        background-color: #111827 !important;
+    }
+
+    .stChatInput textarea {
+        background-color: #1F2937 !important;
+        color: #F3F4F6 !important;
+    }
+
+    /* Ensure all containers are dark */
+    [data-testid="stAppViewContainer"],
+    [data-testid="stHeader"],
+    [data-testid="stToolbar"],
+    [data-testid="stDecoration"] {
+        background-color: #111827 !important;
+    }
+
+    /* Scrollbars */
+    ::-webkit-scrollbar {
+        width: 10px;
+        height: 10px;
+    }
+    ::-webkit-scrollbar-track {
+        background: #1F2937;
+    }
+    ::-webkit-scrollbar-thumb {
+        background: #4B5563;
+        border-radius: 5px;
+    }
+    ::-webkit-scrollbar-thumb:hover {
+        background: #6B7280;
+    }
+
+    /* Main menu popover dark theme - Enhanced */
+    [data-testid="stMainMenuPopover"] {
+        background-color: #1F2937 !important;
+        color: #F3F4F6 !important;
+        border: 1px solid #374151 !important;
+    }
+
+    /* Menu items and all nested elements */
+    [data-testid="stMainMenuPopover"] *,
+    [data-testid="stMainMenuPopover"] span,
+    [data-testid="stMainMenuPopover"] p,
+    [data-testid="stMainMenuPopover"] div,
+    [data-testid="stMainMenuPopover"] a,
+    [data-testid="stMainMenuPopover"] button {
+        background-color: #1F2937 !important;
+        color: #F3F4F6 !important;
+    }
+
+    /* Menu item hover state */
+    [data-testid="stMainMenuPopover"] button:hover,
+    [data-testid="stMainMenuPopover"] a:hover {
+        background-color: #374151 !important;
+    }
+
+    /* Menu dividers */
+    [data-testid="stMainMenuPopover"] hr {
+        border-color: #374151 !important;
+    }
+
+    /* Menu icons */
+    [data-testid="stMainMenuPopover"] svg {
+        fill: #F3F4F6 !important;
+    }
+
+    /* Dropdown sections */
+    [data-testid="stMainMenuPopover"] section {
+        background-color: #1F2937 !important;
+        border-color: #374151 !important;
+    }
+
+    /* Settings dialog */
+    [data-testid="stMainMenuPopover"] dialog {
+        background-color: #1F2937 !important;
+        color: #F3F4F6 !important;
+    }
+
+    /* Sidebar boxes and containers in dark mode */
+    .stSidebar [data-testid="stExpander"] {
+        background-color: #1F2937 !important;
+        border: 1px solid #374151 !important;
+        border-radius: 6px !important;
+    }
+
+    /* User info box in sidebar */
+    .stSidebar div[style*="background: var(--background-light)"] {
+        background-color: #1F2937 !important;
+        border: 1px solid #374151 !important;
+    }
+
+    /* Expander content */
+    .stSidebar .streamlit-expanderContent {
+        background-color: #1F2937 !important;
+        border-top: 1px solid #374151 !important;
+    }
+
+    /* Radio buttons container */
+    .stSidebar .row-widget.stRadio > div {
+        background-color: #1F2937 !important;
+        border: 1px solid #374151 !important;
+        border-radius: 6px !important;
+        padding: 0.5rem !important;
+    }
+
+    /* Slider container */
+    .stSidebar .row-widget.stSlider > div {
+        background-color: #1F2937 !important;
+        border-radius: 6px !important;
+    }
+
+    /* Export buttons in sidebar - Keep original blue */
+    .stSidebar .stButton button[kind="primary"] {
+        background-color: #4F46E5 !important;
+        color: white !important;
+        border: none !important;
+        transition: background-color 0.2s !important;
+    }
+
+    .stSidebar .stButton button[kind="primary"]:hover {
+        background-color: #4338CA !important;
+    }
+
+    /* Logout button - Keep original red */
+    .stSidebar button[kind="secondary"] {
+        background-color: #4F46E5 !important;
+        color: white !important;
+        border: none !important;
+        transition: background-color 0.2s !important;
+    }
+
+    .stSidebar button[kind="secondary"]:hover {
+        background-color: #4338CA !important;
+    }
+
+
+    [data-testid="stTextInputRootElement"] {
+        color: #F3F4F6 !important;
+        background-color: #0F172A !important; /* Darker background */
+    }
+
+    [data-testid="stBaseButton-secondaryFormSubmit"] {
+        background-color: #2563EB !important; /* Vibrant blue */
+        color: #FFFFFF !important;
+    }
+
+    [data-testid="stBaseButton-secondaryFormSubmit"]:hover {
+        background-color: #1D4ED8 !important; /* Darker blue on hover */
+        transform: translateY(-1px) !important;
+        box-shadow: 0 4px 6px rgba(37, 99, 235, 0.2) !important;
+    }
+
+    [data-testid="stBaseButton-secondary"] {
+        background-color: #4F46E5 !important; /* Indigo */
+        border: none !important;
+        color: #FFFFFF !important;
+    }
+
+    [data-testid="stBaseButton-secondary"]:hover {
+        background-color: #4338CA !important; /* Darker indigo on hover */
+        transform: translateY(-1px) !important;
+        box-shadow: 0 4px 6px rgba(79, 70, 229, 0.2) !important;
+    }
+    /* Sidebar content dark theme */
+    [data-testid="stSidebarContent"] {
+        background-color: #1E293B !important; /* Dark blue-gray */
+        border-right: 1px solid #334155 !important;
+    }
+
+    [data-testid="stSidebarContent"] .block-container {
+        padding: 2rem 1rem !important;
+    }
+
+    [data-testid="stSidebarContent"] h1 {
+        color: #F3F4F6 !important;
+        font-size: 1.25rem !important;
+        margin-bottom: 1.5rem !important;
+    }
+
+    [data-testid="stSidebarContent"] .stSelectbox label,
+    [data-testid="stSidebarContent"] .stSlider label {
+        color: #E5E7EB !important;
+    }
+
+    [data-testid="stSidebarContent"] select,
+    [data-testid="stSidebarContent"] .stSlider [role="slider"] {
+        background-color: #0F172A !important;
+        border-color: #334155 !important;
+        color: #F3F4F6 !important;
+    }
+
+    [data-testid="stSidebarContent"] select:hover,
+    [data-testid="stSidebarContent"] .stSlider [role="slider"]:hover {
+        border-color: #4F46E5 !important;
+    }
+"""
+
+# Formatted with the selected entry of FONT_SIZES
+FONT_SIZE_CSS = """
+    /* Base text size for all elements */
+    .stApp, 
+    .stApp p,
+    .stApp div,
+    .stApp span,
+    .stApp label,
+    .stApp button,
+    .stApp input,
+    .stApp textarea,
+    .stApp select,
+    .stApp li,
+    .stMarkdown,
+    .stMarkdown p,
+    .stMarkdown div,
+    .stMarkdown span,
+    .stMarkdown li,
+    .stChatMessage,
+    .stChatMessage div,
+    .stChatMessage p,
+    .element-container,
+    .element-container p,
+    .stTextInput input,
+    .stTextInput textarea,
+    .stSelectbox select,
+    .stButton button {{
+        font-size: {size} !important;
+        line-height: 1.6 !important;
+    }}
+
+    /* Headers with proportional scaling */
+    .stMarkdown h1,
+    .stApp h1 {{
+        font-size: calc({size} * 2) !important;
+        line-height: 1.2 !important;
+    }}
+
+    .stMarkdown h2,
+    .stApp h2 {{
+        font-size: calc({size} * 1.5) !important;
+        line-height: 1.3 !important;
+    }}
+
+    .stMarkdown h3,
+    .stApp h3 {{
+        font-size: calc({size} * 1.25) !important;
+        line-height: 1.4 !important;
+    }}
+
+    /* Chat specific styling */
+    .stChatMessage {{
+        padding: calc({size} * 0.8) calc({size} * 1.2) !important;
+    }}
+
+    /* Button and input padding */
+    .stButton button,
+    .stTextInput input,
+    .stTextInput textarea {{
+        padding: calc({size} * 0.5) calc({size} * 0.8) !important;
+    }}
+"""
+
+_COMMENTS = re.compile(r'/\*.*?\*/', re.DOTALL)
+_SPACES = re.compile(r'\s+')
+_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+
+
+def minify_css(css: str) -> str:
+    """Strip comments and redundant whitespace from a stylesheet"""
+    css = _COMMENTS.sub('', css)
+    css = _SPACES.sub(' ', css)
+    css = _PUNCTUATION.sub(r'\1', css)
+    return css.replace(';}', '}').strip()
+
+
+@lru_cache(maxsize=None)
+def theme_stylesheet(theme_mode: str) -> str:
+    """Minified <style> block for a theme, built once per process"""
+    css = BASE_CSS + (DARK_CSS if theme_mode == "Oscuro" else "")
+    return f"<style>{minify_css(css)}</style>"
+
+
+@lru_cache(maxsize=None)
+def font_size_stylesheet(font_size: str) -> str:
+    """Minified <style> block scaling text to one of FONT_SIZES"""
+    css = FONT_SIZE_CSS.format(size=FONT_SIZES[font_size])
+    return f"<style>{minify_css(css)}</style>"
+
+
+@lru_cache(maxsize=None)
+def logo_data_uri(theme_mode: str) -> Optional[str]:
+    """PNG logo for a theme as a data URI, encoded once and shared by all sessions"""
+    logo_path = LOGO_PATHS["Oscuro" if theme_mode == "Oscuro" else "Claro"]
+    if not logo_path.exists():
+        return None
+    with open(logo_path, "rb") as f:
+        return "data:image/png;base64," + base64.b64encode(f.read()).decode()